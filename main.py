@@ -3,12 +3,15 @@ import sys
 from qasync import QEventLoop
 from PyQt6.QtWidgets import QApplication
 from ui.main_window import MainWindow
+from services.metrics import configure_from_env
 import asyncio
 
 def main():
     app = QApplication(sys.argv)
     loop = QEventLoop(app)
     asyncio.set_event_loop(loop)
+    # Loop-lag monitor, plus JSON log / Prometheus endpoint if configured in the environment
+    configure_from_env(loop)
 
     window = MainWindow()
     window.showMaximized()
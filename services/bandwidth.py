@@ -0,0 +1,229 @@
+"""
+Bandwidth scheduling shared by downloads and uploads.
+
+A global cap and per-direction caps are split fairly between the transfers
+that are active right now: the global cap is divided between directions by
+their number of active transfers (a direction below its own cap leaves the
+rest to the other), and each direction's rate is divided equally between its
+transfers. Transfers call `Stream.consume` from their worker thread for every
+block they move, which sleeps just long enough to stay within their share.
+"""
+import math
+import threading
+import time
+
+DOWNLOAD = "download"
+UPLOAD = "upload"
+DIRECTIONS = (DOWNLOAD, UPLOAD)
+
+# Seconds of traffic a stream may send at once after being idle
+BURST_SECONDS = 0.5
+
+# yt-dlp fragment concurrency: default without caps, and bounds when adapting
+DEFAULT_FRAGMENTS = 3
+MAX_FRAGMENTS = 8
+
+# Weight of the newest sample in the per-connection throughput estimate
+THROUGHPUT_SMOOTHING = 0.3
+
+# Transfers smaller than this say little about per-connection throughput
+MIN_SAMPLE_BYTES = 4 * 1024 * 1024
+
+_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def parse_rate(value: str | None) -> float | None:
+    """
+    Parse a rate like "500K", "4M" or "1.5G" (bytes per second).
+
+    Returns:
+        float | None: Bytes per second, None for no limit ("", "0", "none").
+    """
+    if value is None:
+        return None
+    text = str(value).strip().lower().removesuffix("/s").removesuffix("b")
+    if text in ("", "0", "none", "off"):
+        return None
+    unit = text[-1] if text[-1] in _UNITS else ""
+    number = float(text[:-1] if unit else text)
+    return number * _UNITS[unit] if number > 0 else None
+
+
+class Stream:
+    """One transfer's share of the bandwidth. Use as a context manager or call `close`."""
+
+    def __init__(self, scheduler: "BandwidthScheduler", direction: str, connections: int):
+        self.scheduler = scheduler
+        self.direction = direction
+        self.connections = connections
+        self.bytes = 0
+        self.started = time.monotonic()
+        self._tokens = 0.0
+        self._last = self.started
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float | None:
+        """Current share in bytes per second, None if unlimited."""
+        return self.scheduler.share(self.direction)
+
+    def consume(self, nbytes: int):
+        """Account for `nbytes` moved, sleeping if the stream is ahead of its share. Thread-safe."""
+        if nbytes <= 0:
+            return
+        rate = self.rate
+        with self._lock:
+            self.bytes += nbytes
+            now = time.monotonic()
+            if rate is None:
+                self._tokens = 0.0
+                self._last = now
+                return
+            self._tokens = min(rate * BURST_SECONDS, self._tokens + (now - self._last) * rate)
+            self._last = now
+            self._tokens -= nbytes
+            delay = -self._tokens / rate if self._tokens < 0 else 0
+        if delay:
+            time.sleep(delay)
+
+    def close(self):
+        self.scheduler._close(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BandwidthScheduler:
+    """
+    Global and per-direction bandwidth caps, shared fairly by active streams.
+
+        scheduler = BandwidthScheduler(total=parse_rate("8M"), upload=parse_rate("2M"))
+        with scheduler.open(UPLOAD) as stream:
+            for block in blocks:
+                stream.consume(len(block))
+                send(block)
+
+    Limits can be changed at any time with `set_limits`; active streams pick
+    up the new share on their next `consume`.
+    """
+
+    def __init__(self, total: float | None = None, download: float | None = None, upload: float | None = None):
+        self._lock = threading.Lock()
+        self._streams: dict[str, set[Stream]] = {direction: set() for direction in DIRECTIONS}
+        self._shares: dict[str, float | None] = {}
+        self._per_connection: dict[str, float | None] = {direction: None for direction in DIRECTIONS}
+        self.total = total
+        self.limits = {DOWNLOAD: download, UPLOAD: upload}
+
+    def set_limits(self, total: float | None = None, download: float | None = None, upload: float | None = None):
+        """Replace all caps (bytes per second, None for unlimited)."""
+        with self._lock:
+            self.total = total
+            self.limits = {DOWNLOAD: download, UPLOAD: upload}
+            self._rebalance()
+
+    def get_limits(self) -> dict:
+        return {"total": self.total, **self.limits}
+
+    def open(self, direction: str, connections: int = 1) -> Stream:
+        """
+        Register an active transfer.
+
+        Args:
+            direction (str): DOWNLOAD or UPLOAD.
+            connections (int, optional): Parallel connections the transfer uses, for
+                the per-connection throughput estimate.
+
+        Returns:
+            Stream: Handle to `consume` through; close it when the transfer ends.
+        """
+        stream = Stream(self, direction, connections)
+        with self._lock:
+            self._streams[direction].add(stream)
+            self._rebalance()
+        return stream
+
+    def share(self, direction: str) -> float | None:
+        """Current per-stream rate for a direction in bytes per second, None if unlimited."""
+        with self._lock:
+            return self._shares.get(direction)
+
+    def fragment_concurrency(self, direction: str = DOWNLOAD) -> int:
+        """
+        How many fragments a new transfer should fetch in parallel.
+
+        Enough connections to fill the transfer's share at the measured
+        per-connection throughput, so capped transfers don't open connections
+        they can't use and slow links get more of them.
+        """
+        with self._lock:
+            streams = len(self._streams[direction]) + 1
+            share = self._direction_rates(extra={direction: 1}).get(direction)
+            per_connection = self._per_connection[direction]
+        if share is None or not per_connection:
+            return DEFAULT_FRAGMENTS
+        wanted = math.ceil(share / streams / per_connection)
+        return max(1, min(MAX_FRAGMENTS, wanted))
+
+    def _close(self, stream: Stream):
+        elapsed = time.monotonic() - stream.started
+        with self._lock:
+            self._streams[stream.direction].discard(stream)
+            self._rebalance()
+            if stream.bytes >= MIN_SAMPLE_BYTES and elapsed > 0:
+                sample = stream.bytes / elapsed / max(1, stream.connections)
+                current = self._per_connection[stream.direction]
+                self._per_connection[stream.direction] = (
+                    sample if current is None else current + THROUGHPUT_SMOOTHING * (sample - current)
+                )
+
+    def _rebalance(self):
+        rates = self._direction_rates()
+        self._shares = {
+            direction: rate / len(self._streams[direction]) if rate is not None else None
+            for direction, rate in rates.items()
+        }
+
+    def _direction_rates(self, extra: dict | None = None) -> dict[str, float | None]:
+        """Aggregate rate per active direction. Call with the lock held."""
+        counts = {d: len(streams) + (extra or {}).get(d, 0) for d, streams in self._streams.items()}
+        active = [d for d in DIRECTIONS if counts[d]]
+        if self.total is None:
+            return {d: self.limits[d] for d in active}
+
+        # Split the total by active stream count; a direction capped below its
+        # part keeps only its cap and the rest goes to the others
+        rates = {}
+        remaining = self.total
+        pending = list(active)
+        while pending:
+            weight = sum(counts[d] for d in pending)
+            capped = [
+                d for d in pending
+                if self.limits[d] is not None and self.limits[d] <= remaining * counts[d] / weight
+            ]
+            if not capped:
+                for d in pending:
+                    rates[d] = remaining * counts[d] / weight
+                break
+            for d in capped:
+                rates[d] = self.limits[d]
+                remaining -= self.limits[d]
+                pending.remove(d)
+        return rates
+
+
+_default_scheduler: BandwidthScheduler | None = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler() -> BandwidthScheduler:
+    """Return the process-wide scheduler (unlimited until `set_limits` is called)."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = BandwidthScheduler()
+        return _default_scheduler
@@ -0,0 +1,462 @@
+import argparse
+import asyncio
+import csv
+import datetime
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+from services.job_queue import Job, JobQueue, JobStatus
+from services.metrics import StageTimer
+from services.paths import data_path
+from services.progress import ProgressReporter
+from services.relay import relay_video
+from services.uploader import prepare_thumbnail, start_post_upload, upload_video
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v')
+MANIFEST_EXTENSIONS = ('.csv', '.json')
+
+# YouTube Data API v3 quota: units per day and cost of one videos.insert call
+DAILY_QUOTA = 10000
+UPLOAD_COST = 1600
+THUMBNAIL_COST = 50
+PLAYLIST_INSERT_COST = 50
+
+
+@dataclass
+class UploadItem:
+    """One video to upload plus its metadata."""
+
+    path: str
+    title: str
+    description: str = ""
+    tags: list[str] = field(default_factory=list)
+    category_id: str = "22"
+    privacy_status: str = "private"
+    thumbnail: str | None = None
+    playlist_id: str | None = None
+
+
+def _split_tags(value) -> list[str]:
+    if isinstance(value, list):
+        return [str(tag).strip() for tag in value if str(tag).strip()]
+    separator = "|" if "|" in (value or "") else ","
+    return [tag.strip() for tag in (value or "").split(separator) if tag.strip()]
+
+
+def _item_from_record(record: dict, base_dir: str) -> UploadItem:
+    path = record.get("file") or record.get("path")
+    if not path:
+        raise ValueError(f"Manifest entry without 'file': {record}")
+    path = os.path.join(base_dir, path)
+    thumbnail = record.get("thumbnail") or None
+    return UploadItem(
+        path=path,
+        title=record.get("title") or os.path.splitext(os.path.basename(path))[0],
+        description=record.get("description") or "",
+        tags=_split_tags(record.get("tags")),
+        category_id=str(record.get("category_id") or record.get("category") or "22"),
+        privacy_status=record.get("privacy") or record.get("privacy_status") or "private",
+        thumbnail=os.path.join(base_dir, thumbnail) if thumbnail else None,
+        playlist_id=record.get("playlist") or record.get("playlist_id") or None,
+    )
+
+
+def load_manifest(manifest_path: str) -> list[UploadItem]:
+    """
+    Read upload metadata from a CSV or JSON manifest.
+
+    CSV manifests need a header row with at least a `file` column; `title`,
+    `description`, `tags` (comma- or |-separated), `privacy`, `category_id`,
+    `thumbnail` and `playlist` (playlist ID) are optional. JSON manifests are a list of objects with the same
+    keys, or an object with a `videos` list. Relative paths are resolved against
+    the manifest's directory.
+
+    Args:
+        manifest_path (str): Path to the .csv or .json manifest.
+
+    Returns:
+        list[UploadItem]: Items in manifest order.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    if manifest_path.lower().endswith(".json"):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        records = data.get("videos", []) if isinstance(data, dict) else data
+    else:
+        with open(manifest_path, "r", encoding="utf-8-sig", newline="") as f:
+            records = list(csv.DictReader(f))
+    return [_item_from_record(record, base_dir) for record in records]
+
+
+def scan_directory(directory: str, privacy_status: str = "private") -> list[UploadItem]:
+    """Create one item per video file in a directory, titled after the file name."""
+    items = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and name.lower().endswith(VIDEO_EXTENSIONS):
+            title = os.path.splitext(name)[0]
+            items.append(UploadItem(path=path, title=title, privacy_status=privacy_status))
+    return items
+
+
+def collect_items(paths: list[str], privacy_status: str = "private") -> list[UploadItem]:
+    """
+    Expand video files, directories and manifests into upload items.
+
+    Args:
+        paths (list[str]): Any mix of video files, directories and manifests.
+        privacy_status (str, optional): Privacy for items that don't specify one.
+
+    Returns:
+        list[UploadItem]: Items to upload.
+    """
+    items = []
+    for path in paths:
+        if os.path.isdir(path):
+            items.extend(scan_directory(path, privacy_status))
+        elif path.lower().endswith(MANIFEST_EXTENSIONS):
+            items.extend(load_manifest(path))
+        elif path.lower().endswith(VIDEO_EXTENSIONS):
+            title = os.path.splitext(os.path.basename(path))[0]
+            items.append(UploadItem(path=path, title=title, privacy_status=privacy_status))
+    return items
+
+
+class QuotaTracker:
+    """Tracks API quota units spent today (Pacific time, when YouTube resets quota)."""
+
+    def __init__(self, daily_quota: int = DAILY_QUOTA, path: str | None = None):
+        self.daily_quota = daily_quota
+        self.path = path or data_path("quota.json")
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _today() -> str:
+        try:
+            from zoneinfo import ZoneInfo
+            return datetime.datetime.now(ZoneInfo("America/Los_Angeles")).date().isoformat()
+        except Exception:
+            return datetime.datetime.utcnow().date().isoformat()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        if state.get("date") != self._today():
+            state = {"date": self._today(), "used": 0}
+        return state
+
+    def remaining(self) -> int:
+        with self._lock:
+            return self.daily_quota - self._load()["used"]
+
+    def try_consume(self, units: int) -> bool:
+        """Reserve quota units. Returns False if that would exceed the daily quota."""
+        with self._lock:
+            state = self._load()
+            if state["used"] + units > self.daily_quota:
+                return False
+            state["used"] += units
+            self._save(state)
+            return True
+
+    def refund(self, units: int):
+        """Give back units reserved for calls that were never made (same day only)."""
+        with self._lock:
+            state = self._load()
+            state["used"] = max(0, state["used"] - units)
+            self._save(state)
+
+    def _save(self, state: dict):
+        # Written aside and renamed, so a crash mid-write can't leave a truncated file
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+
+class QuotaExceeded(Exception):
+    """Raised when an upload would exceed the daily API quota."""
+
+
+class UploadQueue(JobQueue):
+    """
+    Upload queue running up to `max_workers` YouTube uploads in parallel.
+
+    Setting the thumbnail and adding the video to a playlist happen after the
+    media upload without holding a worker slot, so they overlap with the next
+    upload. The thumbnail is resized while the video is still uploading.
+
+    Relay jobs (`submit_relay`) download a video and upload it with its
+    original metadata, streaming the upload behind the download when possible.
+
+        queue = UploadQueue(max_workers=2)
+        for item in collect_items(["videos/"]):
+            queue.submit_upload(item)
+        await queue.join()
+        print(queue.summary())
+    """
+
+    kind = "upload"
+
+    def __init__(self, max_workers: int = 2, quota: QuotaTracker | None = None, **upload_kwargs):
+        """
+        Args:
+            max_workers (int, optional): Number of concurrent uploads.
+            quota (QuotaTracker, optional): Quota tracker. Shared daily tracker if None.
+            **upload_kwargs: Extra arguments for upload_video (e.g. session, upload_url).
+        """
+        super().__init__(max_workers)
+        self.quota = quota or QuotaTracker()
+        self.upload_kwargs = upload_kwargs
+        self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="upload")
+
+    def submit_upload(self, item: UploadItem, priority: int = 0) -> Job:
+        """Queue an upload. Returns the queued job."""
+        params = asdict(item)
+        params["size"] = os.path.getsize(item.path)
+        return self.submit(Job(kind=self.kind, params=params, priority=priority))
+
+    def submit_relay(
+        self,
+        url: str,
+        format_str: str = "best",
+        output_dir: str = ".",
+        privacy_status: str = "private",
+        priority: int = 0,
+        **metadata
+    ) -> Job:
+        """
+        Queue a download that is uploaded again as it arrives (see services.relay).
+
+        Args:
+            url (str): Video URL.
+            format_str (str, optional): yt-dlp format string.
+            output_dir (str, optional): Directory the download is kept in.
+            privacy_status (str, optional): Privacy of the uploaded video.
+            priority (int, optional): Higher values start first.
+            **metadata: Overrides for the prefilled metadata ("title", "description", "tags",
+                "category_id") and "thumbnail" / "playlist_id".
+
+        Returns:
+            Job: The queued job. Its result is the upload response plus the local "path".
+        """
+        params = {
+            "url": url,
+            "format_str": format_str,
+            "output_dir": output_dir,
+            "privacy_status": privacy_status,
+            **metadata
+        }
+        return self.submit(Job(kind="relay", params=params, priority=priority))
+
+    def _charge(self, job: Job):
+        """
+        Reserve the job's API quota, once: a resumed or retried job continues its
+        saved upload session instead of inserting the video again.
+        """
+        if job.params.get("quota_charged"):
+            return
+        cost = UPLOAD_COST
+        if job.params.get("thumbnail"):
+            cost += THUMBNAIL_COST
+        if job.params.get("playlist_id"):
+            cost += PLAYLIST_INSERT_COST
+        if not self.quota.try_consume(cost):
+            raise QuotaExceeded(f"Daily API quota exhausted ({self.quota.remaining()} units left)")
+        job.params["quota_charged"] = cost
+
+    def _refund(self, job: Job):
+        """Return the quota of a job whose video was never inserted, unless it is only paused."""
+        if job.cancel_flag.get("pause"):
+            return
+        cost = job.params.pop("quota_charged", 0)
+        if cost:
+            self.quota.refund(cost)
+
+    async def run_job(self, job: Job) -> dict:
+        params = job.params
+        if job.kind == "relay":
+            return await self._run_relay(job)
+        self._charge(job)
+
+        loop = asyncio.get_running_loop()
+        timer = StageTimer("upload", job.stats)
+        thumbnail = None
+        if params.get("thumbnail"):
+            thumbnail = loop.run_in_executor(
+                self._executor, timer.timed(prepare_thumbnail, "thumbnail_prepare"), params["thumbnail"]
+            )
+
+        reporter = ProgressReporter(lambda progress: self.report(job, progress), loop)
+
+        def blocking_upload():
+            return upload_video(
+                params["path"],
+                params["title"],
+                params["description"],
+                params["tags"],
+                params["category_id"],
+                params["privacy_status"],
+                reporter.update,
+                stats=job.stats,
+                cancel_flag=job.cancel_flag,
+                **self.upload_kwargs
+            )
+
+        try:
+            response = await loop.run_in_executor(self._executor, timer.timed(blocking_upload, wait="executor_wait"))
+        except BaseException:
+            if thumbnail is not None:
+                thumbnail.cancel()
+            self._refund(job)
+            raise
+        finally:
+            reporter.finish()
+
+        if thumbnail is None and not params.get("playlist_id"):
+            return response
+
+        self._start_post_upload(job)
+        try:
+            thumbnail = await thumbnail if thumbnail is not None else None
+        except Exception as e:
+            print(f"❌ Thumbnail {params['thumbnail']} unusable:", e)
+            job.stats["post_upload"] = {"thumbnail": f"error: {e}"}
+            thumbnail = None
+        pending = start_post_upload(response["id"], thumbnail, params.get("playlist_id"))
+        response["post_upload"] = await self._finish_post_upload(job, pending)
+        return response
+
+    def _start_post_upload(self, job: Job):
+        # Media is uploaded; the follow-up calls don't need an upload slot
+        self.release_slot(job)
+        job.stats["stage"] = "post_upload"
+        self._notify(job)
+
+    async def _finish_post_upload(self, job: Job, pending) -> dict:
+        """Wait for a start_post_upload future and record its results in the job's stats."""
+        with StageTimer("upload", job.stats).stage("post_upload"):
+            results = await asyncio.wrap_future(pending)
+        job.stats["post_upload"] = {**job.stats.get("post_upload", {}), **results}
+        return job.stats["post_upload"]
+
+    async def _run_relay(self, job: Job) -> dict:
+        self._charge(job)
+        params = {key: value for key, value in job.params.items() if key != "quota_charged"}
+        try:
+            response = await relay_video(
+                params.pop("url"),
+                params.pop("format_str"),
+                params.pop("output_dir"),
+                progress_hook=lambda progress: self.report(job, progress),
+                cancel_flag=job.cancel_flag,
+                stats=job.stats,
+                executor=self._executor,
+                **params,
+                **self.upload_kwargs
+            )
+        except BaseException:
+            self._refund(job)
+            raise
+        job.params["path"] = response["path"]
+        job.params["size"] = os.path.getsize(response["path"])
+        if "post_upload" in response:
+            self._start_post_upload(job)
+            response["post_upload"] = await self._finish_post_upload(job, response["post_upload"])
+        return response
+
+    def summary(self, job_ids: list[str] | None = None) -> dict:
+        """
+        Aggregate and per-file throughput for the uploads in this queue.
+
+        Args:
+            job_ids (list[str], optional): Only these jobs, e.g. one batch of a long-lived queue.
+
+        Returns:
+            dict: Counts per status, total bytes, wall time, aggregate bytes/s and a per-file list.
+        """
+        if job_ids is None:
+            jobs = list(self.jobs.values())
+        else:
+            jobs = [self.jobs[job_id] for job_id in job_ids if job_id in self.jobs]
+        files = []
+        for job in jobs:
+            elapsed = (job.finished_at or 0) - (job.started_at or 0)
+            done = job.status is JobStatus.DONE
+            size = job.params.get("size", 0)
+            files.append({
+                # Relay jobs only have a path once their download exists
+                "path": job.params.get("path") or job.params.get("url"),
+                "status": job.status.value,
+                "bytes": size,
+                "seconds": round(elapsed, 3) if job.started_at else None,
+                "bytes_per_second": size / elapsed if done and elapsed > 0 else None,
+                "video_id": (job.result or {}).get("id") if done else None,
+                "post_upload": job.stats.get("post_upload"),
+                "error": job.error,
+            })
+
+        started = [job.started_at for job in jobs if job.started_at]
+        finished = [job.finished_at for job in jobs if job.finished_at and job.started_at]
+        wall = max(finished) - min(started) if started and finished else 0
+        uploaded = sum(job.params.get("size", 0) for job in jobs if job.status is JobStatus.DONE)
+        counts = {status.value: 0 for status in JobStatus}
+        for job in jobs:
+            counts[job.status.value] += 1
+        return {
+            "counts": counts,
+            "bytes": uploaded,
+            "seconds": round(wall, 3),
+            "bytes_per_second": uploaded / wall if wall > 0 else None,
+            "files": files,
+        }
+
+    async def stop(self):
+        await super().stop()
+        self._executor.shutdown(wait=False)
+
+
+async def run_batch(items: list[UploadItem], concurrency: int = 2, **upload_kwargs) -> dict:
+    """
+    Upload items with bounded concurrency and print progress to stdout.
+
+    Returns:
+        dict: Summary as returned by UploadQueue.summary().
+    """
+    queue = UploadQueue(max_workers=concurrency, **upload_kwargs)
+
+    def on_update(job: Job):
+        if job.finished:
+            print(f"[{job.status.value}] {job.params['path']}" + (f": {job.error}" if job.error else ""))
+
+    queue.add_listener(on_update)
+    for item in items:
+        queue.submit_upload(item)
+    await queue.join()
+    summary = queue.summary()
+    await queue.stop()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Upload many videos to YouTube")
+    parser.add_argument("paths", nargs="+", help="video files, directories or CSV/JSON manifests")
+    parser.add_argument("-j", "--concurrency", type=int, default=2, help="parallel uploads")
+    parser.add_argument("--privacy", default="private", choices=["public", "private", "unlisted"])
+    args = parser.parse_args(argv)
+
+    items = collect_items(args.paths, args.privacy)
+    if not items:
+        parser.error("no videos found")
+    summary = asyncio.run(run_batch(items, args.concurrency))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,457 @@
+"""
+Headless command line interface.
+
+    python -m services download URL [URL ...] [-f FORMAT] [-o DIR] [-j N] [--playlist] [--no-convert]
+    python -m services formats URL
+    python -m services library [--channel ID_OR_NAME | --url URL]
+    python -m services upload PATH [PATH ...] [-j N] [--privacy private]
+    python -m services relay URL [URL ...] [-f FORMAT | --stream] [-o DIR] [--privacy private]
+    python -m services serve [-j N] [--upload-jobs N] [--http --port 8765]
+    python -m services worker [--store URL] [-j N] [--upload-jobs N] [--types download,upload]
+    python -m services submit [--store URL] [JSON ...]
+    python -m services jobs [--store URL] [--status running] [--cancel ID]
+
+Runs on a plain asyncio event loop and never imports PyQt6. yt-dlp and the
+Google client libraries are only imported once a job actually needs them.
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+# services.defaults imports nothing heavy, so --help stays fast
+from services.defaults import (
+    DEFAULT_FORMAT, DOWNLOAD_TYPES, LEASE_SECONDS, POSTPROCESS_WORKERS, SITE_CONCURRENCY, SITE_RATE, STREAM_FORMAT,
+    UPLOAD_TYPES
+)
+
+WORKER_TYPES = DOWNLOAD_TYPES + UPLOAD_TYPES
+
+
+def _print_event(job):
+    result = job.result
+    if isinstance(result, dict):
+        # Upload responses are large; the video ID is what callers need
+        result = result.get("id")
+    print(json.dumps({
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status.value,
+        "progress": round(job.progress, 1),
+        "stats": job.stats,
+        "result": result,
+        "error": job.error,
+    }), flush=True)
+
+
+def _progress_printer():
+    """Print job updates as JSON lines, at most one per whole percent."""
+    last = {}
+
+    def on_update(job):
+        step = int(job.progress)
+        key = (job.status, step)
+        if last.get(job.id) == key:
+            return
+        last[job.id] = key
+        _print_event(job)
+
+    return on_update
+
+
+async def run_downloads(args) -> int:
+    from services.download_queue import DownloadQueue
+    from services.job_queue import JobStatus
+
+    queue = DownloadQueue(max_workers=args.jobs, postprocess_workers=args.convert_jobs)
+    queue.add_listener(_progress_printer())
+    convert = "never" if args.no_convert else "auto"
+    for url in args.urls:
+        if args.playlist:
+            queue.submit_playlist(url, args.format, args.output, priority=args.priority,
+                                  skip_archived=not args.no_archive, convert=convert)
+        else:
+            queue.submit_download(url, args.format, args.output, priority=args.priority, convert=convert)
+    await queue.join()
+    await queue.stop()
+    failed = [job for job in queue.jobs.values() if job.status is not JobStatus.DONE]
+    return 1 if failed else 0
+
+
+async def run_uploads(args) -> int:
+    from services.batch_upload import collect_items, run_batch
+
+    items = collect_items(args.paths, args.privacy)
+    if not items:
+        print("No videos found", file=sys.stderr)
+        return 1
+    if len(items) == 1:
+        if args.title:
+            items[0].title = args.title
+        if args.description:
+            items[0].description = args.description
+        if args.thumbnail:
+            items[0].thumbnail = args.thumbnail
+    if args.playlist:
+        for item in items:
+            item.playlist_id = item.playlist_id or args.playlist
+    summary = await run_batch(items, args.jobs)
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["counts"]["done"] == len(items) else 1
+
+
+async def run_relays(args) -> int:
+    from services.batch_upload import UploadQueue
+    from services.job_queue import JobStatus
+
+    queue = UploadQueue(max_workers=args.jobs)
+    queue.add_listener(_progress_printer())
+    metadata = {"title": args.title, "description": args.description, "playlist_id": args.playlist}
+    if len(args.urls) > 1:
+        metadata["title"] = metadata["description"] = None
+    for url in args.urls:
+        queue.submit_relay(
+            url,
+            STREAM_FORMAT if args.stream else args.format,
+            args.output,
+            args.privacy,
+            **{k: v for k, v in metadata.items() if v is not None}
+        )
+    await queue.join()
+    await queue.stop()
+    failed = [job for job in queue.jobs.values() if job.status is not JobStatus.DONE]
+    return 1 if failed else 0
+
+
+async def list_formats(args) -> int:
+    from services.downloader import async_get_video_info
+
+    info = await async_get_video_info(args.url)
+    if not info:
+        return 1
+    print(json.dumps(info["formats"], indent=2))
+    return 0
+
+
+async def query_library(args) -> int:
+    from services.library import get_library
+    from services.metadata_cache import canonical_key
+
+    library = get_library()
+    if args.channel:
+        entries = library.by_channel(args.channel)
+    elif args.url:
+        entries = library.find(canonical_key(args.url))
+    else:
+        entries = library.all()
+    print(json.dumps(entries, indent=2))
+    return 0
+
+
+async def serve(args) -> int:
+    """
+    Long-running worker. With --http, serves the job API (see services.job_api).
+    Otherwise reads JSON lines on stdin, one job per line:
+
+        {"type": "download", "url": "...", "format": "...", "output_dir": "...", "priority": 0}
+        {"type": "playlist", "url": "...", "format": "...", "output_dir": "...", "skip_archived": true}
+        {"type": "upload", "path": "...", "title": "...", "privacy_status": "private",
+         "thumbnail": "...", "playlist_id": "..."}
+        {"type": "relay", "url": "...", "format": "...", "privacy_status": "private"}
+        {"type": "cancel", "id": "..."}
+        {"type": "pause", "id": "..."}
+        {"type": "resume", "id": "..."}
+        {"type": "limits", "total": "8M", "download": null, "upload": "2M"}
+
+    Job updates are printed to stdout as JSON lines. Downloads an earlier run
+    left unfinished are queued again first, continuing their partial files.
+    """
+    from services.job_service import JobService
+
+    service = JobService(args.jobs, args.upload_jobs, args.output, args.convert_jobs)
+
+    if args.http:
+        from services.job_api import run_server
+        service.downloads.restore()
+        await run_server(service, args.host, args.port)
+        return 0
+
+    printer = _progress_printer()
+    service.downloads.add_listener(printer)
+    service.uploads.add_listener(printer)
+    # Paused downloads stay journaled: the run ends once stdin closes and the rest is done
+    service.downloads.restore(include_paused=False)
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+                if request.get("type") == "cancel":
+                    service.cancel(request["id"])
+                elif request.get("type") == "pause":
+                    service.pause(request["id"])
+                elif request.get("type") == "resume":
+                    service.resume(request["id"])
+                elif request.get("type") == "limits":
+                    service.set_limits(request)
+                else:
+                    service.submit(request)
+            except (ValueError, KeyError, TypeError, OSError) as e:
+                print(json.dumps({"error": str(e), "request": line}), flush=True)
+
+        # stdin closed: finish what was submitted
+        await service.join()
+    finally:
+        await service.stop()
+    return 0
+
+
+async def run_worker(args) -> int:
+    """Claim and run jobs from a shared job store (see services.worker)."""
+    from services.job_store import open_store
+    from services.worker import StoreWorker
+
+    worker = StoreWorker(
+        open_store(args.store),
+        args.worker_id,
+        args.jobs,
+        args.upload_jobs,
+        args.output,
+        args.convert_jobs,
+        types=tuple(t for t in args.types.split(",") if t),
+        lease=args.lease
+    )
+    printer = _progress_printer()
+    worker.service.downloads.add_listener(printer)
+    worker.service.uploads.add_listener(printer)
+    print(f"Worker {worker.worker_id} taking {', '.join(worker.types)} jobs", file=sys.stderr, flush=True)
+    await worker.run()
+    return 0
+
+
+async def submit_jobs(args) -> int:
+    """Add JSON job requests (arguments, or lines on stdin) to a shared job store."""
+    from services.job_store import open_store
+
+    store = open_store(args.store)
+    lines = args.requests or sys.stdin
+    failed = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+            job_id = store.submit(request, int(request.get("priority", 0)))
+        except (ValueError, TypeError, AttributeError) as e:
+            print(json.dumps({"error": str(e), "request": line}), flush=True)
+            failed += 1
+            continue
+        print(json.dumps({"id": job_id, "type": request["type"]}), flush=True)
+    return 1 if failed else 0
+
+
+async def list_store_jobs(args) -> int:
+    """Print the jobs of a shared job store, or cancel one."""
+    from services.job_store import open_store
+
+    store = open_store(args.store)
+    if args.cancel:
+        if not store.cancel(args.cancel):
+            print(f"No queued or running job {args.cancel}", file=sys.stderr)
+            return 1
+        return 0
+    for job in store.list(args.status):
+        print(json.dumps({
+            "id": job["id"],
+            "type": job["type"],
+            "status": job["status"],
+            "worker": job["worker"],
+            "attempts": job["attempts"],
+            "progress": round(job["progress"], 1),
+            "result": job["result"].get("id") if isinstance(job["result"], dict) else job["result"],
+            "error": job["error"],
+        }, ensure_ascii=False))
+    return 0
+
+
+def _add_limit_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--limit", help="total bandwidth cap, e.g. 8M (bytes/s)")
+    parser.add_argument("--download-limit", help="download bandwidth cap, e.g. 6M")
+    parser.add_argument("--upload-limit", help="upload bandwidth cap, e.g. 2M")
+    parser.add_argument("--per-site", type=int, help="most concurrent downloads from one site, lowered while it"
+                                                     f" throttles (default {SITE_CONCURRENCY})")
+    parser.add_argument("--site-rate", type=float,
+                        help=f"most downloads starting per second per site (default {SITE_RATE:g})")
+
+
+def _apply_limits(args):
+    if getattr(args, "per_site", None) or getattr(args, "site_rate", None):
+        from services.site_limits import get_site_scheduler
+
+        get_site_scheduler().configure(max_concurrency=args.per_site, rate=args.site_rate)
+    if args.command in ("download", "relay", "serve", "worker"):
+        from services.site_limits import warn_if_capped
+
+        # -j above the per-site cap only helps when the jobs are spread over several sites
+        if warn_if_capped(args.jobs):
+            print("Raise the per-site cap with --per-site", file=sys.stderr)
+    if not any(getattr(args, name, None) for name in ("limit", "download_limit", "upload_limit")):
+        return
+    from services.bandwidth import get_scheduler, parse_rate
+
+    get_scheduler().set_limits(
+        total=parse_rate(args.limit),
+        download=parse_rate(args.download_limit),
+        upload=parse_rate(args.upload_limit)
+    )
+
+
+def _add_metrics_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--metrics-log", help="append job timings and event-loop lag as JSON lines to this file")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port")
+
+
+async def _run(args) -> int:
+    from services.metrics import configure_from_env, get_metrics, serve_metrics
+
+    if getattr(args, "metrics_log", None):
+        get_metrics().configure(args.metrics_log)
+    tasks = configure_from_env()
+    if getattr(args, "metrics_port", None):
+        tasks.append(asyncio.create_task(serve_metrics(port=args.metrics_port)))
+    try:
+        return await args.handler(args)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m services", description="YouTube downloader & uploader (headless)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    download = commands.add_parser("download", help="download one or more videos")
+    download.add_argument("urls", nargs="+")
+    download.add_argument("-f", "--format", default=DEFAULT_FORMAT, help="yt-dlp format string")
+    download.add_argument("-o", "--output", default=".", help="output directory")
+    download.add_argument("-j", "--jobs", type=int, default=3,
+                          help="parallel downloads, at most --per-site of them from one site")
+    download.add_argument("--priority", type=int, default=0)
+    download.add_argument("--playlist", action="store_true",
+                          help="download every video of a playlist or channel URL")
+    download.add_argument("--no-archive", action="store_true",
+                          help="with --playlist, don't skip videos already in the download archive")
+    download.add_argument("--no-convert", action="store_true",
+                          help="keep the downloaded container instead of remuxing/transcoding to MP4")
+    download.add_argument("--convert-jobs", type=int, default=POSTPROCESS_WORKERS,
+                          help="parallel ffmpeg conversions (default: a quarter of the CPU cores)")
+    _add_limit_args(download)
+    _add_metrics_args(download)
+    download.set_defaults(handler=run_downloads)
+
+    formats = commands.add_parser("formats", help="list the qualities a video actually has (exact format IDs)")
+    formats.add_argument("url")
+    formats.set_defaults(handler=list_formats)
+
+    library = commands.add_parser("library", help="list downloaded videos from the library index")
+    library_filter = library.add_mutually_exclusive_group()
+    library_filter.add_argument("--channel", help="channel ID or name")
+    library_filter.add_argument("--url", help="a video URL")
+    library.set_defaults(handler=query_library)
+
+    upload = commands.add_parser("upload", help="upload video files, folders or manifests")
+    upload.add_argument("paths", nargs="+")
+    upload.add_argument("-j", "--jobs", type=int, default=2, help="parallel uploads")
+    upload.add_argument("--privacy", default="private", choices=["public", "private", "unlisted"])
+    upload.add_argument("--title", help="title for a single video (default: file name)")
+    upload.add_argument("--description", help="description for a single video")
+    upload.add_argument("--thumbnail", help="custom thumbnail image for a single video")
+    upload.add_argument("--playlist", help="playlist ID to add the videos to (unless set per video)")
+    _add_limit_args(upload)
+    _add_metrics_args(upload)
+    upload.set_defaults(handler=run_uploads)
+
+    relay = commands.add_parser("relay", help="download videos and upload them again with their metadata")
+    relay.add_argument("urls", nargs="+")
+    relay_format = relay.add_mutually_exclusive_group()
+    relay_format.add_argument("-f", "--format", default=DEFAULT_FORMAT, help="yt-dlp format string")
+    relay_format.add_argument("--stream", action="store_true",
+                              help="prefer a single-file MP4 that is uploaded while it downloads")
+    relay.add_argument("-o", "--output", default=".", help="directory the downloads are kept in")
+    relay.add_argument("-j", "--jobs", type=int, default=2,
+                       help="parallel relays, at most --per-site of them from one site")
+    relay.add_argument("--privacy", default="private", choices=["public", "private", "unlisted"])
+    relay.add_argument("--title", help="title for a single video (default: the source video's)")
+    relay.add_argument("--description", help="description for a single video (default: the source video's)")
+    relay.add_argument("--playlist", help="playlist ID to add the uploaded videos to")
+    _add_limit_args(relay)
+    _add_metrics_args(relay)
+    relay.set_defaults(handler=run_relays)
+
+    serve_cmd = commands.add_parser("serve", help="run a long-lived worker (JSON jobs on stdin, or an HTTP API)")
+    serve_cmd.add_argument("-j", "--jobs", type=int, default=3,
+                           help="parallel downloads, at most --per-site of them from one site")
+    serve_cmd.add_argument("--upload-jobs", type=int, default=2, help="parallel uploads")
+    serve_cmd.add_argument("--convert-jobs", type=int, default=POSTPROCESS_WORKERS,
+                           help="parallel ffmpeg conversions")
+    serve_cmd.add_argument("-o", "--output", default=".", help="default output directory")
+    serve_cmd.add_argument("--http", action="store_true", help="serve the HTTP job API instead of reading stdin")
+    serve_cmd.add_argument("--host", default="127.0.0.1", help="HTTP API bind address")
+    serve_cmd.add_argument("--port", type=int, default=8765, help="HTTP API port")
+    _add_limit_args(serve_cmd)
+    _add_metrics_args(serve_cmd)
+    serve_cmd.set_defaults(handler=serve)
+
+    store_help = "job store: a SQLite path or URL such as sqlite:///mnt/shared/jobs.sqlite3 " \
+                 "(default: $YOUTUBE_UPLOADER_STORE, else jobs.sqlite3 in the data directory)"
+
+    worker = commands.add_parser("worker", help="run jobs from a job store shared by several machines")
+    worker.add_argument("--store", help=store_help)
+    worker.add_argument("--worker-id", help="name of this worker in the store (default: host name and PID)")
+    worker.add_argument("-j", "--jobs", type=int, default=3,
+                        help="parallel downloads, at most --per-site of them from one site")
+    worker.add_argument("--upload-jobs", type=int, default=2, help="parallel uploads and relays")
+    worker.add_argument("--convert-jobs", type=int, default=POSTPROCESS_WORKERS,
+                        help="parallel ffmpeg conversions")
+    worker.add_argument("-o", "--output", default=".", help="default output directory")
+    worker.add_argument("--types", default=",".join(WORKER_TYPES),
+                        help="comma-separated job types to take (default: all)")
+    worker.add_argument("--lease", type=float, default=LEASE_SECONDS,
+                        help="seconds before a silent worker's jobs are re-queued")
+    _add_limit_args(worker)
+    _add_metrics_args(worker)
+    worker.set_defaults(handler=run_worker)
+
+    submit = commands.add_parser("submit", help="add JSON job requests to a shared job store")
+    submit.add_argument("requests", nargs="*", help="JSON requests as for serve (default: one per line on stdin)")
+    submit.add_argument("--store", help=store_help)
+    submit.set_defaults(handler=submit_jobs)
+
+    jobs = commands.add_parser("jobs", help="list the jobs of a shared job store")
+    jobs.add_argument("--store", help=store_help)
+    jobs.add_argument("--status", choices=["queued", "running", "done", "failed", "cancelled"])
+    jobs.add_argument("--cancel", metavar="ID", help="cancel a queued or running job")
+    jobs.set_defaults(handler=list_store_jobs)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        _apply_limits(args)
+    except ValueError as e:
+        print(f"Invalid bandwidth limit: {e}", file=sys.stderr)
+        return 2
+    try:
+        return asyncio.run(_run(args))
+    except KeyboardInterrupt:
+        return 130
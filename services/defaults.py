@@ -0,0 +1,30 @@
+"""
+Defaults shared by the services and the command line.
+
+Imports nothing heavier than `os`, so the CLI can build its --help from these
+values without importing yt-dlp, the Google client libraries or the queues.
+The service modules import them from here under their usual names.
+"""
+import os
+
+# yt-dlp format of downloads when none is given
+DEFAULT_FORMAT = "bestvideo[height<=1080]+bestaudio/best[height<=1080]"
+
+# Prefers a single-file MP4 the upload can follow while it downloads, else the usual best merge
+STREAM_FORMAT = "best[ext=mp4][protocol^=http]/bestvideo[height<=1080]+bestaudio/best"
+
+# Concurrent ffmpeg processes. Each transcode is multithreaded itself, so a few
+# processes sharing the cores beat one per core.
+CPU_COUNT = os.cpu_count() or 2
+POSTPROCESS_WORKERS = max(1, CPU_COUNT // 4)
+
+# Concurrent downloads per site, and how many may start per second (with a burst of that many)
+SITE_CONCURRENCY = 3
+SITE_RATE = 2.0
+
+# Request types a worker's download and upload queues run
+DOWNLOAD_TYPES = ("download", "playlist")
+UPLOAD_TYPES = ("upload", "relay")
+
+# Seconds a claimed job stays with its worker without a heartbeat
+LEASE_SECONDS = 60.0
@@ -0,0 +1,323 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.downloader import (
+    archive_id, archive_path, async_download_youtube_video, read_archive, resolve_playlist
+)
+from services.job_queue import Job, JobQueue, JobStatus
+from services.journal import DownloadJournal, discard_partials, get_journal, partial_bytes
+from services.postprocess import DEFAULT_WORKERS, PostProcessor
+
+# Upper bound for download threads; the queue itself limits how many are busy
+MAX_DOWNLOAD_THREADS = 32
+
+
+class DownloadQueue(JobQueue):
+    """
+    Download queue running up to `max_workers` yt-dlp downloads in parallel.
+
+    Usable both from the GUI and headless:
+
+        queue = DownloadQueue(max_workers=4)
+        for url in urls:
+            queue.submit_download(url, "best", output_dir="videos")
+        await queue.join()
+
+    Once a video's bytes are on disk its worker slot is released and the MP4
+    conversion waits for the separate post-processing pool, so the next
+    download starts while ffmpeg runs.
+
+    Playlists and channels are one "playlist" job whose entries are queued as
+    separate download jobs, so they share the same worker pool.
+
+    Downloads are kept in a journal (services.journal) until they finish.
+    Pausing keeps a download's partial files; `restore` queues the downloads
+    an earlier process left unfinished, continuing their partial files.
+    Cancelling discards them.
+    """
+
+    kind = "download"
+
+    def __init__(self, max_workers: int = 3, postprocess_workers: int = DEFAULT_WORKERS,
+                 journal: DownloadJournal | None = None):
+        """
+        Args:
+            max_workers (int, optional): Concurrent downloads (network stage).
+            postprocess_workers (int, optional): Concurrent ffmpeg conversions (CPU stage).
+            journal (DownloadJournal, optional): Journal of unfinished downloads. Shared journal if None.
+        """
+        super().__init__(max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(MAX_DOWNLOAD_THREADS, max_workers),
+            thread_name_prefix="download"
+        )
+        self.postprocessor = PostProcessor(postprocess_workers)
+        # Playlist job ID -> IDs of its entry jobs
+        self._children: dict[str, list[str]] = {}
+        self.journal = journal or get_journal()
+        # Job ID -> status last written to the journal
+        self._journaled: dict[str, JobStatus] = {}
+        self._stopping = False
+        self.add_listener(self._on_entry_update)
+        self.add_listener(self._journal_job)
+
+    def submit_download(
+        self,
+        url: str,
+        format_str: str = "best",
+        output_dir: str = ".",
+        priority: int = 0,
+        convert: str = "auto",
+        **extra
+    ) -> Job:
+        """
+        Queue a single video download.
+
+        Args:
+            url (str): Video URL.
+            format_str (str, optional): yt-dlp format string.
+            output_dir (str, optional): Directory to save the video to.
+            priority (int, optional): Higher values start first.
+            convert (str, optional): "auto" to end up with an MP4 (remuxing when possible),
+                "never" to keep the downloaded container.
+            **extra: Additional values stored in job params (e.g. a display title).
+
+        Returns:
+            Job: The queued job.
+        """
+        params = {"url": url, "format_str": format_str, "output_dir": output_dir, "convert": convert, **extra}
+        return self.submit(Job(kind=self.kind, params=params, priority=priority))
+
+    def submit_playlist(
+        self,
+        url: str,
+        format_str: str = "best",
+        output_dir: str = ".",
+        priority: int = 0,
+        skip_archived: bool = True,
+        convert: str = "auto",
+        **extra
+    ) -> Job:
+        """
+        Queue every video of a playlist or channel as one job.
+
+        The entries are listed with flat extraction and then downloaded by the
+        queue's workers in playlist order. Downloaded videos are recorded in a
+        download archive in `output_dir`, and entries already in it are skipped.
+        The job's `stats` hold completed/failed/skipped/total entry counts and
+        the aggregate download speed (`bytes`, `speed` in bytes/s).
+
+        Args:
+            url (str): Playlist or channel URL.
+            format_str (str, optional): yt-dlp format string for every entry.
+            output_dir (str, optional): Directory to save the videos to.
+            priority (int, optional): Priority of the playlist and its entries.
+            skip_archived (bool, optional): Skip entries listed in the download archive.
+            convert (str, optional): Post-processing mode for every entry (see submit_download).
+            **extra: Additional values stored in job params.
+
+        Returns:
+            Job: The queued playlist job. Its result is the list of downloaded file paths.
+        """
+        params = {
+            "url": url,
+            "format_str": format_str,
+            "output_dir": output_dir,
+            "skip_archived": skip_archived,
+            "convert": convert,
+            **extra
+        }
+        return self.submit(Job(kind="playlist", params=params, priority=priority))
+
+    def cancel(self, job_id: str, discard: bool = True) -> bool:
+        """
+        Cancel a download, or a playlist and its entries.
+
+        Args:
+            job_id (str): Job to cancel.
+            discard (bool, optional): Delete the partial files. They are always kept when
+                the queue is stopping, for `restore`.
+        """
+        ids = [job_id, *self._children.get(job_id, [])]
+        if discard and not self._stopping:
+            # Cancelled by the user rather than by shutting down: partial files can go
+            for cancelled_id in ids:
+                if cancelled_id in self.jobs:
+                    self.jobs[cancelled_id].cancel_flag["discard"] = True
+        cancelled = super().cancel(job_id)
+        for child_id in ids[1:]:
+            super().cancel(child_id)
+        return cancelled
+
+    def pause(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is not None and job.kind == "playlist":
+            # The playlist job only waits for its entries
+            return any([super().pause(child_id) for child_id in self._children.get(job_id, [])])
+        return super().pause(job_id)
+
+    def resume(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is not None and job.kind == "playlist":
+            return any([super().resume(child_id) for child_id in self._children.get(job_id, [])])
+        return super().resume(job_id)
+
+    def restore(self, include_paused: bool = True) -> list[Job]:
+        """
+        Queue the downloads an earlier process left in the journal.
+
+        Paused downloads come back paused. Playlist entries come back as plain
+        downloads (still recorded in their playlist's download archive).
+
+        Args:
+            include_paused (bool, optional): Also restore paused downloads. Leave them in
+                the journal when nothing could resume them (`join` would wait forever).
+
+        Returns:
+            list[Job]: The restored jobs.
+        """
+        jobs = []
+        for entry in self.journal.entries():
+            paused = entry["status"] == JobStatus.PAUSED.value
+            if entry["id"] in self.jobs or (paused and not include_paused):
+                continue
+            params = {key: value for key, value in entry["params"].items() if key != "parent"}
+            if entry["formats"]:
+                params["pinned_format"] = entry["formats"]
+            job = Job(
+                kind=entry["kind"],
+                params=params,
+                priority=entry["priority"],
+                id=entry["id"],
+                created_at=entry["created_at"],
+                status=JobStatus.PAUSED if paused else JobStatus.QUEUED,
+            )
+            job.stats["resumed"] = {
+                "bytes": partial_bytes(entry),
+                "fragments": entry["fragments"],
+                "fragment_count": entry["fragment_count"],
+            }
+            jobs.append(self.submit(job))
+        return jobs
+
+    async def run_job(self, job: Job):
+        if job.kind == "playlist":
+            return await self._run_playlist(job)
+
+        def on_progress(progress):
+            self.report(job, progress)
+
+        return await async_download_youtube_video(
+            job.params["url"],
+            job.params["format_str"],
+            on_progress,
+            job.params["output_dir"],
+            job.cancel_flag,
+            executor=self._executor,
+            download_archive=job.params.get("download_archive"),
+            convert=job.params.get("convert", "auto"),
+            stats=job.stats,
+            postprocessor=self.postprocessor,
+            on_downloaded=lambda: self._on_downloaded(job),
+            pinned_format=job.params.get("pinned_format"),
+            journal_hook=lambda *progress: self.journal.update_download(job.id, *progress)
+        )
+
+    def _on_downloaded(self, job: Job):
+        # The file only waits for ffmpeg now; let the next download use the slot
+        self.release_slot(job)
+        self._notify(job)
+
+    async def _run_playlist(self, job: Job) -> list[str]:
+        loop = asyncio.get_running_loop()
+        params = job.params
+        playlist = await loop.run_in_executor(self._executor, resolve_playlist, params["url"])
+        if job.cancel_flag.get("cancel"):
+            raise Exception("Download cancelled by user")
+
+        os.makedirs(params["output_dir"], exist_ok=True)
+        archive = archive_path(params["output_dir"])
+        archived = read_archive(archive) if params["skip_archived"] else set()
+        entries = playlist["entries"]
+        pending = [entry for entry in entries if archive_id(entry) not in archived]
+        params.setdefault("title", playlist["title"] or params["url"])
+        job.stats = {
+            "total": len(entries),
+            "skipped": len(entries) - len(pending),
+            "completed": len(entries) - len(pending),
+            "failed": 0,
+            "bytes": 0,
+            "speed": 0.0,
+        }
+
+        children = []
+        self._children[job.id] = []
+        for entry in pending:
+            child = Job(kind=self.kind, priority=job.priority, params={
+                "url": entry["url"],
+                "format_str": params["format_str"],
+                "output_dir": params["output_dir"],
+                "title": entry["title"] or entry["url"],
+                "parent": job.id,
+                "download_archive": archive,
+                "convert": params["convert"],
+            })
+            self._children[job.id].append(child.id)
+            children.append(self.submit(child))
+
+        # Entries do the work; the playlist job shouldn't hold a worker slot meanwhile
+        self.release_slot(job)
+        self._update_playlist(job)
+        await asyncio.gather(*(self.wait(child.id) for child in children))
+
+        if job.cancel_flag.get("cancel"):
+            raise Exception("Download cancelled by user")
+        if children and all(child.status is not JobStatus.DONE for child in children):
+            raise Exception(f"All {len(children)} playlist entries failed")
+        return [child.result for child in children if child.status is JobStatus.DONE and child.result]
+
+    def _on_entry_update(self, job: Job):
+        parent = self.jobs.get(job.params.get("parent"))
+        if parent is not None and not parent.finished:
+            self._update_playlist(parent)
+
+    def _journal_job(self, job: Job):
+        if job.kind != self.kind:
+            return
+        if not job.finished:
+            # Progress updates don't change the entry; only write status changes
+            if self._journaled.get(job.id) is not job.status:
+                self.journal.record(job)
+                self._journaled[job.id] = job.status
+            return
+        self._journaled.pop(job.id, None)
+        if job.status is JobStatus.CANCELLED and not job.cancel_flag.get("discard"):
+            # Interrupted by shutdown: resume it next time
+            return
+        entry = self.journal.remove(job.id)
+        if entry is not None and job.status is JobStatus.CANCELLED:
+            discard_partials(entry)
+
+    def _update_playlist(self, job: Job):
+        """Recompute a playlist job's counts, aggregate speed and overall progress."""
+        children = [self.jobs[child_id] for child_id in self._children.get(job.id, [])]
+        stats = job.stats
+        stats["completed"] = stats["skipped"] + sum(1 for c in children if c.status is JobStatus.DONE)
+        stats["failed"] = sum(1 for c in children if c.status in (JobStatus.FAILED, JobStatus.CANCELLED))
+        stats["bytes"] = sum(c.stats.get("bytes", 0) for c in children)
+        elapsed = time.time() - job.started_at
+        stats["speed"] = stats["bytes"] / elapsed if elapsed > 0 else 0.0
+
+        running = sum(c.progress for c in children if c.status is JobStatus.RUNNING) / 100
+        finished = stats["completed"] + stats["failed"]
+        total = stats["total"]
+        self.update_progress(job, (finished + running) * 100 / total if total else 100)
+
+    async def stop(self):
+        # Unfinished downloads stay in the journal for `restore`
+        self._stopping = True
+        await super().stop()
+        self._executor.shutdown(wait=False)
+        self.postprocessor.shutdown()
@@ -1,6 +1,138 @@
 import asyncio
 import os
-from yt_dlp import YoutubeDL
+import time
+
+from services.bandwidth import DOWNLOAD, get_scheduler
+from services.formats import fallback_format, format_available, quality_ladder
+from services.library import get_library
+from services.metadata_cache import canonical_key, get_metadata_cache
+from services.metrics import StageTimer
+from services.postprocess import MERGE_OUTPUT_FORMAT, MP4_FORMAT_SORT, get_postprocessor
+from services.progress import ProgressReporter
+from services.site_limits import (
+    CANCELLED, MAX_ATTEMPTS, RETRYABLE, WAIT_POLL, backoff, classify_error, get_site_scheduler, site_for
+)
+
+# Options shared by metadata extraction and downloads
+EXTRACT_OPTS = {
+    "playlist_items": "1",
+}
+
+# File in the output directory listing already downloaded videos (yt-dlp download archive)
+ARCHIVE_NAME = ".download-archive.txt"
+
+# Nested playlists (e.g. a channel's Videos/Shorts/Live tabs) are followed this deep
+MAX_PLAYLIST_DEPTH = 3
+NESTED_PLAYLIST_IES = ("YoutubeTab", "YoutubePlaylist")
+
+
+def extract_info_cached(url: str, refresh: bool = False) -> dict:
+    """
+    Extract video metadata without downloading, reusing the on-disk cache.
+
+    Blocking; call it from an executor.
+
+    Args:
+        url (str): Video URL.
+        refresh (bool, optional): Ignore the cached entry and extract again.
+
+    Returns:
+        dict: Sanitized yt-dlp info dict.
+    """
+    from yt_dlp import YoutubeDL
+
+    cache = get_metadata_cache()
+    key = canonical_key(url)
+    if not refresh:
+        info = cache.get(key)
+        if info is not None:
+            return info
+
+    with YoutubeDL({**EXTRACT_OPTS, "quiet": True, "skip_download": True}) as ydl:
+        info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+    cache.put(key, info)
+    return info
+
+
+def archive_path(output_dir: str) -> str:
+    """Path of the download archive kept in an output directory."""
+    return os.path.join(output_dir, ARCHIVE_NAME)
+
+
+def read_archive(path: str) -> set[str]:
+    """
+    Read a yt-dlp download archive.
+
+    Returns:
+        set[str]: "<extractor> <video id>" lines; empty if the archive doesn't exist.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {line.strip() for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def archive_id(entry: dict) -> str | None:
+    """Archive line for a playlist entry, in yt-dlp's "<extractor> <id>" format."""
+    extractor = entry.get("ie_key") or entry.get("extractor_key")
+    if not extractor or not entry.get("id"):
+        return None
+    return f"{extractor.lower()} {entry['id']}"
+
+
+def resolve_playlist(url: str) -> dict:
+    """
+    List the videos of a playlist or channel without extracting each of them.
+
+    Uses flat extraction, so a 500-video channel costs a few page requests
+    instead of 500 full extractions. Nested playlists (channel tabs) are
+    followed. Blocking; call it from an executor.
+
+    Args:
+        url (str): Playlist or channel URL.
+
+    Returns:
+        dict: {"title": ..., "entries": [{"id", "url", "title", "ie_key"}, ...]} in playlist order,
+            without duplicates.
+    """
+    from yt_dlp import YoutubeDL
+
+    opts = {"quiet": True, "skip_download": True, "extract_flat": "in_playlist"}
+    entries = []
+    seen = set()
+
+    with YoutubeDL(opts) as ydl:
+        def collect(info: dict, depth: int):
+            for entry in info.get("entries") or []:
+                if not entry:
+                    continue
+                if entry.get("_type") == "playlist":
+                    collect(entry, depth)
+                    continue
+                if entry.get("ie_key") in NESTED_PLAYLIST_IES:
+                    if depth < MAX_PLAYLIST_DEPTH:
+                        collect(ydl.extract_info(entry["url"], download=False), depth + 1)
+                    continue
+                url = entry.get("webpage_url") or entry.get("url")
+                key = archive_id(entry) or url
+                if not url or key in seen:
+                    continue
+                seen.add(key)
+                entries.append({
+                    "id": entry.get("id"),
+                    "url": url,
+                    "title": entry.get("title"),
+                    "ie_key": entry.get("ie_key") or info.get("extractor_key"),
+                })
+
+        info = ydl.extract_info(url, download=False)
+        if info.get("_type", "video") == "video":
+            # Not a playlist after all: a single entry
+            info = {"entries": [{**info, "ie_key": info.get("extractor_key")}]}
+        collect(info, 0)
+
+    return {"title": info.get("title"), "entries": entries}
 
 
 async def async_download_youtube_video(
@@ -8,7 +140,19 @@ async def async_download_youtube_video(
     format_str: str,
     progress_hook=None,
     output_dir=".",
-    cancel_flag=None
+    cancel_flag=None,
+    executor=None,
+    download_archive=None,
+    convert="auto",
+    stats=None,
+    postprocessor=None,
+    on_downloaded=None,
+    library=None,
+    scheduler=None,
+    write_hook=None,
+    pinned_format=None,
+    journal_hook=None,
+    site_scheduler=None
 ) -> str:
     """
     Asynchronously download a YouTube video using yt_dlp.
@@ -16,97 +160,263 @@ async def async_download_youtube_video(
     Args:
         url (str): YouTube video URL.
         format_str (str): Desired download format string.
-        progress_hook (Callable, optional): Callback for progress updates.
+        progress_hook (Callable, optional): Called on the event loop thread with a
+            services.progress.Progress, at most every PROGRESS_INTERVAL seconds.
         output_dir (str, optional): Directory to save downloaded video.
         cancel_flag (dict, optional): Flag to cancel download if cancel_flag["cancel"] is True.
+        executor (Executor, optional): Executor to run the blocking download in. Default executor if None.
+        download_archive (str, optional): yt-dlp download archive to record the video in.
+        convert (str, optional): "auto" prefers MP4-compatible formats and remuxes or transcodes
+            into MP4 only as needed; "never" keeps the downloaded container.
+        stats (dict, optional): Receives "stage" ("download", then "postprocess"),
+            "postprocess": "none", "remux", "transcode" or "skipped", "retries",
+            "timings" (seconds per stage, see services.metrics) and, once known, the video's
+            "channel" and "thumbnail" URL.
+        postprocessor (PostProcessor, optional): Pool for the MP4 conversion. Shared pool if None.
+        on_downloaded (Callable, optional): Called once the network stage is done, before
+            the file is queued for conversion (e.g. to free a download slot).
+        library (Library, optional): Index of downloaded files. Shared index if None. A video
+            already indexed in the same format is returned without downloading
+            (stats["library"] = "hit"); new downloads are added to it.
+        scheduler (BandwidthScheduler, optional): Bandwidth caps to download within, also
+            used to pick the fragment concurrency. Shared scheduler if None.
+        write_hook (Callable, optional): Called on the download thread with (file path,
+            bytes written, finished) as the file grows. Passing one makes yt-dlp write the
+            file front to back under its final name, one fragment at a time and without
+            fixups, so it can be read while it is being written (see services.relay).
+        pinned_format (str, optional): Exact format IDs (e.g. "137+140") an earlier, interrupted
+            run of this download picked. Used instead of resolving `format_str` again while
+            they are still available, so its partial files are continued.
+        journal_hook (Callable, optional): Called on the download thread with (format IDs,
+            file name, partial file name, fragment index, fragment count) on every progress
+            report, to journal what a restart needs to resume (see services.journal).
+        site_scheduler (SiteScheduler, optional): Per-site concurrency and start-rate limits
+            (see services.site_limits). Shared scheduler if None. Throttled and transient
+            failures are retried up to MAX_ATTEMPTS times with jittered backoff.
 
     Returns:
         str: Final video file path.
     """
     loop = asyncio.get_running_loop()
+    library = library or get_library()
+    scheduler = scheduler or get_scheduler()
+    site_scheduler = site_scheduler or get_site_scheduler()
+    timer = StageTimer("download", stats)
+
+    def lookup():
+        key = canonical_key(url)
+        return key, library.lookup(key, format_str)
+
+    key, entry = await loop.run_in_executor(executor, timer.timed(lookup, "library"))
+    if entry is not None:
+        if stats is not None:
+            stats["library"] = "hit"
+            stats["channel"] = entry["channel"]
+        return entry["path"]
+
+    site = site_for(key)
+    reporter = ProgressReporter(progress_hook, loop) if progress_hook else None
 
     def blocking_download():
+        # Imported here so that importing this module stays cheap for the CLI
+        from yt_dlp import YoutubeDL
+        from yt_dlp.utils import DownloadError
+
         output_path = os.path.join(output_dir, "%(title).100s.%(ext)s")
+        # Bytes per output file, so separate video and audio streams add up
+        file_bytes = {}
+        file_totals = {}
+
+        # Fragments must arrive in order for the file to be readable while it grows
+        fragments = 1 if write_hook else scheduler.fragment_concurrency(DOWNLOAD)
+        pp_started = {}
+        pp_seconds = 0.0
 
         def yt_progress_hook(d):
             if cancel_flag and cancel_flag.get("cancel", False):
                 raise Exception("Download cancelled by user")
 
-            if progress_hook:
-                status = d.get("status")
-                if status == "downloading":
-                    total_bytes = d.get("total_bytes") or d.get("total_bytes_estimate")
-                    downloaded_bytes = d.get("downloaded_bytes", 0)
-                    if total_bytes:
-                        percent = downloaded_bytes / total_bytes * 100
-                        loop.call_soon_threadsafe(progress_hook, percent)
-                elif status == "finished":
-                    loop.call_soon_threadsafe(progress_hook, 100)
+            if write_hook and d.get("filename"):
+                # "Already downloaded" reports only carry the total
+                written = d.get("downloaded_bytes") or d.get("total_bytes") or 0
+                write_hook(d["filename"], written, d.get("status") == "finished")
+
+            if journal_hook and d.get("tmpfilename"):
+                info = d.get("info_dict") or {}
+                # Merged downloads report each stream separately; pin all of them
+                requested = info.get("requested_formats") or [info]
+                formats = "+".join(f["format_id"] for f in requested if f.get("format_id")) or None
+                journal_hook(formats, d["filename"], d["tmpfilename"], d.get("fragment_index"), d.get("fragment_count"))
+
+            if d.get("downloaded_bytes") is not None:
+                name = d.get("filename")
+                # A resumed download (continuedl) first reports the bytes already in its
+                # .part file; only what arrives after that counts against the bandwidth cap
+                previous = file_bytes.get(name, d["downloaded_bytes"])
+                file_bytes[name] = d["downloaded_bytes"]
+                total = d.get("total_bytes") or d.get("total_bytes_estimate")
+                if total:
+                    file_totals[name] = total
+                if reporter:
+                    reporter.update(sum(file_bytes.values()), sum(file_totals.values()) or None)
+                # Blocks this download thread while it is ahead of its bandwidth share
+                stream.consume(d["downloaded_bytes"] - previous)
+
+        def yt_postprocessor_hook(d):
+            # Times yt-dlp's own post-processors (Merger, fixups) as "ytdlp_<name>"
+            nonlocal pp_seconds
+            name = d.get("postprocessor") or "unknown"
+            if d.get("status") == "started":
+                pp_started[name] = time.perf_counter()
+            elif d.get("status") == "finished" and name in pp_started:
+                seconds = time.perf_counter() - pp_started.pop(name)
+                pp_seconds += seconds
+                timer.record(f"ytdlp_{name.lower()}", seconds)
+
+        def retry_counter(kind):
+            def sleep(n):
+                timer.count_retry(kind)
+                # Same as yt-dlp's default: retry right away
+                return 0
+            return sleep
 
         ydl_opts = {
             "format": format_str,
             "outtmpl": output_path,
-            "overwrites": True,
             "windowsfilenames": True,
             "progress_hooks": [yt_progress_hook],
-            "postprocessors": [
-                {"key": "FFmpegMerger"},
-                {
-                    "key": "FFmpegVideoConvertor",
-                    "preferedformat": "mp4",  # yt_dlp uses this exact spelling
-                }
-            ],
-            "concurrent_fragment_downloads": 3,
-            "playlist_items": "1",
-
+            "postprocessor_hooks": [yt_postprocessor_hook],
+            "retry_sleep_functions": {kind: retry_counter(kind) for kind in ("http", "fragment", "extractor")},
+            "concurrent_fragment_downloads": fragments,
+            # Continue .part files and fragment downloads (.ytdl) left by an interrupted run
+            "continuedl": True,
+            **EXTRACT_OPTS,
         }
+        if convert != "never":
+            # Pick streams that fit MP4 and merge them by stream copy; to_mp4 handles the rest
+            ydl_opts["format_sort"] = MP4_FORMAT_SORT
+            ydl_opts["merge_output_format"] = MERGE_OUTPUT_FORMAT
+        if download_archive:
+            ydl_opts["download_archive"] = download_archive
+        if write_hook:
+            # No .part file to rename and no fixup rewriting the file afterwards
+            ydl_opts.update({"nopart": True, "fixup": "never"})
 
-        try:
-            with YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-        except KeyError as e:
-            print("❌ KeyError:", e)
-            print("⚠️ Falling back to format='best'")
-            ydl_opts["format"] = "best"
-            with YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-
-        final_path = info.get("_filename")
-
-        # Ensure the file has .mp4 extension (after ffmpeg conversion)
-        if final_path and not final_path.lower().endswith(".mp4"):
-            base, _ = os.path.splitext(final_path)
-            final_path = base + ".mp4"
+        def run_download(extracted: dict) -> dict:
+            nonlocal pp_seconds
+            pp_seconds = 0.0
+            started = time.perf_counter()
+            try:
+                with YoutubeDL(ydl_opts) as ydl:
+                    return ydl.process_ie_result(extracted, download=True)
+            finally:
+                # The network part only; yt-dlp's post-processors are timed on their own
+                timer.record("download", time.perf_counter() - started - pp_seconds)
+
+        # Extraction counts against the site's limits too: it is most of the requests
+        with site_scheduler.slot(site, cancel_flag) as waited:
+            timer.record("site_wait", waited)
+            # Reuse the metadata extracted for the preview instead of extracting again
+            with timer.stage("extract"):
+                extracted = extract_info_cached(url)
+            if pinned_format and format_available(extracted, pinned_format):
+                ydl_opts["format"] = pinned_format
+            elif not format_available(extracted, format_str):
+                # Resolve to the best existing quality up front instead of failing mid-download
+                print(f"⚠️ Format {format_str!r} not available, using the best available quality")
+                ydl_opts["format"] = fallback_format(extracted)
+            stream = scheduler.open(DOWNLOAD, fragments)
+            try:
+                info = run_download(extracted)
+            except DownloadError as e:
+                if "HTTP Error 403" not in str(e):
+                    raise
+                # Cached media URLs have expired; extract once more and retry.
+                # Repeated 403s after that are the site refusing us (see SiteScheduler.release)
+                timer.count_retry("extract")
+                with timer.stage("extract"):
+                    extracted = extract_info_cached(url, refresh=True)
+                info = run_download(extracted)
+            finally:
+                stream.close()
 
+        downloads = info.get("requested_downloads") or [{}]
+        final_path = downloads[0].get("filepath") or info.get("filepath") or info.get("_filename")
+        return final_path, info
+
+    if stats is not None:
+        stats["stage"] = "download"
+    attempt = 1
+    try:
+        while True:
+            try:
+                final_path, info = await loop.run_in_executor(
+                    executor, timer.timed(blocking_download, wait="executor_wait")
+                )
+                break
+            except Exception as e:
+                kind = CANCELLED if cancel_flag and cancel_flag.get("cancel") else classify_error(e)
+                if kind not in RETRYABLE or attempt >= MAX_ATTEMPTS:
+                    raise
+                delay = backoff(attempt)
+                timer.count_retry(kind)
+                print(f"⚠️ Download from {site} failed ({kind}), retry {attempt}/{MAX_ATTEMPTS - 1} in {delay:.0f}s:", e)
+                await _sleep_unless_cancelled(delay, cancel_flag)
+                attempt += 1
+    finally:
+        if reporter:
+            reporter.finish()
+    skipped = not final_path or not os.path.exists(final_path)
+    if stats is not None:
+        stats["channel"] = info.get("channel") or info.get("uploader")
+        stats["thumbnail"] = info.get("thumbnail")
+        if not skipped:
+            stats["stage"] = "postprocess"
+    if on_downloaded:
+        on_downloaded()
+    if skipped:
+        # Skipped by the download archive, nothing to post-process
         return final_path
 
-    return await loop.run_in_executor(None, blocking_download)
+    # CPU stage: runs in its own bounded pool so the download thread is free again
+    postprocessor = postprocessor or get_postprocessor()
+    final_path, action = await postprocessor.to_mp4(
+        final_path, info.get("vcodec"), info.get("acodec"), convert, timer=timer
+    )
+    if stats is not None:
+        stats["postprocess"] = action
+    await postprocessor.run(library.record, key, format_str, final_path, info, timer=timer, stage="index")
+    return final_path
+
+
+async def _sleep_unless_cancelled(seconds: float, cancel_flag: dict | None):
+    deadline = time.monotonic() + seconds
+    while (remaining := deadline - time.monotonic()) > 0:
+        if cancel_flag and cancel_flag.get("cancel"):
+            raise Exception("Download cancelled by user")
+        await asyncio.sleep(min(remaining, WAIT_POLL))
 
 
 async def async_get_video_info(url: str) -> dict:
     """
-    Asynchronously fetch basic YouTube video metadata (title and thumbnail URL).
+    Asynchronously fetch basic YouTube video metadata (title, thumbnail URL and qualities).
 
     Args:
         url (str): YouTube video URL.
 
     Returns:
-        dict: Dictionary with 'title' and 'thumbnail' keys.
+        dict: Dictionary with 'title', 'thumbnail' and 'formats' (see formats.quality_ladder) keys.
     """
     loop = asyncio.get_running_loop()
 
     def blocking_info():
         try:
-            ydl_opts = {
-                "quiet": True,
-                "skip_download": True,
+            info = extract_info_cached(url)
+            return {
+                "title": info.get("title"),
+                "thumbnail": info.get("thumbnail"),
+                "formats": quality_ladder(info),
             }
-            with YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                return {
-                    "title": info.get("title"),
-                    "thumbnail": info.get("thumbnail"),
-                }
         except Exception as e:
             print("❌ Error fetching video info:", e)
             return {}
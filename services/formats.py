@@ -0,0 +1,146 @@
+"""
+Format planning from an already extracted info dict.
+
+Turns yt-dlp's `formats` list into the quality ladder that actually exists for
+a video, one rung per resolution, each with exact format IDs, so downloads
+never ask for a format the video doesn't have.
+"""
+from services.postprocess import MP4_AUDIO_CODECS, MP4_VIDEO_CODECS, codec_name
+
+CODEC_LABELS = {
+    "avc1": "H.264", "avc3": "H.264", "h264": "H.264",
+    "hev1": "HEVC", "hvc1": "HEVC", "hevc": "HEVC", "h265": "HEVC",
+    "vp09": "VP9", "vp9": "VP9", "vp8": "VP8", "av01": "AV1",
+    "mp4a": "AAC", "aac": "AAC", "opus": "Opus", "vorbis": "Vorbis", "mp3": "MP3",
+}
+
+
+def _bitrate(fmt: dict) -> float:
+    return fmt.get("tbr") or fmt.get("vbr") or fmt.get("abr") or 0
+
+
+def estimate_size(fmt: dict, duration: float | None) -> int | None:
+    """Size in bytes from the reported file size, or bitrate (kbit/s) x duration."""
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    if size:
+        return int(size)
+    if _bitrate(fmt) and duration:
+        return int(_bitrate(fmt) * 1000 / 8 * duration)
+    return None
+
+
+def _best_audio(formats: list[dict], prefer_mp4: bool) -> dict | None:
+    audio = [
+        f for f in formats
+        if codec_name(f.get("acodec")) and not codec_name(f.get("vcodec")) and f.get("format_id")
+    ]
+    if not audio:
+        return None
+    return max(audio, key=lambda f: (
+        prefer_mp4 and codec_name(f.get("acodec")) in MP4_AUDIO_CODECS,
+        f.get("abr") or _bitrate(f),
+    ))
+
+
+def quality_ladder(info: dict, prefer_mp4: bool = True) -> list[dict]:
+    """
+    Compute the available qualities of a video, best first.
+
+    Args:
+        info (dict): Extracted yt-dlp info dict.
+        prefer_mp4 (bool, optional): At each resolution prefer MP4-compatible codecs
+            (no transcode needed) over slightly better compressed ones.
+
+    Returns:
+        list[dict]: Rungs with "label", "format_id" (exact yt-dlp format spec, e.g. "137+140"),
+            "height", "fps", "vcodec", "acodec", "tbr" and "size" (estimated bytes or None).
+            The last rung is audio only when the video has separate audio streams.
+    """
+    formats = info.get("formats") or []
+    duration = info.get("duration")
+    audio = _best_audio(formats, prefer_mp4)
+
+    best_per_height = {}
+    for f in formats:
+        vcodec = codec_name(f.get("vcodec"))
+        if not vcodec or not f.get("height") or not f.get("format_id"):
+            continue
+        key = (f["height"], (f.get("fps") or 30) > 30)
+        rank = (prefer_mp4 and vcodec in MP4_VIDEO_CODECS, _bitrate(f))
+        current = best_per_height.get(key)
+        if current is None or rank > current[0]:
+            best_per_height[key] = (rank, f)
+
+    ladder = []
+    for (height, high_fps), (_, video) in sorted(best_per_height.items(), reverse=True):
+        muxed = codec_name(video.get("acodec")) is not None
+        sound = None if muxed else audio
+        format_id = video["format_id"] if sound is None else f"{video['format_id']}+{sound['format_id']}"
+        sizes = [estimate_size(f, duration) for f in (video, sound) if f]
+        vcodec = codec_name(video.get("vcodec"))
+        acodec = codec_name((sound or video).get("acodec"))
+        size = sum(sizes) if all(sizes) else None
+
+        label = f"{height}p{int(video['fps'])}" if high_fps else f"{height}p"
+        label += f" · {CODEC_LABELS.get(vcodec, vcodec)}"
+        if size:
+            label += f" · ~{size / (1024 * 1024):.0f} MB"
+        ladder.append({
+            "label": label,
+            "format_id": format_id,
+            "height": height,
+            "fps": video.get("fps"),
+            "vcodec": vcodec,
+            "acodec": acodec,
+            "tbr": _bitrate(video) + (_bitrate(sound) if sound else 0),
+            "size": size,
+        })
+
+    if audio is not None:
+        acodec = codec_name(audio.get("acodec"))
+        size = estimate_size(audio, duration)
+        label = f"Audio only · {CODEC_LABELS.get(acodec, acodec)} {audio.get('abr') or _bitrate(audio):.0f}k"
+        if size:
+            label += f" · ~{size / (1024 * 1024):.0f} MB"
+        ladder.append({
+            "label": label,
+            "format_id": audio["format_id"],
+            "height": None,
+            "fps": None,
+            "vcodec": None,
+            "acodec": acodec,
+            "tbr": _bitrate(audio),
+            "size": size,
+        })
+    return ladder
+
+
+def fallback_format(info: dict) -> str:
+    """Exact format spec of the best available quality, or "best" if there's no ladder."""
+    ladder = quality_ladder(info)
+    return ladder[0]["format_id"] if ladder else "best"
+
+
+# yt-dlp selector keywords; specs using them are resolved by yt-dlp itself
+SELECTOR_KEYWORDS = (
+    "best", "worst", "bestvideo", "worstvideo", "bestaudio", "worstaudio",
+    "b", "w", "bv", "wv", "ba", "wa", "all", "mergeall",
+)
+
+
+def format_available(info: dict, format_spec: str) -> bool:
+    """
+    Check an exact format spec ("137+140", "22/18") against the extracted formats.
+
+    Selector expressions ("bestvideo[height<=720]+bestaudio/best") can fall back
+    on their own and are always considered available.
+    """
+    ids = {f.get("format_id") for f in info.get("formats") or []}
+    if not ids:
+        # Nothing to check against (e.g. a direct media URL)
+        return True
+    alternatives = [alternative.split("+") for alternative in format_spec.split("/")]
+    tokens = [token for parts in alternatives for token in parts]
+    if any(token in SELECTOR_KEYWORDS or not token.replace("-", "").replace("_", "").isalnum() for token in tokens):
+        return True
+    return any(all(token in ids for token in parts) for parts in alternatives)
@@ -0,0 +1,205 @@
+"""
+Persistent history of download and upload jobs, for the GUI's job list.
+
+Every job is written when it is queued and again whenever its status
+changes (not on progress updates), together with what the list shows: title,
+channel, thumbnail URL and result. Queries are paged and filtered by status,
+channel and date in SQL, so the list only ever loads the rows it shows.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from services.paths import data_path
+
+COLUMNS = (
+    "id", "kind", "status", "title", "source", "channel", "thumbnail", "parent",
+    "result", "error", "created_at", "finished_at",
+)
+
+# Statuses of jobs that haven't finished
+ACTIVE_STATUSES = ("queued", "running", "paused")
+
+
+def job_row(job) -> dict:
+    """History entry of a job (services.job_queue.Job)."""
+    params = job.params
+    result = job.result
+    if isinstance(result, dict):
+        # Upload response, or a relay's response plus the local path
+        result = f"https://youtu.be/{result['id']}" if result.get("id") else result.get("path")
+    elif isinstance(result, list):
+        # Playlist: the downloaded files
+        result = f"{len(result)} videos"
+    source = params.get("url") or params.get("path")
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status.value,
+        "title": params.get("title") or (os.path.basename(source) if params.get("path") else source),
+        "source": source,
+        "channel": job.stats.get("channel") or params.get("channel"),
+        "thumbnail": job.stats.get("thumbnail"),
+        "parent": params.get("parent"),
+        "result": result if result is None else str(result),
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
+class JobHistory:
+    """
+    SQLite history of jobs.
+
+        history = JobHistory()
+        history.attach(download_queue)
+        rows = history.page(status="failed", offset=0, limit=100)
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or data_path("history.sqlite3")
+        self._lock = threading.Lock()
+        # Job ID -> status last written
+        self._recorded: dict[str, str] = {}
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " title TEXT,"
+                " source TEXT,"
+                " channel TEXT,"
+                " thumbnail TEXT,"
+                " parent TEXT,"
+                " result TEXT,"
+                " error TEXT,"
+                " created_at REAL NOT NULL,"
+                " finished_at REAL)"
+            )
+            # Every filter combination is an index range scan in created_at order
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_channel ON jobs (channel, created_at)")
+
+    def attach(self, queue):
+        """Record every status change of a JobQueue's jobs."""
+        queue.add_listener(self._on_job)
+
+    def _on_job(self, job):
+        # Progress updates don't change the entry; only write status changes
+        if self._recorded.get(job.id) == job.status.value:
+            return
+        self.record(job)
+        if job.finished:
+            self._recorded.pop(job.id, None)
+        else:
+            self._recorded[job.id] = job.status.value
+
+    def record(self, job):
+        """Insert a job or update its entry. A channel or thumbnail once known is kept."""
+        row = job_row(job)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+                " ON CONFLICT (id) DO UPDATE SET status = excluded.status, title = excluded.title,"
+                " channel = COALESCE(excluded.channel, channel), thumbnail = COALESCE(excluded.thumbnail, thumbnail),"
+                " result = excluded.result, error = excluded.error, finished_at = excluded.finished_at",
+                tuple(row[column] for column in COLUMNS)
+            )
+
+    def mark_interrupted(self, keep: set[str] = frozenset()) -> int:
+        """
+        Mark jobs an earlier process left unfinished as cancelled, except those in
+        `keep` (e.g. downloads restored from the journal).
+
+        Returns:
+            int: Number of jobs marked.
+        """
+        rows = self._query(
+            f"SELECT id FROM jobs WHERE status IN ({', '.join('?' * len(ACTIVE_STATUSES))})", ACTIVE_STATUSES
+        )
+        stale = [(time.time(), row["id"]) for row in rows if row["id"] not in keep]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'cancelled', error = 'Interrupted', finished_at = ? WHERE id = ?", stale
+            )
+        return len(stale)
+
+    def _query(self, sql: str, params: tuple = ()) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _where(status: str | tuple[str, ...] | None = None, channel: str | None = None,
+               since: float | None = None, until: float | None = None) -> tuple[str, tuple]:
+        clauses = []
+        params = []
+        if isinstance(status, str):
+            status = (status,)
+        if status:
+            clauses.append(f"status IN ({', '.join('?' * len(status))})")
+            params.extend(status)
+        if channel:
+            clauses.append("channel = ?")
+            params.append(channel)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at <= ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), tuple(params)
+
+    def count(self, **filters) -> int:
+        """Number of jobs matching the filters (see `page`)."""
+        where, params = self._where(**filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM jobs{where}", params).fetchone()[0]
+
+    def matches(self, job_id: str, **filters) -> bool:
+        """Whether a job is in the history and matches the filters (see `page`)."""
+        where, params = self._where(**filters)
+        where += (" AND" if where else " WHERE") + " id = ?"
+        with self._lock:
+            return self._conn.execute(f"SELECT 1 FROM jobs{where}", params + (job_id,)).fetchone() is not None
+
+    def page(self, offset: int = 0, limit: int = 100, **filters) -> list[dict]:
+        """
+        Jobs matching the filters, newest first.
+
+        Args:
+            offset (int, optional): Matching jobs to skip.
+            limit (int, optional): Most jobs to return.
+            status (str | tuple[str], optional): Status or statuses.
+            channel (str, optional): Channel name.
+            since (float, optional): Jobs created at or after this timestamp.
+            until (float, optional): Jobs created at or before this timestamp.
+        """
+        where, params = self._where(**filters)
+        return self._query(
+            f"SELECT * FROM jobs{where} ORDER BY created_at DESC LIMIT ? OFFSET ?", params + (limit, offset)
+        )
+
+    def channels(self) -> list[str]:
+        """Every channel seen, alphabetically."""
+        rows = self._query("SELECT DISTINCT channel FROM jobs WHERE channel IS NOT NULL ORDER BY channel")
+        return [row["channel"] for row in rows]
+
+
+_default_history: JobHistory | None = None
+_default_lock = threading.Lock()
+
+
+def get_history() -> JobHistory:
+    """Return the process-wide job history."""
+    global _default_history
+    with _default_lock:
+        if _default_history is None:
+            _default_history = JobHistory()
+        return _default_history
@@ -0,0 +1,186 @@
+"""
+Local HTTP API for submitting and following download/upload jobs.
+
+    POST   /jobs               submit a job (JSON body, see JobService.submit)
+    GET    /jobs               list jobs, optionally ?status=running
+    GET    /jobs/{id}          job status
+    DELETE /jobs/{id}          cancel a job
+    POST   /jobs/{id}/pause    pause a job, keeping its partial download
+    POST   /jobs/{id}/resume   resume a paused job
+    GET    /jobs/{id}/events   Server-Sent Events stream for one job
+    GET    /events             Server-Sent Events stream for all jobs
+    GET    /limits             bandwidth caps in bytes/s
+    PUT    /limits             change caps, e.g. {"total": "8M", "upload": "2M"}
+    GET    /metrics            stage timings, loop lag and counters (Prometheus text format)
+
+Start it with `python -m services serve --http --port 8765`.
+"""
+import asyncio
+import json
+
+from aiohttp import web
+
+from services.job_service import JobService
+from services.metrics import get_metrics
+
+# Seconds between SSE keep-alive comments when no update arrives
+KEEPALIVE_INTERVAL = 15
+
+SERVICE_KEY = web.AppKey("service", JobService)
+
+
+def _json(data, status: int = 200) -> web.Response:
+    return web.json_response(data, status=status, dumps=lambda obj: json.dumps(obj, default=str))
+
+
+async def _json_body(request: web.Request) -> dict:
+    """Request body, which must be a JSON object. Raises ValueError otherwise."""
+    body = await request.json()
+    if not isinstance(body, dict):
+        raise ValueError("request body must be a JSON object")
+    return body
+
+
+async def submit_job(request: web.Request) -> web.Response:
+    service = request.app[SERVICE_KEY]
+    try:
+        job = service.submit(await _json_body(request))
+    except (ValueError, KeyError, TypeError, OSError) as e:
+        return _json({"error": str(e)}, status=400)
+    return _json(job.to_dict(), status=201)
+
+
+async def list_jobs(request: web.Request) -> web.Response:
+    service = request.app[SERVICE_KEY]
+    status = request.query.get("status")
+    jobs = [job.to_dict() for job in service.list() if not status or job.status.value == status]
+    return _json(jobs)
+
+
+async def get_job(request: web.Request) -> web.Response:
+    job = request.app[SERVICE_KEY].get(request.match_info["job_id"])
+    if job is None:
+        return _json({"error": "job not found"}, status=404)
+    return _json(job.to_dict())
+
+
+async def cancel_job(request: web.Request) -> web.Response:
+    service = request.app[SERVICE_KEY]
+    job_id = request.match_info["job_id"]
+    job = service.get(job_id)
+    if job is None:
+        return _json({"error": "job not found"}, status=404)
+    service.cancel(job_id)
+    return _json(job.to_dict())
+
+
+async def pause_job(request: web.Request) -> web.Response:
+    service = request.app[SERVICE_KEY]
+    job_id = request.match_info["job_id"]
+    job = service.get(job_id)
+    if job is None:
+        return _json({"error": "job not found"}, status=404)
+    if not service.pause(job_id):
+        return _json({"error": f"job is {job.status.value}"}, status=409)
+    return _json(job.to_dict())
+
+
+async def resume_job(request: web.Request) -> web.Response:
+    service = request.app[SERVICE_KEY]
+    job_id = request.match_info["job_id"]
+    job = service.get(job_id)
+    if job is None:
+        return _json({"error": "job not found"}, status=404)
+    if not service.resume(job_id):
+        return _json({"error": f"job is {job.status.value}"}, status=409)
+    return _json(job.to_dict())
+
+
+async def get_limits(request: web.Request) -> web.Response:
+    return _json(request.app[SERVICE_KEY].scheduler.get_limits())
+
+
+async def set_limits(request: web.Request) -> web.Response:
+    service = request.app[SERVICE_KEY]
+    try:
+        limits = service.set_limits(await _json_body(request))
+    except (ValueError, TypeError, AttributeError) as e:
+        return _json({"error": str(e)}, status=400)
+    return _json(limits)
+
+
+async def get_metrics_text(request: web.Request) -> web.Response:
+    return web.Response(text=get_metrics().render(), content_type="text/plain", charset="utf-8")
+
+
+async def stream_events(request: web.Request) -> web.StreamResponse:
+    service = request.app[SERVICE_KEY]
+    job_id = request.match_info.get("job_id")
+    job = service.get(job_id) if job_id else None
+    if job_id and job is None:
+        return _json({"error": "job not found"}, status=404)
+
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+    })
+    await response.prepare(request)
+
+    async def send(snapshot: dict):
+        await response.write(f"data: {json.dumps(snapshot, default=str)}\n\n".encode("utf-8"))
+
+    queue = service.subscribe(job_id)
+    try:
+        if job is not None:
+            # Current state first, so late subscribers don't miss a finished job
+            await send(job.to_dict())
+            if job.finished:
+                return response
+        while True:
+            try:
+                snapshot = await asyncio.wait_for(queue.get(), KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                await response.write(b": keep-alive\n\n")
+                continue
+            await send(snapshot)
+            if job_id and snapshot["status"] in ("done", "failed", "cancelled"):
+                return response
+    except ConnectionResetError:
+        return response
+    finally:
+        service.unsubscribe(queue)
+
+
+def create_app(service: JobService) -> web.Application:
+    app = web.Application()
+    app[SERVICE_KEY] = service
+    app.router.add_post("/jobs", submit_job)
+    app.router.add_get("/jobs", list_jobs)
+    app.router.add_get("/jobs/{job_id}", get_job)
+    app.router.add_delete("/jobs/{job_id}", cancel_job)
+    app.router.add_post("/jobs/{job_id}/pause", pause_job)
+    app.router.add_post("/jobs/{job_id}/resume", resume_job)
+    app.router.add_get("/jobs/{job_id}/events", stream_events)
+    app.router.add_get("/events", stream_events)
+    app.router.add_get("/limits", get_limits)
+    app.router.add_put("/limits", set_limits)
+    app.router.add_get("/metrics", get_metrics_text)
+
+    async def on_cleanup(app):
+        await service.stop()
+
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+async def run_server(service: JobService, host: str = "127.0.0.1", port: int = 8765):
+    """Serve the job API until cancelled."""
+    runner = web.AppRunner(create_app(service))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    print(f"Job API listening on http://{host}:{port}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
@@ -0,0 +1,312 @@
+import asyncio
+import itertools
+import time
+import traceback
+import uuid
+from dataclasses import dataclass, field
+from enum import Enum
+
+from services.metrics import get_metrics
+from services.progress import Progress
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    PAUSED = "paused"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = (JobStatus.DONE, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+@dataclass
+class Job:
+    """A single unit of work tracked by a JobQueue."""
+
+    kind: str
+    params: dict
+    priority: int = 0
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    status: JobStatus = JobStatus.QUEUED
+    progress: float = 0.0
+    result: object = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    cancel_flag: dict = field(default_factory=lambda: {"cancel": False})
+    stats: dict = field(default_factory=dict)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "priority": self.priority,
+            "status": self.status.value,
+            "progress": self.progress,
+            "stats": self.stats,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    Priority queue of jobs served by a bounded number of concurrent workers.
+
+    Subclasses implement `run_job`. Jobs with a higher priority start first;
+    jobs with equal priority start in submission order. Listeners registered
+    with `add_listener` are called on the event loop thread whenever a job
+    changes status or progress.
+
+    Jobs can be paused and resumed. A paused job isn't finished: `wait` and
+    `join` keep waiting for it.
+    """
+
+    kind = "job"
+
+    def __init__(self, max_workers: int = 3):
+        self._max_workers = max(1, max_workers)
+        self.jobs: dict[str, Job] = {}
+        self._pending: asyncio.PriorityQueue | None = None
+        # IDs of jobs with an entry in _pending that the dispatcher hasn't taken yet
+        self._enqueued: set[str] = set()
+        self._running: dict[str, asyncio.Task] = {}
+        self._released: set[str] = set()
+        self._slots_free: asyncio.Event | None = None
+        self._dispatcher: asyncio.Task | None = None
+        self._done: dict[str, asyncio.Future] = {}
+        self._listeners = []
+        self._counter = itertools.count()
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    @max_workers.setter
+    def max_workers(self, value: int):
+        self._max_workers = max(1, int(value))
+        self._update_slots()
+
+    @property
+    def load(self) -> int:
+        """Jobs holding a worker slot or queued for one (see `release_slot`)."""
+        queued = sum(1 for job in self.jobs.values() if job.status is JobStatus.QUEUED)
+        return len(self._running) - len(self._released) + queued
+
+    def add_listener(self, callback):
+        """Register `callback(job)` to be called on every job update."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def start(self):
+        """Start the dispatcher. Called automatically by `submit`."""
+        if self._dispatcher and not self._dispatcher.done():
+            return
+        self._pending = self._pending or asyncio.PriorityQueue()
+        self._slots_free = asyncio.Event()
+        self._update_slots()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def stop(self):
+        """Cancel every queued and running job and stop the dispatcher."""
+        for job in list(self.jobs.values()):
+            self.cancel(job.id)
+        if self._running:
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+
+    def submit(self, job: Job) -> Job:
+        """
+        Add a job to the queue.
+
+        Args:
+            job (Job): Job to schedule. A job with status PAUSED is tracked but only
+                starts once resumed.
+
+        Returns:
+            Job: The same job, for chaining.
+        """
+        self.start()
+        self.jobs[job.id] = job
+        self._done[job.id] = asyncio.get_running_loop().create_future()
+        if job.status is JobStatus.QUEUED:
+            self._enqueue(job)
+        self._notify(job)
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a single job. Queued jobs are dropped, running jobs are asked to stop.
+
+        Returns:
+            bool: True if the job existed and was not already finished.
+        """
+        job = self.jobs.get(job_id)
+        if not job or job.finished:
+            return False
+        job.cancel_flag["cancel"] = True
+        # Cancelling wins over a pause that is still in progress
+        job.cancel_flag["pause"] = False
+        if job.status in (JobStatus.QUEUED, JobStatus.PAUSED):
+            self._finish(job, JobStatus.CANCELLED)
+        return True
+
+    def pause(self, job_id: str) -> bool:
+        """
+        Pause a job. Queued jobs stay out of the queue; running jobs are asked to
+        stop like on cancel, and become PAUSED instead of CANCELLED when they do.
+
+        Returns:
+            bool: True if the job was queued or running.
+        """
+        job = self.jobs.get(job_id)
+        if not job or job.status not in (JobStatus.QUEUED, JobStatus.RUNNING):
+            return False
+        if job.status is JobStatus.QUEUED:
+            job.status = JobStatus.PAUSED
+            self._notify(job)
+        else:
+            job.cancel_flag.update(cancel=True, pause=True)
+        return True
+
+    def resume(self, job_id: str) -> bool:
+        """
+        Queue a paused job again, with its original priority.
+
+        Returns:
+            bool: True if the job was paused.
+        """
+        job = self.jobs.get(job_id)
+        if not job or job.status is not JobStatus.PAUSED:
+            return False
+        job.cancel_flag.update(cancel=False, pause=False)
+        job.status = JobStatus.QUEUED
+        self.start()
+        if job.id not in self._enqueued:
+            # Paused while running, or its entry was skipped while paused; else the old entry still counts
+            self._enqueue(job)
+        self._notify(job)
+        return True
+
+    async def wait(self, job_id: str) -> Job:
+        """Wait until the given job is finished and return it."""
+        await asyncio.shield(self._done[job_id])
+        return self.jobs[job_id]
+
+    async def join(self):
+        """Wait until every submitted job is finished."""
+        while True:
+            pending = [f for f in self._done.values() if not f.done()]
+            if not pending:
+                return
+            await asyncio.wait(pending)
+
+    def update_progress(self, job: Job, percent: float):
+        job.progress = percent
+        self._notify(job)
+
+    def report(self, job: Job, progress: Progress):
+        """Record a transfer snapshot (percent plus bytes, speed and ETA in `job.stats`)."""
+        if job.finished:
+            return
+        job.stats.update(progress.to_dict())
+        self.update_progress(job, progress.percent)
+
+    def release_slot(self, job: Job):
+        """
+        Stop counting a running job against `max_workers`.
+
+        For jobs that only wait on other jobs in the same queue (e.g. a playlist
+        waiting on its entries), so they don't hold a worker slot while idle.
+        """
+        if job.id in self._running:
+            self._released.add(job.id)
+            self._update_slots()
+
+    async def run_job(self, job: Job):
+        """Execute the job and return its result. Implemented by subclasses."""
+        raise NotImplementedError
+
+    def _enqueue(self, job: Job):
+        self._enqueued.add(job.id)
+        self._pending.put_nowait((-job.priority, next(self._counter), job))
+
+    def _update_slots(self):
+        if self._slots_free is None:
+            return
+        if len(self._running) - len(self._released) < self._max_workers:
+            self._slots_free.set()
+        else:
+            self._slots_free.clear()
+
+    async def _dispatch(self):
+        while True:
+            await self._slots_free.wait()
+            _, _, job = await self._pending.get()
+            self._enqueued.discard(job.id)
+            if job.status is not JobStatus.QUEUED:
+                continue
+            self._running[job.id] = asyncio.create_task(self._run(job))
+            self._update_slots()
+
+    async def _run(self, job: Job):
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        self._notify(job)
+        try:
+            job.result = await self.run_job(job)
+        except asyncio.CancelledError:
+            self._finish(job, JobStatus.CANCELLED)
+            raise
+        except Exception as e:
+            if job.cancel_flag.get("pause"):
+                job.status = JobStatus.PAUSED
+                self._notify(job)
+            elif job.cancel_flag.get("cancel"):
+                self._finish(job, JobStatus.CANCELLED)
+            else:
+                print(f"❌ {self.kind} job {job.id} failed:", e)
+                print(traceback.format_exc())
+                job.error = str(e)
+                self._finish(job, JobStatus.FAILED)
+        else:
+            job.progress = 100
+            self._finish(job, JobStatus.DONE)
+        finally:
+            self._running.pop(job.id, None)
+            self._released.discard(job.id)
+            self._update_slots()
+
+    def _finish(self, job: Job, status: JobStatus):
+        job.status = status
+        job.finished_at = time.time()
+        get_metrics().job_finished(job)
+        self._notify(job)
+        done = self._done.get(job.id)
+        if done and not done.done():
+            done.set_result(job)
+
+    def _notify(self, job: Job):
+        for callback in list(self._listeners):
+            try:
+                callback(job)
+            except Exception as e:
+                print("Job listener error:", e)
@@ -0,0 +1,161 @@
+import asyncio
+
+from services.bandwidth import get_scheduler, parse_rate
+from services.batch_upload import UploadItem, UploadQueue
+from services.download_queue import DownloadQueue
+from services.job_queue import Job
+from services.journal import DownloadJournal
+from services.defaults import DEFAULT_FORMAT
+from services.postprocess import CONVERT_MODES, DEFAULT_WORKERS
+
+# Updates kept per subscriber before the oldest ones are dropped
+SUBSCRIBER_BUFFER = 256
+
+
+class JobService:
+    """
+    Download and upload queues behind one request/event interface.
+
+    Used by the headless `serve` modes: requests are plain dicts (parsed from
+    JSON), and every job update is broadcast to subscribers as `job.to_dict()`.
+    """
+
+    def __init__(self, download_workers: int = 3, upload_workers: int = 2, output_dir: str = ".",
+                 postprocess_workers: int = DEFAULT_WORKERS, journal: DownloadJournal | None = None):
+        self.output_dir = output_dir
+        self.downloads = DownloadQueue(
+            max_workers=download_workers, postprocess_workers=postprocess_workers, journal=journal
+        )
+        self.uploads = UploadQueue(max_workers=upload_workers)
+        self.scheduler = get_scheduler()
+        self._subscribers: list[tuple[asyncio.Queue, str | None]] = []
+        self.downloads.add_listener(self._broadcast)
+        self.uploads.add_listener(self._broadcast)
+
+    def submit(self, request: dict) -> Job:
+        """
+        Create a job from a request dict.
+
+        Args:
+            request (dict): {"type": "download", "url": ..., "format": ..., "output_dir": ..., "priority": ...,
+                "convert": "auto" | "never"},
+                {"type": "playlist", ... same keys as download, "skip_archived": true}, {"type": "upload", "path": ..., "title": ..., "description": ..., "tags": [...],
+                "privacy_status": ..., "thumbnail": ..., "playlist_id": ..., "priority": ...} or
+                {"type": "relay", "url": ..., "format": ..., "output_dir": ..., "privacy_status": ...,
+                "priority": ..., plus optional upload metadata overriding the source video's}.
+
+        Returns:
+            Job: The queued job.
+
+        Raises:
+            ValueError, KeyError, TypeError: If the request is invalid.
+            OSError: If an upload's file can't be read.
+        """
+        kind = request.get("type")
+        priority = int(request.get("priority", 0))
+        if kind == "download":
+            return self.downloads.submit_download(
+                request["url"],
+                request.get("format") or DEFAULT_FORMAT,
+                request.get("output_dir") or self.output_dir,
+                priority=priority,
+                convert=self._convert_mode(request)
+            )
+        if kind == "playlist":
+            return self.downloads.submit_playlist(
+                request["url"],
+                request.get("format") or DEFAULT_FORMAT,
+                request.get("output_dir") or self.output_dir,
+                priority=priority,
+                skip_archived=bool(request.get("skip_archived", True)),
+                convert=self._convert_mode(request)
+            )
+        if kind == "upload":
+            fields = {k: v for k, v in request.items() if k in UploadItem.__dataclass_fields__}
+            if "title" not in fields:
+                raise ValueError("upload requires a title")
+            return self.uploads.submit_upload(UploadItem(**fields), priority=priority)
+        if kind == "relay":
+            metadata = {
+                k: v for k, v in request.items()
+                if k in UploadItem.__dataclass_fields__ and k not in ("path", "privacy_status") and v is not None
+            }
+            return self.uploads.submit_relay(
+                request["url"],
+                request.get("format") or DEFAULT_FORMAT,
+                request.get("output_dir") or self.output_dir,
+                request.get("privacy_status") or "private",
+                priority=priority,
+                **metadata
+            )
+        raise ValueError(f"unknown job type: {kind!r}")
+
+    @staticmethod
+    def _convert_mode(request: dict) -> str:
+        convert = request.get("convert") or "auto"
+        if convert not in CONVERT_MODES:
+            raise ValueError(f"convert must be one of {CONVERT_MODES}")
+        return convert
+
+    def set_limits(self, request: dict) -> dict:
+        """
+        Change the bandwidth caps, e.g. {"total": "8M", "download": null, "upload": "2M"}.
+        Omitted keys keep their current value; null, "" or 0 removes a cap.
+
+        Returns:
+            dict: The caps now in effect, in bytes per second.
+        """
+        limits = self.scheduler.get_limits()
+        for name in limits:
+            if name in request:
+                limits[name] = parse_rate(request[name])
+        self.scheduler.set_limits(**limits)
+        return self.scheduler.get_limits()
+
+    def get(self, job_id: str) -> Job | None:
+        return self.downloads.jobs.get(job_id) or self.uploads.jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        jobs = list(self.downloads.jobs.values()) + list(self.uploads.jobs.values())
+        return sorted(jobs, key=lambda job: job.created_at)
+
+    def cancel(self, job_id: str) -> bool:
+        return self.downloads.cancel(job_id) or self.uploads.cancel(job_id)
+
+    def pause(self, job_id: str) -> bool:
+        return self.downloads.pause(job_id) or self.uploads.pause(job_id)
+
+    def resume(self, job_id: str) -> bool:
+        return self.downloads.resume(job_id) or self.uploads.resume(job_id)
+
+    def subscribe(self, job_id: str | None = None) -> asyncio.Queue:
+        """
+        Receive job updates as dicts. Pass a job ID to follow a single job.
+
+        Returns:
+            asyncio.Queue: Queue of `job.to_dict()` snapshots; call `unsubscribe` when done.
+        """
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_BUFFER)
+        self._subscribers.append((queue, job_id))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers = [(q, job_id) for q, job_id in self._subscribers if q is not queue]
+
+    async def join(self):
+        await asyncio.gather(self.downloads.join(), self.uploads.join())
+
+    async def stop(self):
+        await asyncio.gather(self.downloads.stop(), self.uploads.stop())
+
+    def _broadcast(self, job: Job):
+        if not self._subscribers:
+            return
+        snapshot = job.to_dict()
+        for queue, job_id in self._subscribers:
+            if job_id and job_id != job.id:
+                continue
+            if queue.full():
+                # Slow consumer: drop the oldest update rather than block the queue
+                queue.get_nowait()
+            queue.put_nowait(snapshot)
@@ -0,0 +1,254 @@
+"""
+Shared job store for running jobs on several machines.
+
+Jobs are request dicts as accepted by JobService.submit ({"type": "download",
+"url": ...}). Any process can submit them; workers (services.worker) claim
+them with a lease, renew the lease with heartbeats while they run, and report
+the outcome. A job whose lease runs out, because its worker died or lost the
+store, goes back to the queue for another worker. A worker that fails to
+renew a lease stops the job, and only the lease holder can finish a job, so a
+job never ends up running twice.
+
+SQLiteJobStore is the default backend and works on a shared volume as long
+as the file system supports SQLite's locking (most local and SMB mounts do;
+NFS often doesn't). Other backends (e.g. Redis) implement the JobStore
+methods and are registered in STORE_BACKENDS under their URL scheme.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from services.defaults import LEASE_SECONDS
+from services.paths import data_path
+
+# Claims (i.e. expired leases + 1) before a job is given up on
+MAX_ATTEMPTS = 3
+
+
+class JobStore:
+    """
+    Interface of a shared job store. Every method is blocking and safe to call
+    from any thread of any process sharing the store.
+    """
+
+    def submit(self, request: dict, priority: int = 0) -> str:
+        """Queue a request. Returns the new job's ID."""
+        raise NotImplementedError
+
+    def claim(self, worker_id: str, types: list[str], lease: float = LEASE_SECONDS) -> dict | None:
+        """
+        Take the next queued job of one of `types` (highest priority, then oldest),
+        first re-queueing jobs whose lease expired.
+
+        Returns:
+            dict | None: The claimed job (see `get`), or None if there is nothing to do.
+        """
+        raise NotImplementedError
+
+    def heartbeat(self, job_id: str, worker_id: str, lease: float = LEASE_SECONDS,
+                  progress: float | None = None, stats: dict | None = None) -> bool:
+        """
+        Renew a lease and record progress.
+
+        Returns:
+            bool: False if the worker must stop the job: it lost the lease or the job
+                was cancelled.
+        """
+        raise NotImplementedError
+
+    def finish(self, job_id: str, worker_id: str, status: str, result=None, error: str | None = None) -> bool:
+        """Record a job's outcome ("done", "failed" or "cancelled"). Ignored unless `worker_id` holds the lease."""
+        raise NotImplementedError
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        """Give a running job back to the queue, e.g. when its worker shuts down."""
+        raise NotImplementedError
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job, or ask the worker running it to stop."""
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> dict | None:
+        raise NotImplementedError
+
+    def list(self, status: str | None = None) -> list[dict]:
+        raise NotImplementedError
+
+
+class SQLiteJobStore(JobStore):
+    """JobStore in an SQLite file, e.g. on a volume every worker mounts."""
+
+    def __init__(self, path: str | None = None):
+        self.path = path or data_path("jobs.sqlite3")
+        self._lock = threading.Lock()
+        # Waits up to 30 s for other processes' write locks instead of failing
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " type TEXT NOT NULL,"
+                " request TEXT NOT NULL,"
+                " priority INTEGER NOT NULL,"
+                " status TEXT NOT NULL,"
+                " worker TEXT,"
+                " lease_expires REAL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " cancel_requested INTEGER NOT NULL DEFAULT 0,"
+                " progress REAL NOT NULL DEFAULT 0,"
+                " stats TEXT NOT NULL DEFAULT '{}',"
+                " result TEXT,"
+                " error TEXT,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, created_at)")
+
+    def _write(self, sql: str, params: tuple = ()) -> int:
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def submit(self, request: dict, priority: int = 0) -> str:
+        if not request.get("type"):
+            raise ValueError("request has no type")
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        self._write(
+            "INSERT INTO jobs (id, type, request, priority, status, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+            (job_id, request["type"], json.dumps(request), priority, now, now)
+        )
+        return job_id
+
+    def claim(self, worker_id: str, types: list[str], lease: float = LEASE_SECONDS) -> dict | None:
+        if not types:
+            return None
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two workers can't pick the same row
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Out of attempts; a job that was being cancelled ends cancelled, not failed
+                self._conn.execute(
+                    "UPDATE jobs SET status = CASE cancel_requested WHEN 1 THEN 'cancelled' ELSE 'failed' END,"
+                    " worker = NULL, updated_at = ?,"
+                    " error = CASE cancel_requested WHEN 1 THEN error ELSE 'Lease expired ' || attempts || ' times' END"
+                    " WHERE status = 'running' AND lease_expires < ? AND attempts >= ?",
+                    (now, now, MAX_ATTEMPTS)
+                )
+                self._conn.execute(
+                    "UPDATE jobs SET status = CASE cancel_requested WHEN 1 THEN 'cancelled' ELSE 'queued' END,"
+                    " worker = NULL, updated_at = ?"
+                    " WHERE status = 'running' AND lease_expires < ?",
+                    (now, now)
+                )
+                row = self._conn.execute(
+                    f"SELECT id FROM jobs WHERE status = 'queued' AND type IN ({', '.join('?' * len(types))})"
+                    " ORDER BY priority DESC, created_at LIMIT 1",
+                    tuple(types)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, lease_expires = ?,"
+                        " attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (worker_id, now + lease, now, row["id"])
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row is not None else None
+
+    def heartbeat(self, job_id: str, worker_id: str, lease: float = LEASE_SECONDS,
+                  progress: float | None = None, stats: dict | None = None) -> bool:
+        now = time.time()
+        renewed = self._write(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ?, progress = COALESCE(?, progress),"
+            " stats = COALESCE(?, stats)"
+            " WHERE id = ? AND worker = ? AND status = 'running' AND lease_expires >= ?",
+            (now + lease, now, progress, json.dumps(stats, default=str) if stats is not None else None,
+             job_id, worker_id, now)
+        )
+        if not renewed:
+            return False
+        job = self.get(job_id)
+        return job is not None and not job["cancel_requested"]
+
+    def finish(self, job_id: str, worker_id: str, status: str, result=None, error: str | None = None) -> bool:
+        if status not in ("done", "failed", "cancelled"):
+            raise ValueError(f"not a final status: {status!r}")
+        return bool(self._write(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, worker = NULL, lease_expires = NULL,"
+            " progress = CASE ? WHEN 'done' THEN 100 ELSE progress END, updated_at = ?"
+            " WHERE id = ? AND worker = ? AND status = 'running'",
+            (status, json.dumps(result, default=str), error, status, time.time(), job_id, worker_id)
+        ))
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        # Doesn't count as an attempt: the job didn't fail
+        return bool(self._write(
+            "UPDATE jobs SET status = 'queued', worker = NULL, lease_expires = NULL,"
+            " attempts = MAX(attempts - 1, 0), updated_at = ?"
+            " WHERE id = ? AND worker = ? AND status = 'running'",
+            (time.time(), job_id, worker_id)
+        ))
+
+    def cancel(self, job_id: str) -> bool:
+        now = time.time()
+        if self._write(
+            "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'queued'",
+            (now, job_id)
+        ):
+            return True
+        return bool(self._write(
+            "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = 'running'",
+            (now, job_id)
+        ))
+
+    def _query(self, sql: str, params: tuple = ()) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job["request"] = json.loads(job["request"])
+            job["stats"] = json.loads(job["stats"])
+            job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+            job["cancel_requested"] = bool(job["cancel_requested"])
+            jobs.append(job)
+        return jobs
+
+    def get(self, job_id: str) -> dict | None:
+        rows = self._query("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    def list(self, status: str | None = None) -> list[dict]:
+        if status:
+            return self._query("SELECT * FROM jobs WHERE status = ? ORDER BY created_at", (status,))
+        return self._query("SELECT * FROM jobs ORDER BY created_at")
+
+
+# URL scheme -> backend class, constructed with the rest of the URL
+STORE_BACKENDS = {"sqlite": SQLiteJobStore}
+
+
+def open_store(url: str | None = None) -> JobStore:
+    """
+    Open a job store from a URL: "sqlite:///mnt/shared/jobs.sqlite3", a plain file
+    path, or "<scheme>://..." for a backend registered in STORE_BACKENDS.
+    Defaults to YOUTUBE_UPLOADER_STORE, then jobs.sqlite3 in the data directory.
+    """
+    url = url or os.environ.get("YOUTUBE_UPLOADER_STORE")
+    if not url:
+        return SQLiteJobStore()
+    scheme, separator, rest = url.partition("://")
+    if not separator:
+        return SQLiteJobStore(url)
+    backend = STORE_BACKENDS.get(scheme)
+    if backend is None:
+        raise ValueError(f"unknown job store {scheme!r} (known: {', '.join(STORE_BACKENDS)})")
+    return backend(rest)
@@ -0,0 +1,177 @@
+"""
+Crash-safe journal of unfinished downloads.
+
+Every download job is written to an SQLite table when it is queued, and
+removed once it is done, has failed or was cancelled by the user. While it
+runs, the download thread records the exact format IDs yt-dlp picked, the
+partial files it writes (".part", or fragments plus the ".ytdl" resume file)
+and how many fragments are complete. Whatever is left in the journal when
+the process starts again was interrupted: DownloadQueue.restore queues it
+again with the same formats, so yt-dlp continues the partial files instead
+of downloading from zero.
+"""
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from services.paths import data_path
+
+# Seconds between progress writes for one job; new files and formats are written at once
+WRITE_INTERVAL = 2.0
+
+
+class DownloadJournal:
+    """SQLite journal of download jobs that haven't finished yet."""
+
+    def __init__(self, path: str | None = None):
+        self.path = path or data_path("journal.sqlite3")
+        self._lock = threading.Lock()
+        # Job ID -> partial files, formats and last write time of its running download
+        self._progress: dict[str, dict] = {}
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " params TEXT NOT NULL,"
+                " priority INTEGER NOT NULL,"
+                " status TEXT NOT NULL,"
+                " formats TEXT,"
+                " partials TEXT NOT NULL DEFAULT '{}',"
+                " fragments INTEGER,"
+                " fragment_count INTEGER,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+
+    def record(self, job):
+        """Insert a job (services.job_queue.Job) or update its status, params and priority."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, params, priority, status, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (id) DO UPDATE SET params = excluded.params, priority = excluded.priority,"
+                " status = excluded.status, updated_at = excluded.updated_at",
+                (job.id, job.kind, json.dumps(job.params), job.priority, job.status.value,
+                 job.created_at, time.time())
+            )
+
+    def update_download(
+        self,
+        job_id: str,
+        formats: str | None,
+        filename: str,
+        tmpfilename: str,
+        fragment_index: int | None = None,
+        fragment_count: int | None = None
+    ):
+        """
+        Record download progress. Called on the download thread for every yt-dlp
+        progress report; writes at most every WRITE_INTERVAL seconds unless a new
+        file was started or the formats changed.
+
+        Args:
+            job_id (str): Job ID.
+            formats (str, optional): Format IDs being downloaded, e.g. "137+140".
+            filename (str): File the stream ends up in.
+            tmpfilename (str): File being written (".part" unless writing in place).
+            fragment_index (int, optional): Fragments downloaded so far.
+            fragment_count (int, optional): Fragments in total.
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._progress.get(job_id)
+            if state is None:
+                row = self._conn.execute(
+                    "SELECT formats, partials FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+                if row is None:
+                    return
+                # Keep the files of earlier runs, e.g. a video stream finished before a crash
+                state = {"formats": row["formats"], "partials": json.loads(row["partials"]), "written": 0.0}
+                self._progress[job_id] = state
+            changed = formats != state["formats"] or state["partials"].get(filename) != tmpfilename
+            if not changed and now - state["written"] < WRITE_INTERVAL:
+                return
+            state["formats"] = formats or state["formats"]
+            state["partials"][filename] = tmpfilename
+            state["written"] = now
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE jobs SET formats = ?, partials = ?, fragments = ?, fragment_count = ?, updated_at = ?"
+                    " WHERE id = ?",
+                    (state["formats"], json.dumps(state["partials"]), fragment_index, fragment_count,
+                     time.time(), job_id)
+                )
+
+    def get(self, job_id: str) -> dict | None:
+        rows = self._query("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    def entries(self) -> list[dict]:
+        """Every journaled job, oldest first, with "params" and "partials" decoded."""
+        return self._query("SELECT * FROM jobs ORDER BY created_at")
+
+    def remove(self, job_id: str) -> dict | None:
+        """Drop a job from the journal. Returns its entry, if it had one."""
+        entry = self.get(job_id)
+        with self._lock, self._conn:
+            self._progress.pop(job_id, None)
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return entry
+
+    def _query(self, sql: str, params: tuple = ()) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        entries = []
+        for row in rows:
+            entry = dict(row)
+            entry["params"] = json.loads(entry["params"])
+            entry["partials"] = json.loads(entry["partials"])
+            entries.append(entry)
+        return entries
+
+
+def partial_bytes(entry: dict) -> int:
+    """Bytes of partial data on disk for a journal entry."""
+    total = 0
+    for filename, tmpfilename in entry["partials"].items():
+        for path in [tmpfilename, *glob.glob(glob.escape(tmpfilename) + "-Frag*")]:
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+    return total
+
+
+def discard_partials(entry: dict):
+    """Delete the partial files of a journal entry; finished files are left alone."""
+    for filename, tmpfilename in entry["partials"].items():
+        paths = [f"{filename}.ytdl", *glob.glob(glob.escape(tmpfilename) + "-Frag*")]
+        if tmpfilename != filename:
+            paths.append(tmpfilename)
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"⚠️ Could not remove {path}:", e)
+
+
+_default_journal: DownloadJournal | None = None
+_default_lock = threading.Lock()
+
+
+def get_journal() -> DownloadJournal:
+    """Return the process-wide download journal."""
+    global _default_journal
+    with _default_lock:
+        if _default_journal is None:
+            _default_journal = DownloadJournal()
+        return _default_journal
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from services.paths import data_path
+
+HASH_CHUNK = 1024 * 1024
+
+COLUMNS = (
+    "key", "format", "path", "size", "sha256", "format_id", "title",
+    "channel", "channel_id", "extractor", "video_id", "url", "downloaded_at",
+)
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file, read in 1 MiB chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Library:
+    """
+    SQLite index of downloaded files.
+
+    Entries are keyed by video ("<extractor>:<video id>", see
+    metadata_cache.canonical_key) and the requested format spec, and record
+    the final path, size and SHA-256 of the file plus the channel it came from.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or data_path("library.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " key TEXT NOT NULL,"
+                " format TEXT NOT NULL,"
+                " path TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " sha256 TEXT NOT NULL,"
+                " format_id TEXT,"
+                " title TEXT,"
+                " channel TEXT,"
+                " channel_id TEXT,"
+                " extractor TEXT,"
+                " video_id TEXT,"
+                " url TEXT,"
+                " downloaded_at REAL NOT NULL,"
+                " PRIMARY KEY (key, format))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS files_channel_id ON files (channel_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS files_channel ON files (channel)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256)")
+
+    def _query(self, sql: str, params: tuple = ()) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def lookup(self, key: str, format_spec: str) -> dict | None:
+        """
+        Return the entry for a video in a given format if its file is still on disk.
+
+        Entries whose file was deleted or changed size are dropped.
+        """
+        rows = self._query("SELECT * FROM files WHERE key = ? AND format = ?", (key, format_spec))
+        if not rows:
+            return None
+        entry = rows[0]
+        if not self._intact(entry):
+            self.remove(key, format_spec)
+            return None
+        return entry
+
+    def find(self, key: str) -> list[dict]:
+        """Every file on disk for a video, in any format, newest first."""
+        rows = self._query("SELECT * FROM files WHERE key = ? ORDER BY downloaded_at DESC", (key,))
+        return [entry for entry in rows if self._intact(entry)]
+
+    def by_channel(self, channel: str) -> list[dict]:
+        """Everything downloaded from a channel, by channel ID or name, newest first."""
+        return self._query(
+            "SELECT * FROM files WHERE channel_id = ? OR channel = ? ORDER BY downloaded_at DESC",
+            (channel, channel)
+        )
+
+    def by_hash(self, sha256: str) -> list[dict]:
+        """Entries whose file has the given content hash."""
+        return self._query("SELECT * FROM files WHERE sha256 = ?", (sha256,))
+
+    def all(self) -> list[dict]:
+        return self._query("SELECT * FROM files ORDER BY downloaded_at DESC")
+
+    def record(self, key: str, format_spec: str, path: str, info: dict) -> dict:
+        """
+        Index a finished download. Hashes the file, so call it from an executor.
+
+        Args:
+            key (str): Video key ("<extractor>:<video id>").
+            format_spec (str): Format spec the download was requested with.
+            path (str): Final file path.
+            info (dict): yt-dlp info dict of the video.
+
+        Returns:
+            dict: The stored entry.
+        """
+        entry = {
+            "key": key,
+            "format": format_spec,
+            "path": os.path.abspath(path),
+            "size": os.path.getsize(path),
+            "sha256": file_sha256(path),
+            "format_id": info.get("format_id"),
+            "title": info.get("title"),
+            "channel": info.get("channel") or info.get("uploader"),
+            "channel_id": info.get("channel_id") or info.get("uploader_id"),
+            "extractor": info.get("extractor_key"),
+            "video_id": info.get("id"),
+            "url": info.get("webpage_url"),
+            "downloaded_at": time.time(),
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO files ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                tuple(entry[column] for column in COLUMNS)
+            )
+        return entry
+
+    def remove(self, key: str, format_spec: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE key = ? AND format = ?", (key, format_spec))
+
+    @staticmethod
+    def _intact(entry: dict) -> bool:
+        try:
+            return os.path.getsize(entry["path"]) == entry["size"]
+        except OSError:
+            return False
+
+
+_default_library: Library | None = None
+_default_lock = threading.Lock()
+
+
+def get_library() -> Library:
+    """Return the process-wide library index."""
+    global _default_library
+    with _default_lock:
+        if _default_library is None:
+            _default_library = Library()
+        return _default_library
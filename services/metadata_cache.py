@@ -0,0 +1,107 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+from services.paths import data_path
+
+# Extracted format URLs expire after a few hours, so keep entries well below that
+DEFAULT_TTL = 3600
+
+_key_cache: dict[str, str] = {}
+
+
+def canonical_key(url: str) -> str:
+    """
+    Compute a cache key for a URL without touching the network.
+
+    Uses the matching yt-dlp extractor to get the video ID, so different URL
+    spellings of the same video (youtu.be, watch?v=, shorts) share one entry.
+
+    Args:
+        url (str): Video URL.
+
+    Returns:
+        str: "<extractor>:<video id>", or "url:<url>" if the ID cannot be derived.
+    """
+    key = _key_cache.get(url)
+    if key is not None:
+        return key
+
+    from yt_dlp.extractor import gen_extractor_classes
+
+    key = f"url:{url}"
+    for ie in gen_extractor_classes():
+        if ie.ie_key() == "Generic" or not ie.suitable(url):
+            continue
+        video_id = ie.get_temp_id(url)
+        if video_id:
+            key = f"{ie.ie_key()}:{video_id}"
+        break
+
+    _key_cache[url] = key
+    return key
+
+
+class MetadataCache:
+    """SQLite-backed cache of extracted yt-dlp info dicts with expiry."""
+
+    def __init__(self, path: str | None = None, ttl: float = DEFAULT_TTL):
+        self.path = path or data_path("cache", "metadata.sqlite3")
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS info ("
+                " key TEXT PRIMARY KEY,"
+                " data BLOB NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> dict | None:
+        """Return the cached info dict for a key, or None if missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, expires_at FROM info WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        data, expires_at = row
+        if expires_at < time.time():
+            self.delete(key)
+            return None
+        return json.loads(zlib.decompress(data))
+
+    def put(self, key: str, info: dict, ttl: float | None = None):
+        """Store a JSON-serializable info dict."""
+        data = zlib.compress(json.dumps(info).encode("utf-8"))
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO info (key, data, expires_at) VALUES (?, ?, ?)",
+                (key, data, expires_at)
+            )
+
+    def delete(self, key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM info WHERE key = ?", (key,))
+
+    def purge_expired(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM info WHERE expires_at < ?", (time.time(),))
+
+
+_default_cache: MetadataCache | None = None
+_default_lock = threading.Lock()
+
+
+def get_metadata_cache() -> MetadataCache:
+    """Return the process-wide metadata cache."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = MetadataCache()
+            _default_cache.purge_expired()
+        return _default_cache
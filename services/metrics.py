@@ -0,0 +1,369 @@
+"""
+Job instrumentation: per-stage timings, counters and event-loop lag.
+
+Stages of a job (metadata extraction, waiting for an executor thread, the
+network transfer, yt-dlp's own post-processors such as the merger, our MP4
+conversion, indexing, upload retries...) are timed with a StageTimer. Each
+timing lands in the job's `stats["timings"]`, in process-wide histograms that
+can be scraped in Prometheus text format, and, when a log file is configured,
+in a JSON-lines log with one line per finished job:
+
+    {"ts": ..., "event": "job", "kind": "download", "status": "done",
+     "queued": 0.002, "seconds": 41.3, "bytes": ..., "retries": 0,
+     "timings": {"extract": 0.8, "executor_wait": 0.0, "download": 35.1,
+                 "ytdlp_merger": 2.9, "postprocess_wait": 0.0, "postprocess": 0.4, "index": 0.6}}
+
+Configure with `get_metrics().configure(log_path=...)`, or with the
+YOUTUBE_UPLOADER_METRICS_LOG / YOUTUBE_UPLOADER_METRICS_PORT environment
+variables through `configure_from_env`.
+"""
+import asyncio
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+METRIC_PREFIX = "ytu_"
+
+# Histogram buckets in seconds, from event-loop hiccups to long transfers
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+# Event-loop lag sampling period, and lag worth a line in the JSON log
+LAG_INTERVAL = 0.05
+LAG_LOG_THRESHOLD = 0.1
+
+# Lag samples kept for percentiles (about 8 minutes at the default interval)
+LAG_SAMPLES = 10000
+
+DESCRIPTIONS = {
+    "stage_seconds": ("histogram", "Time spent in each stage of a job."),
+    "job_seconds": ("histogram", "Time from a job starting to finishing."),
+    "queue_seconds": ("histogram", "Time jobs waited in their queue before starting."),
+    "loop_lag_seconds": ("histogram", "How late the event loop ran a timer, i.e. how long it was blocked."),
+    "handler_seconds": ("histogram", "Duration of GUI slots and job listeners."),
+    "jobs_total": ("counter", "Finished jobs by kind and status."),
+    "bytes_total": ("counter", "Bytes moved by finished jobs."),
+    "retries_total": ("counter", "Retried requests and fragments."),
+    "loop_lag_max_seconds": ("gauge", "Largest event-loop lag seen so far."),
+    "site_concurrency": ("gauge", "Concurrent downloads currently allowed per site."),
+    "site_throttled_total": ("counter", "Downloads a site throttled."),
+}
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    """
+    Thread-safe counters, gauges and histograms plus an optional JSON-lines log.
+
+    Stage timings are recorded from worker threads and job events from the
+    event loop; `render` returns everything in Prometheus text format.
+    """
+
+    def __init__(self, log_path: str | None = None):
+        self._lock = threading.Lock()
+        self._counters: dict[tuple, float] = {}
+        self._gauges: dict[tuple, float] = {}
+        # (name, labels) -> [bucket counts..., sum, count]
+        self._histograms: dict[tuple, list] = {}
+        self._log_lock = threading.Lock()
+        self._log_file = None
+        self.log_path = None
+        self.configure(log_path)
+
+    def configure(self, log_path: str | None = None):
+        """Start (or stop, with None) writing events to a JSON-lines file."""
+        with self._log_lock:
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+            self.log_path = log_path
+            if log_path:
+                directory = os.path.dirname(os.path.abspath(log_path))
+                os.makedirs(directory, exist_ok=True)
+                self._log_file = open(log_path, "a", encoding="utf-8")
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[(name, _labels_key(labels))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def log(self, event: dict):
+        """Append an event to the JSON-lines log, if one is configured."""
+        if self._log_file is None:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), **event}, default=str)
+        with self._log_lock:
+            if self._log_file is not None:
+                self._log_file.write(line + "\n")
+                self._log_file.flush()
+
+    def job_finished(self, job):
+        """Record a finished job (services.job_queue.Job): counters, histograms and a log line."""
+        stats = job.stats
+        status = job.status.value
+        self.inc("jobs_total", kind=job.kind, status=status)
+        if stats.get("bytes"):
+            self.inc("bytes_total", stats["bytes"], kind=job.kind)
+        queued = seconds = None
+        if job.started_at:
+            queued = job.started_at - job.created_at
+            seconds = job.finished_at - job.started_at
+            self.observe("queue_seconds", queued, kind=job.kind)
+            self.observe("job_seconds", seconds, kind=job.kind, status=status)
+        self.log({
+            "event": "job",
+            "id": job.id,
+            "kind": job.kind,
+            "status": status,
+            "queued": round(queued, 4) if queued is not None else None,
+            "seconds": round(seconds, 4) if seconds is not None else None,
+            "bytes": stats.get("bytes"),
+            "retries": stats.get("retries", 0),
+            "timings": stats.get("timings", {}),
+            "url": job.params.get("url"),
+            "path": job.params.get("path"),
+            "error": job.error,
+        })
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+
+        series: dict[str, list[str]] = {}
+        for (name, labels), value in sorted(counters.items()):
+            series.setdefault(name, []).append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value}")
+        for (name, labels), value in sorted(gauges.items()):
+            series.setdefault(name, []).append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value}")
+        for (name, labels), values in sorted(histograms.items()):
+            lines = series.setdefault(name, [])
+            for bound, count in zip(BUCKETS, values):
+                lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels, (('le', f'{bound:g}'),))} {count}")
+            lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {values[-1]}")
+            lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(labels)} {values[-2]}")
+            lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(labels)} {values[-1]}")
+
+        output = []
+        for name, lines in series.items():
+            kind, description = DESCRIPTIONS.get(name, ("untyped", name))
+            output.append(f"# HELP {METRIC_PREFIX}{name} {description}")
+            output.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+            output.extend(lines)
+        return "\n".join(output) + "\n"
+
+
+class StageTimer:
+    """
+    Times the stages of one job into its stats dict and the process-wide metrics.
+
+        timer = StageTimer("download", job.stats)
+        with timer.stage("extract"):
+            info = extract_info_cached(url)
+        path = await loop.run_in_executor(executor, timer.timed(work, "download", "executor_wait"))
+
+    Timings of a stage that runs more than once add up.
+    """
+
+    def __init__(self, kind: str, stats: dict | None = None, metrics: Metrics | None = None):
+        self.kind = kind
+        self.stats = stats if stats is not None else {}
+        self.timings = self.stats.setdefault("timings", {})
+        self.metrics = metrics or get_metrics()
+
+    def record(self, stage: str, seconds: float):
+        self.timings[stage] = round(self.timings.get(stage, 0) + seconds, 4)
+        self.metrics.observe("stage_seconds", seconds, kind=self.kind, stage=stage)
+
+    def count_retry(self, what: str = "request", count: int = 1):
+        """Count retries, in stats["retries"] and the retries_total counter."""
+        if count:
+            self.stats["retries"] = self.stats.get("retries", 0) + count
+            self.metrics.inc("retries_total", count, kind=self.kind, what=what)
+
+    def stage(self, name: str):
+        """Context manager timing the enclosed block as stage `name`."""
+        return _Stage(self, name)
+
+    def timed(self, func, stage: str | None = None, wait: str | None = None):
+        """
+        Wrap a blocking function before handing it to an executor.
+
+        Args:
+            func (Callable): Function to wrap.
+            stage (str, optional): Stage the call itself is recorded as.
+            wait (str, optional): Stage for the time between wrapping and the call starting,
+                i.e. waiting for a free executor thread.
+        """
+        submitted = time.perf_counter()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            if wait:
+                self.record(wait, started - submitted)
+            if stage is None:
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+
+        return wrapper
+
+
+class _Stage:
+    def __init__(self, timer: StageTimer, name: str):
+        self.timer = timer
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, time.perf_counter() - self.started)
+
+
+def instrument(name: str):
+    """
+    Decorator recording how long a function (or coroutine function) takes as
+    handler_seconds{handler=name}. For coroutines that includes their awaits.
+    """
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    get_metrics().observe("handler_seconds", time.perf_counter() - started, handler=name)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                get_metrics().observe("handler_seconds", time.perf_counter() - started, handler=name)
+        return wrapper
+
+    return decorate
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a periodic timer fires.
+
+    Works on any asyncio loop, including qasync's. Lag above
+    LAG_LOG_THRESHOLD is also written to the JSON log.
+
+        monitor = LoopLagMonitor()
+        loop.create_task(monitor.run())
+    """
+
+    def __init__(self, interval: float = LAG_INTERVAL, metrics: Metrics | None = None):
+        self.interval = interval
+        self.metrics = metrics or get_metrics()
+        self.samples: deque[float] = deque(maxlen=LAG_SAMPLES)
+        self.max_lag = 0.0
+
+    async def run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - started - self.interval)
+            self.samples.append(lag)
+            self.metrics.observe("loop_lag_seconds", lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+                self.metrics.set_gauge("loop_lag_max_seconds", lag)
+            if lag > LAG_LOG_THRESHOLD:
+                self.metrics.log({"event": "loop_lag", "seconds": round(lag, 4)})
+
+
+async def serve_metrics(host: str = "127.0.0.1", port: int = 9464):
+    """Serve GET /metrics in Prometheus text format until cancelled."""
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=get_metrics().render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"Metrics on http://{host}:{port}/metrics", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def configure_from_env(loop: asyncio.AbstractEventLoop | None = None) -> list[asyncio.Task]:
+    """
+    Apply YOUTUBE_UPLOADER_METRICS_LOG and YOUTUBE_UPLOADER_METRICS_PORT and start
+    the lag monitor (plus the metrics endpoint if a port is set) on `loop`.
+
+    Returns:
+        list[asyncio.Task]: The started background tasks.
+    """
+    loop = loop or asyncio.get_running_loop()
+    log_path = os.environ.get("YOUTUBE_UPLOADER_METRICS_LOG")
+    if log_path:
+        get_metrics().configure(log_path)
+    tasks = [loop.create_task(LoopLagMonitor().run())]
+    port = os.environ.get("YOUTUBE_UPLOADER_METRICS_PORT")
+    if port:
+        tasks.append(loop.create_task(serve_metrics(port=int(port))))
+    return tasks
+
+
+_default_metrics: Metrics | None = None
+_default_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Return the process-wide metrics registry."""
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+        return _default_metrics
@@ -0,0 +1,21 @@
+import os
+
+# Directory for caches and persistent state. Override with YOUTUBE_UPLOADER_HOME.
+DATA_DIR = os.environ.get("YOUTUBE_UPLOADER_HOME") or os.path.join(
+    os.path.expanduser("~"), ".youtube_uploader"
+)
+
+
+def data_path(*parts: str) -> str:
+    """
+    Build a path inside DATA_DIR, creating its parent directory if needed.
+
+    Args:
+        *parts (str): Path components relative to DATA_DIR.
+
+    Returns:
+        str: Absolute path.
+    """
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
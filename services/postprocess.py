@@ -0,0 +1,204 @@
+"""
+Post-processing of downloaded files into MP4.
+
+Picks the cheapest way to get an MP4: nothing if the file already is one,
+a stream copy (remux) if only the container is wrong, and a transcode of just
+the streams MP4 players can't handle otherwise.
+"""
+import asyncio
+import json
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from services.defaults import CPU_COUNT, POSTPROCESS_WORKERS
+
+# "auto": remux or transcode into MP4 as needed; "never": keep what yt-dlp produced
+CONVERT_MODES = ("auto", "never")
+
+# Codecs that play from an MP4 container in common players (yt-dlp codec prefixes)
+MP4_VIDEO_CODECS = ("avc1", "avc3", "h264", "hev1", "hvc1", "hevc", "h265", "av01")
+MP4_AUDIO_CODECS = ("mp4a", "aac", "mp3", "ac-3", "ec-3")
+
+# Format sort preferring MP4-compatible streams at the same resolution, so most
+# downloads need no post-processing at all
+MP4_FORMAT_SORT = ["res", "fps", "vcodec:h264", "acodec:aac", "ext:mp4:m4a"]
+
+# Containers yt-dlp may merge into, in order of preference
+MERGE_OUTPUT_FORMAT = "mp4/mkv"
+
+AUDIO_EXTENSIONS = (".m4a", ".mp3", ".opus", ".ogg", ".webm", ".aac", ".flac", ".wav")
+
+# Concurrent ffmpeg processes (see services.defaults)
+DEFAULT_WORKERS = POSTPROCESS_WORKERS
+
+TRANSCODE_VIDEO_ARGS = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "20"]
+TRANSCODE_AUDIO_ARGS = ["-c:a", "aac", "-b:a", "192k"]
+
+
+def codec_name(codec: str | None) -> str | None:
+    """Normalize a yt-dlp/ffprobe codec string ("avc1.640028" -> "avc1"); None if there's no stream."""
+    if not codec or codec == "none":
+        return None
+    return codec.split(".")[0].lower()
+
+
+def probe_codecs(path: str) -> tuple[str | None, str | None]:
+    """
+    Read the first video and audio codec of a file with ffprobe.
+
+    Returns:
+        tuple: (video codec, audio codec), None for a missing stream.
+    """
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "stream=codec_type,codec_name", "-of", "json", path],
+        capture_output=True, check=True, text=True
+    ).stdout
+    codecs = {}
+    for stream in json.loads(output).get("streams", []):
+        codecs.setdefault(stream.get("codec_type"), stream.get("codec_name"))
+    return codec_name(codecs.get("video")), codec_name(codecs.get("audio"))
+
+
+def plan(path: str, vcodec: str | None, acodec: str | None) -> dict:
+    """
+    Decide how to turn a file into an MP4.
+
+    Args:
+        path (str): Downloaded file.
+        vcodec (str, optional): Video codec, None for audio-only files.
+        acodec (str, optional): Audio codec, None for video-only files.
+
+    Returns:
+        dict: {"action": "none" | "remux" | "transcode", "video": "copy" | "transcode",
+            "audio": "copy" | "transcode"}.
+    """
+    vcodec, acodec = codec_name(vcodec), codec_name(acodec)
+    video_ok = vcodec is None or vcodec in MP4_VIDEO_CODECS
+    audio_ok = acodec is None or acodec in MP4_AUDIO_CODECS
+    steps = {"video": "copy" if video_ok else "transcode", "audio": "copy" if audio_ok else "transcode"}
+
+    is_mp4 = path.lower().endswith(".mp4")
+    if vcodec is None and path.lower().endswith(AUDIO_EXTENSIONS):
+        # Audio-only downloads are kept in their own container
+        return {"action": "none", **steps}
+    if video_ok and audio_ok:
+        return {"action": "none" if is_mp4 else "remux", **steps}
+    return {"action": "transcode", **steps}
+
+
+def run_ffmpeg(path: str, steps: dict, threads: int | None = None) -> str:
+    """
+    Write `path` into an MP4 next to it, copying or transcoding each stream as planned.
+
+    Args:
+        path (str): Source file.
+        steps (dict): Plan as returned by `plan`.
+        threads (int, optional): ffmpeg encoder threads. ffmpeg's default (all cores) if None.
+
+    Returns:
+        str: Path of the MP4. The source file is removed.
+    """
+    base, ext = os.path.splitext(path)
+    target = base + ".mp4"
+    output = base + ".tmp.mp4" if ext.lower() == ".mp4" else target
+
+    command = ["ffmpeg", "-y", "-loglevel", "error", "-i", path, "-map", "0:v?", "-map", "0:a?"]
+    command += ["-c:v", "copy"] if steps["video"] == "copy" else TRANSCODE_VIDEO_ARGS
+    command += ["-c:a", "copy"] if steps["audio"] == "copy" else TRANSCODE_AUDIO_ARGS
+    if threads:
+        command += ["-threads", str(threads)]
+    command += ["-movflags", "+faststart", output]
+    subprocess.run(command, capture_output=True, check=True)
+
+    if output != target:
+        os.replace(output, target)
+    else:
+        os.remove(path)
+    return target
+
+
+def to_mp4(
+    path: str,
+    vcodec: str | None = None,
+    acodec: str | None = None,
+    mode: str = "auto",
+    threads: int | None = None
+) -> tuple[str, str]:
+    """
+    Convert a downloaded file to MP4 the cheapest way possible.
+
+    Blocking; call it from an executor.
+
+    Args:
+        path (str): Downloaded file.
+        vcodec (str, optional): Video codec from the info dict. Probed if both codecs are None.
+        acodec (str, optional): Audio codec from the info dict.
+        mode (str, optional): "auto" or "never" (see CONVERT_MODES).
+        threads (int, optional): ffmpeg encoder threads.
+
+    Returns:
+        tuple: (final path, action taken: "none", "remux", "transcode" or "skipped").
+    """
+    if mode == "never":
+        return path, "skipped"
+    if vcodec is None and acodec is None:
+        vcodec, acodec = probe_codecs(path)
+    steps = plan(path, vcodec, acodec)
+    if steps["action"] == "none":
+        return path, "none"
+    return run_ffmpeg(path, steps, threads), steps["action"]
+
+
+class PostProcessor:
+    """
+    Bounded pool for CPU-bound post-processing, separate from the download threads.
+
+    At most `max_workers` ffmpeg processes run at once and each gets an equal
+    share of the cores, so conversions queue up instead of oversubscribing the
+    CPU while the network workers move on to the next download.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self.threads = max(1, CPU_COUNT // self.max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="postprocess")
+
+    async def to_mp4(self, path: str, vcodec: str | None = None, acodec: str | None = None,
+                     mode: str = "auto", timer=None) -> tuple[str, str]:
+        """
+        Run `to_mp4` in the pool. See the module-level function for arguments; `timer`
+        (services.metrics.StageTimer) records "postprocess" and "postprocess_wait".
+        """
+        if mode == "never":
+            return path, "skipped"
+        return await self.run(to_mp4, path, vcodec, acodec, mode, self.threads, timer=timer, stage="postprocess")
+
+    async def run(self, func, *args, timer=None, stage: str | None = None):
+        """
+        Run another blocking step of the post-processing stage (e.g. hashing) in the pool.
+
+        With a `timer` (services.metrics.StageTimer), the step is recorded as `stage`
+        and the wait for a free worker as "<stage>_wait".
+        """
+        if timer is not None:
+            func = timer.timed(func, stage, f"{stage}_wait")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+_default_processor: PostProcessor | None = None
+_default_lock = threading.Lock()
+
+
+def get_postprocessor() -> PostProcessor:
+    """Return the process-wide post-processing pool."""
+    global _default_processor
+    with _default_lock:
+        if _default_processor is None:
+            _default_processor = PostProcessor()
+        return _default_processor
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from services.downloader import async_get_video_info
+from services.thumbnails import ThumbnailService
+
+# Size the preview thumbnail is scaled to (16:9 at the preview label's height)
+PREVIEW_SIZE = (356, 200)
+
+
+class TTLCache:
+    """Small in-memory LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, max_entries: int = 64, ttl: float = 600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+
+class PreviewPipeline:
+    """
+    Debounced metadata + thumbnail lookup for a URL input field.
+
+    Each call to `request` supersedes the previous one: the older lookup is
+    cancelled and its caller gets None, so only the latest URL can update the
+    preview. Lookups start after `debounce` seconds without a newer request and
+    results are kept in an LRU cache, so re-entering a recent URL is instant.
+    """
+
+    def __init__(
+        self,
+        debounce: float = 0.4,
+        cache_size: int = 64,
+        ttl: float = 600,
+        thumbnails: ThumbnailService | None = None,
+        thumbnail_size: tuple[int, int] = PREVIEW_SIZE
+    ):
+        self.debounce = debounce
+        self.cache = TTLCache(cache_size, ttl)
+        self.thumbnails = thumbnails or ThumbnailService()
+        self.thumbnail_size = thumbnail_size
+        self._task: asyncio.Task | None = None
+        self._task_url: str | None = None
+
+    async def request(self, url: str) -> dict | None:
+        """
+        Look up title, thumbnail and available qualities for a URL.
+
+        Args:
+            url (str): Video URL.
+
+        Returns:
+            dict | None: Dictionary with 'title', 'thumbnail', 'thumbnail_data' and 'formats'
+            (quality ladder, see services.formats) keys,
+            or None if the lookup was superseded by a newer request.
+        """
+        cached = self.cache.get(url)
+        if cached is not None:
+            self.cancel()
+            return cached
+
+        if self._task_url != url or self._task is None or self._task.done():
+            self.cancel()
+            self._task = asyncio.create_task(self._lookup(url))
+            self._task_url = url
+
+        task = self._task
+        await asyncio.wait({task})
+        if task.cancelled():
+            return None
+        return task.result()
+
+    def cancel(self):
+        """Cancel the lookup in flight, if any."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        self._task_url = None
+
+    async def close(self):
+        self.cancel()
+        await self.thumbnails.close()
+
+    async def _lookup(self, url: str) -> dict:
+        await asyncio.sleep(self.debounce)
+        info = await async_get_video_info(url)
+        if not info:
+            return {}
+
+        result = {
+            "title": info.get("title"),
+            "thumbnail": info.get("thumbnail"),
+            "thumbnail_data": None,
+            "formats": info.get("formats") or [],
+        }
+        if result["thumbnail"]:
+            result["thumbnail_data"] = await self.thumbnails.fetch(result["thumbnail"], *self.thumbnail_size)
+        self.cache.put(url, result)
+        return result
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+
+# Minimum seconds between two deliveries for the same job
+PROGRESS_INTERVAL = 0.25
+
+# Weight of the newest sample in the smoothed speed (exponential moving average)
+SPEED_SMOOTHING = 0.3
+
+
+@dataclass
+class Progress:
+    """Snapshot of a transfer: bytes done, total, smoothed speed (bytes/s) and ETA (s)."""
+
+    bytes: int = 0
+    total_bytes: int | None = None
+    speed: float | None = None
+    eta: float | None = None
+
+    @property
+    def percent(self) -> float:
+        if not self.total_bytes:
+            return 0.0
+        return min(100.0, self.bytes * 100 / self.total_bytes)
+
+    def to_dict(self) -> dict:
+        return {
+            "bytes": self.bytes,
+            "total_bytes": self.total_bytes,
+            "speed": self.speed,
+            "eta": self.eta,
+        }
+
+
+class ProgressReporter:
+    """
+    Thread-safe, rate-limited progress reporting for one job.
+
+    Worker threads call `update` as often as they like. The callback runs on the
+    event loop thread with the latest state, at most once per `interval`
+    seconds, so hundreds of yt-dlp fragment ticks per second cost a handful of
+    loop wakeups and callbacks may touch Qt widgets when the loop is qasync's.
+
+        reporter = ProgressReporter(on_progress)
+        try:
+            await loop.run_in_executor(None, work, reporter.update)
+        finally:
+            reporter.finish()
+    """
+
+    def __init__(self, callback, loop: asyncio.AbstractEventLoop | None = None, interval: float = PROGRESS_INTERVAL):
+        """
+        Args:
+            callback (Callable): Called with a Progress on the loop thread.
+            loop (AbstractEventLoop, optional): Loop to deliver on. Running loop if None.
+            interval (float, optional): Minimum seconds between deliveries.
+        """
+        self._callback = callback
+        self._loop = loop or asyncio.get_running_loop()
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._total = None
+        self._scheduled = False
+        self._closed = False
+        self._last_flush = 0.0
+        self._last_time = time.monotonic()
+        self._last_bytes = 0
+        self._speed = None
+
+    def update(self, done: int, total: int | None = None):
+        """Record progress. Safe to call from any thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._bytes = done
+            if total:
+                self._total = total
+            if self._scheduled:
+                return
+            self._scheduled = True
+            delay = max(0.0, self._last_flush + self.interval - time.monotonic())
+        self._loop.call_soon_threadsafe(self._schedule, delay)
+
+    def finish(self):
+        """Deliver the latest state right away and ignore later updates. Call on the loop thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            progress = self._snapshot()
+        self._callback(progress)
+
+    def _schedule(self, delay: float):
+        if delay > 0:
+            self._loop.call_later(delay, self._flush)
+        else:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            self._scheduled = False
+            if self._closed:
+                return
+            progress = self._snapshot()
+        self._callback(progress)
+
+    def _snapshot(self) -> Progress:
+        now = time.monotonic()
+        elapsed = now - self._last_time
+        if elapsed > 0:
+            sample = (self._bytes - self._last_bytes) / elapsed
+            if self._speed is None:
+                self._speed = sample
+            else:
+                self._speed += SPEED_SMOOTHING * (sample - self._speed)
+        self._last_flush = self._last_time = now
+        self._last_bytes = self._bytes
+
+        eta = None
+        if self._total and self._speed and self._speed > 0:
+            eta = max(0.0, (self._total - self._bytes) / self._speed)
+        return Progress(self._bytes, self._total, self._speed, eta)
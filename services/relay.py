@@ -0,0 +1,331 @@
+"""
+Relay a video from a download straight into a YouTube upload.
+
+The upload's title, description and tags are prefilled from the extracted
+info. When the selected format is a single MP4 file that needs no
+post-processing, the upload follows the download while the file is being
+written, so a relay takes about as long as the slower of the two transfers
+instead of their sum. Other formats are downloaded and converted first, then
+uploaded.
+"""
+import asyncio
+import copy
+import os
+import threading
+from functools import partial
+
+from services.defaults import STREAM_FORMAT
+from services.downloader import async_download_youtube_video, extract_info_cached
+from services.formats import estimate_size, fallback_format, format_available
+from services.library import get_library
+from services.metadata_cache import canonical_key
+from services.postprocess import (
+    MERGE_OUTPUT_FORMAT, MP4_AUDIO_CODECS, MP4_FORMAT_SORT, MP4_VIDEO_CODECS, codec_name
+)
+from services.progress import ProgressReporter
+from services.uploader import upload_video
+
+# videos.insert limits
+TITLE_MAX_CHARS = 100
+DESCRIPTION_MAX_BYTES = 5000
+TAGS_MAX_CHARS = 500
+
+# Protocols yt-dlp downloads front to back into a single file
+STREAMABLE_PROTOCOLS = ("http", "https")
+
+# Bytes a writer may still hold in its file buffer beyond what it reported
+WRITE_SLACK = 64 * 1024
+
+# Seconds to wait before reading again when the writer hasn't flushed yet
+FLUSH_WAIT = 0.1
+
+
+class RelayError(Exception):
+    """Raised when the download feeding a relay fails or changes under the upload."""
+
+
+def _clean(text: str) -> str:
+    # The API rejects angle brackets in titles and descriptions
+    return text.replace("<", "").replace(">", "")
+
+
+def relay_metadata(info: dict) -> dict:
+    """
+    Upload metadata prefilled from an extracted info dict, cut to the API limits.
+
+    Returns:
+        dict: "title", "description" and "tags".
+    """
+    title = _clean(info.get("title") or "").strip()[:TITLE_MAX_CHARS] or info.get("id") or "Untitled"
+    description = _clean(info.get("description") or "").encode("utf-8")[:DESCRIPTION_MAX_BYTES]
+    tags = []
+    used = 0
+    for tag in info.get("tags") or []:
+        tag = _clean(str(tag)).strip()
+        # Tags containing spaces count with their quotes, and tags are comma-separated
+        cost = len(tag) + (2 if " " in tag else 0) + (1 if tags else 0)
+        if tag and tag not in tags and used + cost <= TAGS_MAX_CHARS:
+            tags.append(tag)
+            used += cost
+    return {
+        "title": title,
+        "description": description.decode("utf-8", "ignore"),
+        "tags": tags,
+    }
+
+
+def select_format(info: dict, format_str: str) -> dict:
+    """
+    Resolve a format spec against an extracted info dict the way a download would.
+
+    Blocking; call it from an executor.
+
+    Returns:
+        dict: The info dict updated with the selected format; it has "requested_formats"
+            when separate streams would be merged.
+    """
+    from yt_dlp import YoutubeDL
+
+    if not format_available(info, format_str):
+        format_str = fallback_format(info)
+    opts = {
+        "quiet": True,
+        "format": format_str,
+        "format_sort": MP4_FORMAT_SORT,
+        "merge_output_format": MERGE_OUTPUT_FORMAT,
+    }
+    with YoutubeDL(opts) as ydl:
+        return ydl.process_ie_result(copy.deepcopy(info), download=False)
+
+
+def streamable(selected: dict) -> bool:
+    """Whether a selected format downloads into an MP4 that is final as soon as it is written."""
+    return (
+        not selected.get("requested_formats")
+        and selected.get("ext") == "mp4"
+        and selected.get("protocol") in STREAMABLE_PROTOCOLS
+        and codec_name(selected.get("vcodec")) in MP4_VIDEO_CODECS
+        and codec_name(selected.get("acodec")) in MP4_AUDIO_CODECS
+    )
+
+
+class GrowingFile:
+    """
+    Upload source over a file that a download is still writing.
+
+    Pass `update` as the download's write_hook. `read` blocks until the
+    requested bytes are on disk or the download has ended; `size` stays None
+    until then. `fail` makes pending and later reads raise, so the upload stops
+    with the download.
+    """
+
+    def __init__(self, source_id: str, expected_size: int | None = None):
+        """
+        Args:
+            source_id (str): Stable ID of the media (video and format), to resume the upload session.
+            expected_size (int, optional): Estimated size, for progress until the real one is known.
+        """
+        self.source_id = source_id
+        self.expected_size = expected_size
+        self.path = None
+        self.written = 0
+        self.size = None
+        self._error = None
+        self._cond = threading.Condition()
+
+    def update(self, path: str, written: int, finished: bool):
+        """Record download progress. Called on the download thread."""
+        with self._cond:
+            self.path = path
+            self.written = written
+            if finished:
+                self.size = written
+            self._cond.notify_all()
+
+    def finish(self, path: str):
+        """Mark the download as complete, e.g. when it was served from the library."""
+        with self._cond:
+            if self.path is not None and os.path.abspath(path) != os.path.abspath(self.path):
+                self._error = RelayError(f"Download ended in {path}, not the streamed {self.path}")
+            else:
+                self.path = path
+                self.size = os.path.getsize(path)
+            self._cond.notify_all()
+
+    def fail(self, error: BaseException):
+        with self._cond:
+            self._error = error
+            self._cond.notify_all()
+
+    def wait_path(self) -> str:
+        """Block until the download has created its file. Returns its path."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.path is not None or self._error is not None)
+            self._raise_if_failed()
+            return self.path
+
+    def read(self, offset: int, size: int) -> bytes:
+        """Read `size` bytes at `offset`, fewer only at the end of the finished file. Blocking."""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: (
+                    self._error is not None
+                    or self.size is not None
+                    or self.written >= offset + size + WRITE_SLACK
+                ))
+                self._raise_if_failed()
+                path, ended = self.path, self.size is not None
+                if ended:
+                    size = max(0, min(size, self.size - offset))
+            if size == 0:
+                return b""
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read(size)
+            if len(data) == size:
+                return data
+            if ended:
+                raise RelayError(f"{path} is shorter than the download reported")
+            # Reported but not flushed yet
+            with self._cond:
+                self._cond.wait(FLUSH_WAIT)
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise RelayError(f"Download failed: {self._error}") from self._error
+
+
+async def relay_video(
+    url: str,
+    format_str: str = "best",
+    output_dir: str = ".",
+    privacy_status: str = "private",
+    title: str | None = None,
+    description: str | None = None,
+    tags: list[str] | None = None,
+    category_id: str = "22",
+    thumbnail: str | None = None,
+    playlist_id: str | None = None,
+    progress_hook=None,
+    cancel_flag=None,
+    stats: dict | None = None,
+    executor=None,
+    library=None,
+    scheduler=None,
+    **upload_kwargs
+) -> dict:
+    """
+    Download a video and upload it to YouTube as one pipeline.
+
+    Args:
+        url (str): Video URL.
+        format_str (str, optional): yt-dlp format string.
+        output_dir (str, optional): Directory the download is kept in.
+        privacy_status (str, optional): "public", "private" or "unlisted".
+        title (str, optional): Upload title. The source video's title if None.
+        description (str, optional): Upload description. The source video's if None.
+        tags (list[str], optional): Upload tags. The source video's if None.
+        category_id (str, optional): YouTube category ID.
+        thumbnail (str, optional): Custom thumbnail image to set after the upload.
+        playlist_id (str, optional): Playlist to add the uploaded video to.
+        progress_hook (Callable, optional): Called on the loop thread with a Progress of the
+            upload (and of the download first, when it can't be streamed).
+        cancel_flag (dict, optional): Stops the download and the upload when
+            cancel_flag["cancel"] is True.
+        stats (dict, optional): Receives "mode" ("stream", "sequential" or "library"),
+            "stage" and, while streaming, "downloaded_bytes".
+        executor (Executor, optional): Executor for the blocking download and upload.
+        library (Library, optional): Index of downloaded files. Shared index if None.
+        scheduler (BandwidthScheduler, optional): Bandwidth caps for both transfers.
+        **upload_kwargs: Extra arguments for upload_video (e.g. session, upload_url).
+
+    Returns:
+        dict: Upload API response, plus "path" of the downloaded file. With a thumbnail or
+            playlist, its "post_upload" is a Future of the follow-up calls (see upload_video).
+    """
+    loop = asyncio.get_running_loop()
+    library = library or get_library()
+    stats = stats if stats is not None else {}
+    key = canonical_key(url)
+
+    info = await loop.run_in_executor(executor, extract_info_cached, url)
+    prefilled = relay_metadata(info)
+    reporter = ProgressReporter(progress_hook, loop) if progress_hook else None
+
+    def upload(path: str, source: GrowingFile | None = None) -> dict:
+        def on_progress(sent, total):
+            if reporter:
+                reporter.update(sent, total or (source.expected_size if source else None))
+
+        return upload_video(
+            path,
+            title or prefilled["title"],
+            prefilled["description"] if description is None else description,
+            prefilled["tags"] if tags is None else tags,
+            category_id,
+            privacy_status,
+            on_progress,
+            scheduler=scheduler,
+            thumbnail=thumbnail,
+            playlist_id=playlist_id,
+            source=source,
+            stats=stats,
+            cancel_flag=cancel_flag,
+            **upload_kwargs
+        )
+
+    async def finish_upload(pending) -> dict:
+        stats["stage"] = "upload"
+        try:
+            response = await pending
+        finally:
+            if reporter:
+                reporter.finish()
+        return response
+
+    entry = await loop.run_in_executor(executor, library.lookup, key, format_str)
+    if entry is not None:
+        stats["mode"] = "library"
+        response = await finish_upload(loop.run_in_executor(executor, upload, entry["path"]))
+        return {**response, "path": entry["path"]}
+
+    selected = await loop.run_in_executor(executor, select_format, info, format_str)
+    download = partial(
+        async_download_youtube_video,
+        url,
+        output_dir=output_dir,
+        cancel_flag=cancel_flag,
+        executor=executor,
+        stats=stats,
+        library=library,
+        scheduler=scheduler
+    )
+
+    if not streamable(selected):
+        # Merging or conversion rewrites the file after download: upload the result
+        stats["mode"] = "sequential"
+        path = await download(format_str, progress_hook=progress_hook)
+        response = await finish_upload(loop.run_in_executor(executor, upload, path))
+        return {**response, "path": path}
+
+    stats["mode"] = "stream"
+    growing = GrowingFile(f"{key}:{selected['format_id']}", estimate_size(selected, info.get("duration")))
+
+    def on_download_progress(progress):
+        stats["downloaded_bytes"] = progress.bytes
+
+    def stream_upload() -> dict:
+        return upload(growing.wait_path(), growing)
+
+    pending = loop.run_in_executor(executor, stream_upload)
+    try:
+        path = await download(selected["format_id"], progress_hook=on_download_progress, write_hook=growing.update)
+    except BaseException as e:
+        growing.fail(e)
+        await asyncio.gather(pending, return_exceptions=True)
+        if reporter:
+            reporter.finish()
+        raise
+    growing.finish(path)
+    response = await finish_upload(pending)
+    return {**response, "path": path}
@@ -0,0 +1,406 @@
+import hashlib
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+
+import requests
+
+from services.bandwidth import UPLOAD, get_scheduler
+from services.paths import data_path
+
+# YouTube Data API v3 resumable upload endpoint for videos.insert
+UPLOAD_URL = os.environ.get("YOUTUBE_UPLOAD_URL", "https://www.googleapis.com/upload/youtube/v3/videos")
+
+# Every chunk except the last must be a multiple of 256 KiB
+CHUNK_ALIGN = 256 * 1024
+MIN_CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_SIZE = 128 * 1024 * 1024
+INITIAL_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Chunk size is adapted so that one chunk takes about this long to send
+TARGET_CHUNK_SECONDS = 5.0
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+MAX_RETRIES = 8
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 64.0
+
+REQUEST_TIMEOUT = (10, 120)
+
+# Granularity of bandwidth accounting when an upload is rate limited
+THROTTLE_BLOCK = 64 * 1024
+
+
+class UploadError(Exception):
+    """Raised when an upload fails permanently."""
+
+
+def _align(size: float) -> int:
+    size = int(size) // CHUNK_ALIGN * CHUNK_ALIGN
+    return max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, size))
+
+
+class ThrottledBody:
+    """Request body that hands out `data` in small blocks, each paid for on a bandwidth Stream."""
+
+    def __init__(self, data: bytes, stream):
+        self.data = data
+        self.stream = stream
+
+    def __len__(self) -> int:
+        # Lets requests send a Content-Length instead of chunked encoding
+        return len(self.data)
+
+    def __iter__(self):
+        view = memoryview(self.data)
+        for start in range(0, len(view), THROTTLE_BLOCK):
+            block = view[start:start + THROTTLE_BLOCK]
+            self.stream.consume(len(block))
+            yield block.tobytes()
+
+
+class UploadStateStore:
+    """Persists resumable session URIs and byte offsets as small JSON files."""
+
+    def __init__(self, directory: str | None = None):
+        self.directory = directory or os.path.dirname(data_path("uploads", "state.json"))
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key_for(file_path: str, metadata: dict, source_id: str | None = None) -> str:
+        """
+        Identify an upload by file identity and metadata, so edits start a new session.
+
+        Media that is still being written is identified by `source_id` instead of
+        the file's size and modification time.
+        """
+        if source_id is not None:
+            identity = json.dumps([source_id, metadata], sort_keys=True)
+        else:
+            stat = os.stat(file_path)
+            identity = json.dumps(
+                [os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, metadata],
+                sort_keys=True
+            )
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key: str) -> dict | None:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, key: str, state: dict):
+        path = self._path(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class ResumableUpload:
+    """
+    Chunked upload using the YouTube resumable upload protocol.
+
+    The session URI and confirmed byte offset are saved after every chunk, so an
+    interrupted upload continues where it stopped, even after a restart. Chunk
+    size follows the measured throughput, and transient errors (5xx, 429,
+    connection failures) are retried with exponential backoff.
+
+    The media can also come from a `source` that is still being written (e.g. a
+    download in progress): its total size is sent as unknown ("*") until the
+    source has ended, so chunks go out as soon as they are available.
+    """
+
+    def __init__(
+        self,
+        session,
+        file_path: str,
+        metadata: dict,
+        part: str = "snippet,status",
+        mimetype: str = "video/*",
+        upload_url: str | None = None,
+        state_store: UploadStateStore | None = None,
+        progress_callback=None,
+        chunk_size: int = INITIAL_CHUNK_SIZE,
+        scheduler=None,
+        source=None,
+        cancel_flag=None
+    ):
+        """
+        Args:
+            session: requests-compatible session (e.g. google.auth AuthorizedSession).
+            file_path (str): Path to the file to upload.
+            metadata (dict): Resource body sent when the session is created.
+            part (str, optional): API `part` parameter.
+            mimetype (str, optional): Content type of the media.
+            upload_url (str, optional): Endpoint that creates upload sessions.
+            state_store (UploadStateStore, optional): Where session state is persisted.
+            progress_callback (function, optional): Called with (bytes sent, total bytes), e.g.
+                ProgressReporter.update. Runs on the uploading thread.
+            chunk_size (int, optional): Size of the first chunk in bytes.
+            scheduler (BandwidthScheduler, optional): Bandwidth caps to upload within.
+                Shared scheduler if None.
+            source (optional): Media still being written, read instead of `file_path`: an object
+                with a blocking `read(offset, size)`, `size` (None until the media has ended)
+                and `source_id` (stable across restarts, for resuming). See services.relay.GrowingFile.
+                Total bytes passed to `progress_callback` are None until the size is known.
+            cancel_flag (dict, optional): The upload stops with an UploadError before the next
+                chunk once cancel_flag["cancel"] is True. Its session is kept for resuming.
+        """
+        self.session = session
+        self.file_path = file_path
+        self.metadata = metadata
+        self.part = part
+        self.mimetype = mimetype
+        self.upload_url = upload_url or UPLOAD_URL
+        self.state_store = state_store or UploadStateStore()
+        self.progress_callback = progress_callback
+        self.chunk_size = _align(chunk_size)
+        self.source = source
+        self.cancel_flag = cancel_flag
+        if source is None:
+            self.total_size = os.path.getsize(file_path)
+            self.key = self.state_store.key_for(file_path, metadata)
+        else:
+            self.total_size = source.size
+            self.key = self.state_store.key_for(file_path, metadata, source.source_id)
+        self.session_uri = None
+        self.offset = 0
+        self.retries = 0
+        self._failures = 0
+        self.scheduler = scheduler or get_scheduler()
+        self._stream = None
+
+    def run(self) -> dict:
+        """
+        Upload the whole file, resuming a saved session if there is one.
+
+        Returns:
+            dict: API response for the created resource.
+        """
+        state = self.state_store.load(self.key)
+        if state:
+            self.session_uri = state["session_uri"]
+            self.chunk_size = _align(state.get("chunk_size", self.chunk_size))
+            response = self._query_offset()
+            if response is not None:
+                self._finish()
+                return response
+
+        if self.session_uri is None:
+            self._start_session()
+
+        self._report_progress()
+        with self._reader() as read, self.scheduler.open(UPLOAD) as self._stream:
+            while True:
+                if self.cancel_flag and self.cancel_flag.get("cancel"):
+                    raise UploadError("Upload cancelled")
+                data = read(self.offset, self.chunk_size)
+                if self.source is not None and self.total_size is None:
+                    # Known once the source has ended; the chunk holding the end must say so
+                    self.total_size = self.source.size
+                if self.total_size is not None and self.offset + len(data) < min(
+                    self.total_size, self.offset + self.chunk_size
+                ):
+                    # Reads only come back short at the end; the file was truncated while uploading
+                    raise UploadError(
+                        f"{self.file_path} ended at {self.offset + len(data)} bytes, {self.total_size} expected"
+                    )
+                if not data:
+                    # Streamed media ended on a chunk boundary: tell the server the total
+                    response = self._query_offset()
+                    if response is not None:
+                        self._finish()
+                        return response
+                    if self.offset >= self.total_size:
+                        raise UploadError("Upload incomplete after sending every byte")
+                    continue
+                started = time.monotonic()
+                response = self._send_chunk(data)
+                if response is not None:
+                    self._finish()
+                    return response
+                self._adapt_chunk_size(len(data), time.monotonic() - started)
+                self._save_state()
+                self._report_progress()
+
+    @contextmanager
+    def _reader(self):
+        """Yield a `read(offset, size)` function over the media."""
+        if self.source is not None:
+            yield self.source.read
+            return
+        with open(self.file_path, "rb") as f:
+            def read(offset: int, size: int) -> bytes:
+                f.seek(offset)
+                return f.read(size)
+            yield read
+
+    def _total(self) -> str:
+        """Total size for Content-Range headers, "*" while a source is still growing."""
+        return "*" if self.total_size is None else str(self.total_size)
+
+    def _start_session(self):
+        headers = {
+            "Content-Type": "application/json; charset=UTF-8",
+            "X-Upload-Content-Type": self.mimetype,
+        }
+        if self.total_size is not None:
+            headers["X-Upload-Content-Length"] = str(self.total_size)
+        response = self._request(
+            "POST",
+            self.upload_url,
+            params={"uploadType": "resumable", "part": self.part},
+            headers=headers,
+            data=json.dumps(self.metadata)
+        )
+        if response.status_code != 200 or "Location" not in response.headers:
+            raise UploadError(f"Failed to start upload session: {response.status_code} {response.text}")
+        self.session_uri = response.headers["Location"]
+        self.offset = 0
+        self._save_state()
+
+    def _send_chunk(self, data: bytes) -> dict | None:
+        """Send one chunk. Returns the final API response, or None if more data is expected."""
+        end = self.offset + len(data) - 1
+        if self._stream is not None and self._stream.rate is not None:
+            body = ThrottledBody(data, self._stream)
+        else:
+            body = data
+            if self._stream is not None:
+                self._stream.consume(len(data))
+        try:
+            response = self.session.request(
+                "PUT",
+                self.session_uri,
+                headers={
+                    "Content-Length": str(len(data)),
+                    "Content-Range": f"bytes {self.offset}-{end}/{self._total()}",
+                },
+                data=body,
+                timeout=REQUEST_TIMEOUT
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = str(e)
+        else:
+            if response.status_code in (200, 201):
+                self._failures = 0
+                return response.json()
+            if response.status_code == 308:
+                self._failures = 0
+                self.offset = self._parse_range(response)
+                return None
+            if response.status_code in (404, 410):
+                # Session expired on the server side, start over
+                self._start_session()
+                return None
+            if response.status_code not in RETRYABLE_STATUS:
+                raise UploadError(f"Upload failed: {response.status_code} {response.text}")
+            error = f"HTTP {response.status_code}"
+
+        self._failures = self._backoff(self._failures, error)
+        # Halve the chunk after a failure and ask the server how much it kept
+        self.chunk_size = _align(self.chunk_size / 2)
+        response = self._query_offset()
+        if self.session_uri is None:
+            self._start_session()
+        return response
+
+    def _query_offset(self) -> dict | None:
+        """Ask the server how many bytes it has. Returns the API response if already complete."""
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(
+                    "PUT",
+                    self.session_uri,
+                    headers={"Content-Length": "0", "Content-Range": f"bytes */{self._total()}"},
+                    timeout=REQUEST_TIMEOUT
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                attempt = self._backoff(attempt, str(e))
+                continue
+
+            if response.status_code in (200, 201):
+                return response.json()
+            if response.status_code == 308:
+                self.offset = self._parse_range(response)
+                return None
+            if response.status_code in (404, 410):
+                self.session_uri = None
+                self.offset = 0
+                return None
+            if response.status_code in RETRYABLE_STATUS:
+                attempt = self._backoff(attempt, f"HTTP {response.status_code}")
+                continue
+            raise UploadError(f"Failed to query upload status: {response.status_code} {response.text}")
+
+    def _request(self, method: str, url: str, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, url, timeout=REQUEST_TIMEOUT, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                attempt = self._backoff(attempt, str(e))
+                continue
+            if response.status_code in RETRYABLE_STATUS:
+                attempt = self._backoff(attempt, f"HTTP {response.status_code}")
+                continue
+            return response
+
+    def _backoff(self, attempt: int, error: str) -> int:
+        if attempt >= MAX_RETRIES:
+            raise UploadError(f"Giving up after {attempt} retries: {error}")
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+        print(f"⚠️ Upload error ({error}), retrying in {delay:.1f}s")
+        self.retries += 1
+        time.sleep(delay)
+        return attempt + 1
+
+    @staticmethod
+    def _parse_range(response) -> int:
+        # "Range: bytes=0-1234" means bytes 0..1234 were stored; no header means none
+        header = response.headers.get("Range")
+        if not header:
+            return 0
+        return int(header.rsplit("-", 1)[1]) + 1
+
+    def _adapt_chunk_size(self, sent: int, elapsed: float):
+        if sent <= 0 or elapsed <= 0:
+            return
+        throughput = sent / elapsed
+        wanted = throughput * TARGET_CHUNK_SECONDS
+        # Grow at most 2x per step so one fast chunk doesn't overshoot
+        self.chunk_size = _align(min(wanted, self.chunk_size * 2))
+
+    def _save_state(self):
+        self.state_store.save(self.key, {
+            "session_uri": self.session_uri,
+            "offset": self.offset,
+            "chunk_size": self.chunk_size,
+            "file": os.path.abspath(self.file_path),
+            "size": self.total_size,
+            "updated_at": time.time(),
+        })
+
+    def _finish(self):
+        self.offset = self.total_size
+        self.state_store.delete(self.key)
+        self._report_progress()
+
+    def _report_progress(self):
+        if self.progress_callback and self.total_size != 0:
+            self.progress_callback(self.offset, self.total_size)
@@ -0,0 +1,293 @@
+"""
+Per-site concurrency and request-rate limits for downloads, with retries.
+
+Downloads are grouped by site: the yt-dlp extractor of the URL (all YouTube
+videos are one site), or the host name for direct links. Each site has a cap
+on concurrent downloads and on how fast new ones may start. The cap adapts
+like TCP congestion control: when a site throttles us (HTTP 429, bot checks,
+repeated 403s on media) its cap is halved, its start rate slowed and new
+downloads wait out a cooldown; every successful download raises the cap again
+by a fraction, back up to the configured maximum.
+
+Failed downloads are classified by `classify_error`; throttled and transient
+failures are retried with jittered exponential backoff (see `backoff`), the
+rest fail right away.
+"""
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from services.defaults import SITE_CONCURRENCY, SITE_RATE
+from services.metrics import get_metrics
+
+# Concurrent downloads per site, and how many may start per second (see services.defaults)
+DEFAULT_CONCURRENCY = SITE_CONCURRENCY
+DEFAULT_RATE = SITE_RATE
+
+# Floor of the adapted start rate, in downloads per second
+MIN_RATE = 0.05
+
+# Attempts per download, the first one included
+MAX_ATTEMPTS = 4
+
+# Backoff between attempts: full jitter up to BASE * 2 ** attempt seconds, at most MAX
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 120.0
+
+# Consecutive 403s from a site, after re-extracting its media URLs, that count as throttling
+FORBIDDEN_STRIKES = 3
+
+# Cooldown of a throttled site, doubling while it keeps throttling
+THROTTLE_COOLDOWN = 15.0
+THROTTLE_COOLDOWN_MAX = 600.0
+
+# Longest a waiting download sleeps before checking for cancellation again
+WAIT_POLL = 0.5
+
+CANCELLED = "cancelled"
+THROTTLED = "throttled"
+FORBIDDEN = "forbidden"
+TRANSIENT = "transient"
+FATAL = "fatal"
+RETRYABLE = (THROTTLED, FORBIDDEN, TRANSIENT)
+
+# Checked in this order against the error message; the first match wins
+_ERROR_PATTERNS = (
+    (CANCELLED, ("cancelled by user",)),
+    (THROTTLED, (
+        "http error 429", "too many requests", "rate-limit", "rate limit", "ratelimit", "not a bot",
+    )),
+    (FORBIDDEN, ("http error 403",)),
+    (FATAL, (
+        "http error 4", "unsupported url", "video unavailable", "private video", "is not available",
+        "requested format", "no space left", "permission denied", "sign in to confirm your age",
+    )),
+    (TRANSIENT, (
+        "http error 5", "timed out", "timeout", "connection reset", "connection aborted",
+        "connection refused", "remote end closed", "temporary failure", "name resolution",
+        "incompleteread", "incomplete read", "unable to download", "unable to connect",
+        "eof occurred", "network is unreachable",
+        # yt-dlp giving up on a fragmented download, e.g. "Giving up after 10 fragment retries"
+        "fragment retries", "giving up after", "did not get any data blocks",
+    )),
+)
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Classify a failed download: CANCELLED, THROTTLED (the site is limiting us),
+    FORBIDDEN (HTTP 403; throttling only if it repeats, see SiteScheduler.release),
+    TRANSIENT (network or server trouble worth retrying) or FATAL.
+    """
+    message = str(error).lower()
+    for kind, patterns in _ERROR_PATTERNS:
+        if any(pattern in message for pattern in patterns):
+            return kind
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return TRANSIENT
+    return FATAL
+
+
+def site_for(key: str) -> str:
+    """
+    Site of a video key (see metadata_cache.canonical_key): the extractor, e.g.
+    "youtube", or the host name of a plain URL.
+    """
+    scheme, _, rest = key.partition(":")
+    if scheme != "url":
+        # YoutubeTab, YoutubeClip... are the same site
+        return scheme.lower().removesuffix("tab").removesuffix("clip")
+    host = urlparse(rest).netloc.lower()
+    return host.removeprefix("www.") or rest
+
+
+def backoff(attempt: int) -> float:
+    """Seconds to wait before retry number `attempt` (1-based), with full jitter."""
+    return random.uniform(BACKOFF_BASE, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class _Site:
+    def __init__(self, concurrency: int, rate: float):
+        self.limit = float(concurrency)
+        self.rate = rate
+        self.tokens = float(concurrency)
+        self.refilled = time.monotonic()
+        self.active = 0
+        self.cooldown_until = 0.0
+        self.strikes = 0
+        self.forbidden = 0
+
+    def refill(self, now: float, burst: float):
+        self.tokens = min(burst, self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+
+
+class SiteScheduler:
+    """
+    Per-site download slots. Thread-safe; `slot` blocks the calling download thread.
+
+        with scheduler.slot("youtube", cancel_flag):
+            ydl.download(...)
+
+    A slot that exits with an exception feeds the error's class back into the
+    site's limits.
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_CONCURRENCY, rate: float = DEFAULT_RATE):
+        """
+        Args:
+            max_concurrency (int, optional): Most downloads running at once per site.
+            rate (float, optional): Most downloads starting per second per site.
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_rate = rate
+        self._sites: dict[str, _Site] = {}
+        self._cond = threading.Condition()
+
+    def configure(self, max_concurrency: int | None = None, rate: float | None = None):
+        """Change the per-site maximums; adapted limits above them are lowered at once."""
+        with self._cond:
+            if max_concurrency is not None:
+                self.max_concurrency = max(1, max_concurrency)
+            if rate is not None:
+                self.max_rate = rate
+            for state in self._sites.values():
+                state.limit = min(state.limit, self.max_concurrency)
+                state.rate = min(state.rate, self.max_rate)
+            self._cond.notify_all()
+
+    def limits(self) -> dict[str, dict]:
+        """Current adapted limits of every site seen so far."""
+        with self._cond:
+            return {
+                site: {
+                    "concurrency": int(state.limit),
+                    "rate": round(state.rate, 3),
+                    "active": state.active,
+                    "cooldown": round(max(0.0, state.cooldown_until - time.monotonic()), 1),
+                }
+                for site, state in self._sites.items()
+            }
+
+    @contextmanager
+    def slot(self, site: str, cancel_flag: dict | None = None):
+        """Hold one of a site's download slots, yielding the seconds waited for it. See `acquire`."""
+        waited = self.acquire(site, cancel_flag)
+        try:
+            yield waited
+        except BaseException as e:
+            self.release(site, classify_error(e))
+            raise
+        self.release(site)
+
+    def acquire(self, site: str, cancel_flag: dict | None = None) -> float:
+        """
+        Wait for a free slot and a start token of `site`, and out any cooldown.
+
+        Returns:
+            float: Seconds waited.
+
+        Raises:
+            Exception: "Download cancelled by user" if cancel_flag["cancel"] is set while waiting.
+        """
+        started = time.monotonic()
+        with self._cond:
+            state = self._site(site)
+            while True:
+                if cancel_flag and cancel_flag.get("cancel"):
+                    raise Exception("Download cancelled by user")
+                now = time.monotonic()
+                state.refill(now, self.max_concurrency)
+                wait = state.cooldown_until - now
+                if wait <= 0:
+                    if state.active >= max(1, int(state.limit)):
+                        # Woken by `release`
+                        wait = WAIT_POLL
+                    elif state.tokens >= 1:
+                        state.tokens -= 1
+                        state.active += 1
+                        return time.monotonic() - started
+                    else:
+                        wait = (1 - state.tokens) / state.rate
+                self._cond.wait(min(wait, WAIT_POLL))
+
+    def release(self, site: str, outcome: str | None = None):
+        """
+        Free a slot and adapt the site's limits to how the download went.
+
+        Args:
+            site (str): Site the slot was acquired for.
+            outcome (str, optional): None for success, else a `classify_error` class.
+        """
+        metrics = get_metrics()
+        with self._cond:
+            state = self._site(site)
+            state.active = max(0, state.active - 1)
+            if outcome == FORBIDDEN:
+                # One 403 is usually a stale media URL; only a run of them means we're blocked
+                state.forbidden += 1
+                if state.forbidden >= FORBIDDEN_STRIKES:
+                    outcome = THROTTLED
+            if outcome not in (FORBIDDEN, CANCELLED):
+                state.forbidden = 0
+            if outcome == THROTTLED:
+                state.strikes += 1
+                state.limit = max(1.0, state.limit / 2)
+                state.rate = max(MIN_RATE, state.rate / 2)
+                cooldown = min(THROTTLE_COOLDOWN_MAX, THROTTLE_COOLDOWN * 2 ** (state.strikes - 1))
+                state.cooldown_until = max(state.cooldown_until, time.monotonic() + cooldown)
+                state.tokens = 0.0
+                metrics.inc("site_throttled_total", site=site)
+                print(f"⚠️ {site} is throttling: {int(state.limit)} at a time from now, pausing {cooldown:.0f}s")
+            elif outcome is None and time.monotonic() >= state.cooldown_until:
+                # Downloads that started before a throttle don't count as the site recovering
+                state.strikes = 0
+                # Additive increase: about one more slot per `limit` successful downloads
+                state.limit = min(float(self.max_concurrency), state.limit + 1 / state.limit)
+                state.rate = min(self.max_rate, state.rate + self.max_rate / self.max_concurrency / state.limit)
+            metrics.set_gauge("site_concurrency", int(state.limit), site=site)
+            self._cond.notify_all()
+
+    def cooldown(self, site: str) -> float:
+        """Seconds until a throttled site takes new downloads again."""
+        with self._cond:
+            state = self._sites.get(site)
+            return max(0.0, state.cooldown_until - time.monotonic()) if state else 0.0
+
+    def _site(self, site: str) -> _Site:
+        state = self._sites.get(site)
+        if state is None:
+            state = self._sites[site] = _Site(self.max_concurrency, self.max_rate)
+        return state
+
+
+_default_scheduler: SiteScheduler | None = None
+_default_lock = threading.Lock()
+
+
+def get_site_scheduler() -> SiteScheduler:
+    """Return the process-wide site scheduler."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = SiteScheduler()
+        return _default_scheduler
+
+
+def warn_if_capped(workers: int, scheduler: SiteScheduler | None = None) -> bool:
+    """
+    Warn that fewer than `workers` parallel downloads will run when they all come
+    from one site, because of the per-site cap.
+
+    Returns:
+        bool: True if the per-site cap is below `workers`.
+    """
+    per_site = (scheduler or get_site_scheduler()).max_concurrency
+    if workers <= per_site:
+        return False
+    print(f"⚠️ {workers} parallel downloads requested, but at most {per_site} run at once from any one site",
+          file=sys.stderr)
+    return True
@@ -0,0 +1,207 @@
+"""
+Thumbnail fetching and scaling off the GUI thread.
+
+Images are decoded and scaled in worker threads with Pillow, or with Qt's
+QImage (which is safe outside the GUI thread) when Pillow isn't installed.
+Scaled results are kept on disk, keyed by source and target size, so a
+thumbnail is fetched and scaled once and afterwards is a small file read.
+"""
+import asyncio
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+from services.paths import data_path
+
+MAX_CONCURRENT_FETCHES = 4
+SCALE_THREADS = 2
+JPEG_QUALITY = 90
+
+# Oldest scaled thumbnails are deleted beyond this many files
+MAX_CACHE_FILES = 5000
+
+FETCH_TIMEOUT = aiohttp.ClientTimeout(total=20)
+
+
+def scale_image(data: bytes, width: int, height: int, quality: int = JPEG_QUALITY, qt_fallback: bool = False) -> bytes:
+    """
+    Decode an image and scale it to fit `width` x `height`, keeping the aspect ratio.
+
+    Blocking; call it from an executor. Images are never enlarged.
+
+    Args:
+        qt_fallback (bool, optional): Use Qt's QImage when Pillow isn't installed. Only for
+            the GUI: headless code paths must not import PyQt6.
+
+    Returns:
+        bytes: JPEG data.
+
+    Raises:
+        ImportError: Pillow isn't installed and `qt_fallback` is False.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        if not qt_fallback:
+            raise ImportError("Pillow is needed to scale images outside the GUI (pip install Pillow)")
+        return _scale_with_qt(data, width, height, quality)
+
+    with Image.open(io.BytesIO(data)) as image:
+        # Lets the JPEG decoder skip detail that the thumbnail won't show
+        image.draft("RGB", (width, height))
+        image.thumbnail((width, height), Image.Resampling.LANCZOS)
+        output = io.BytesIO()
+        image.convert("RGB").save(output, "JPEG", quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def _scale_with_qt(data: bytes, width: int, height: int, quality: int) -> bytes:
+    from PyQt6.QtCore import QBuffer, QByteArray, QIODevice, Qt
+    from PyQt6.QtGui import QImage
+
+    image = QImage.fromData(data)
+    if image.isNull():
+        raise ValueError("Unsupported image data")
+    if image.width() > width or image.height() > height:
+        image = image.scaled(
+            width, height,
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        )
+    output = QByteArray()
+    buffer = QBuffer(output)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, "JPEG", quality)
+    return bytes(output)
+
+
+class ThumbnailService:
+    """
+    Fetch, scale and cache thumbnails for display.
+
+    One pooled HTTP session serves all fetches, at most `max_concurrent` at a
+    time; concurrent requests for the same thumbnail share one fetch. Scaling
+    runs in a small thread pool, and the scaled JPEG is stored on disk.
+
+        thumbnails = ThumbnailService()
+        data = await thumbnails.fetch(url, 356, 200)
+        pixmap = QPixmap.fromImage(QImage.fromData(data))
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_FETCHES, cache_dir: str | None = None):
+        self.cache_dir = cache_dir or os.path.dirname(data_path("cache", "thumbnails", "x.jpg"))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=SCALE_THREADS, thread_name_prefix="thumbnail")
+        self._max_concurrent = max_concurrent
+        self._semaphore: asyncio.Semaphore | None = None
+        self._session: aiohttp.ClientSession | None = None
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._pruned = False
+
+    async def fetch(self, url: str, width: int, height: int) -> bytes | None:
+        """
+        Thumbnail of a remote image scaled to fit `width` x `height`.
+
+        Returns:
+            bytes | None: JPEG data, or None if the image could not be fetched or decoded.
+        """
+        key = self._key(f"url:{url}", width, height)
+        return await self._get(key, lambda: self._download(url), width, height)
+
+    async def load_file(self, path: str, width: int, height: int) -> bytes | None:
+        """Thumbnail of a local image file, cached by path, size and modification time."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = self._key(f"file:{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}", width, height)
+        loop = asyncio.get_running_loop()
+        return await self._get(key, lambda: loop.run_in_executor(self._executor, _read_file, path), width, height)
+
+    async def close(self):
+        for task in self._inflight.values():
+            task.cancel()
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._executor.shutdown(wait=False)
+
+    @staticmethod
+    def _key(source: str, width: int, height: int) -> str:
+        return hashlib.sha1(f"{source}|{width}x{height}".encode("utf-8")).hexdigest()
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.jpg")
+
+    async def _get(self, key: str, load, width: int, height: int) -> bytes | None:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._produce(key, load, width, height))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller giving up doesn't cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    async def _produce(self, key: str, load, width: int, height: int) -> bytes | None:
+        loop = asyncio.get_running_loop()
+        path = self._cache_path(key)
+        cached = await loop.run_in_executor(self._executor, _read_file, path)
+        if cached:
+            return cached
+
+        data = await load()
+        if not data:
+            return None
+        try:
+            return await loop.run_in_executor(self._executor, self._scale_and_store, data, width, height, path)
+        except Exception as e:
+            print("Error scaling thumbnail:", e)
+            return None
+
+    def _scale_and_store(self, data: bytes, width: int, height: int, path: str) -> bytes:
+        # Only the GUI displays thumbnails, so Qt is already loaded
+        scaled = scale_image(data, width, height, qt_fallback=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(scaled)
+        os.replace(tmp_path, path)
+        if not self._pruned:
+            self._pruned = True
+            self._prune()
+        return scaled
+
+    def _prune(self):
+        entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)]
+        if len(entries) <= MAX_CACHE_FILES:
+            return
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:len(entries) - MAX_CACHE_FILES]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    async def _download(self, url: str) -> bytes | None:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._max_concurrent)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=FETCH_TIMEOUT)
+            self._semaphore = asyncio.Semaphore(self._max_concurrent)
+        async with self._semaphore:
+            try:
+                async with self._session.get(url) as resp:
+                    if resp.status == 200:
+                        return await resp.read()
+                    print(f"Thumbnail fetch failed: HTTP {resp.status}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print("Error fetching thumbnail:", e)
+        return None
+
+
+def _read_file(path: str) -> bytes | None:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
@@ -1,43 +1,48 @@
+# google-auth, googleapiclient and requests are imported on first use, so that
+# importing this module (e.g. for the CLI's --help) does not pay their import time.
 import os
-import pickle
-import google.auth.transport.requests
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 
-# OAuth 2.0 scope for uploading videos to YouTube
-SCOPES = ['https://www.googleapis.com/auth/youtube.upload']
+# thumbnails.set limits: 2 MB, JPEG or PNG; 1280x720 is the recommended size
+THUMBNAIL_MAX_BYTES = 2 * 1024 * 1024
+THUMBNAIL_SIZE = (1280, 720)
+THUMBNAIL_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png"}
 
-# Path to the client secrets JSON file
-CLIENT_SECRETS_FILE = os.path.join('resources', 'client_secrets.json')
+# Threads running post-upload calls. They live as long as the process, so each
+# keeps reusing its own connection of the client's thread-local transport.
+POST_UPLOAD_THREADS = 4
 
-# File to store the user's access and refresh tokens
-TOKEN_FILE = 'token.json'
+_post_upload_executor: ThreadPoolExecutor | None = None
+_post_upload_lock = threading.Lock()
 
 
-def get_authenticated_service():
+def get_client():
+    """Return the shared YouTubeClient (see services.youtube_client)."""
+    from services.youtube_client import get_client as _get_client
+    return _get_client()
+
+
+def get_credentials():
     """
-    Authenticates the user with YouTube Data API v3 using OAuth 2.0.
+    Returns valid OAuth 2.0 credentials from the shared client.
     If token is already saved, it will be reused. Otherwise, the user will be prompted.
 
     Returns:
-        googleapiclient.discovery.Resource: Authenticated YouTube API service.
+        google.oauth2.credentials.Credentials: Valid user credentials.
     """
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+    return get_client().credentials()
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(google.auth.transport.requests.Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRETS_FILE, SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open(TOKEN_FILE, 'w') as token:
-            token.write(creds.to_json())
 
-    return build('youtube', 'v3', credentials=creds)
+def get_authenticated_service():
+    """
+    Returns the shared authenticated YouTube Data API v3 client.
+
+    Returns:
+        googleapiclient.discovery.Resource: Authenticated YouTube API service.
+    """
+    return get_client().service()
 
 
 def upload_video(
@@ -47,7 +52,15 @@ def upload_video(
     tags: list[str] = None,
     category_id: str = "22",
     privacy_status: str = "private",
-    progress_callback=None
+    progress_callback=None,
+    session=None,
+    upload_url: str = None,
+    scheduler=None,
+    thumbnail: str = None,
+    playlist_id: str = None,
+    source=None,
+    stats: dict = None,
+    cancel_flag: dict = None
 ):
     """
     Uploads a video to YouTube.
@@ -59,12 +72,29 @@ def upload_video(
         tags (list[str], optional): List of tags.
         category_id (str, optional): YouTube category ID. Default is "22" (People & Blogs).
         privacy_status (str, optional): "public", "private", or "unlisted". Default is "private".
-        progress_callback (function, optional): A function to receive upload progress in percent.
+        progress_callback (function, optional): Called with (bytes sent, total bytes) from the
+            uploading thread. Wrap GUI updates in a services.progress.ProgressReporter.
+        session (requests.Session, optional): HTTP session for the upload. Shared authorized session if None.
+        upload_url (str, optional): Resumable upload endpoint, e.g. a local fake server.
+        scheduler (BandwidthScheduler, optional): Bandwidth caps to upload within. Shared scheduler if None.
+        thumbnail (str, optional): Image to set as the custom thumbnail after the upload.
+        playlist_id (str, optional): Playlist to add the video to after the upload.
+        source (optional): Media still being written to `video_file_path`, uploaded as it
+            grows (see services.relay.GrowingFile).
+        stats (dict, optional): Receives "timings" of the upload stages and "retries".
+        cancel_flag (dict, optional): Stops the upload between chunks when cancel_flag["cancel"]
+            is True (it can be resumed later).
 
     Returns:
-        dict: API response from YouTube containing video ID and other metadata.
+        dict: API response from YouTube containing video ID and other metadata, plus
+            "post_upload" if a thumbnail or playlist was given: a Future of the follow-up
+            calls' results (see start_post_upload), which run after this returns.
     """
-    youtube = get_authenticated_service()
+    from services.metrics import StageTimer
+    from services.resumable import ResumableUpload
+
+    if session is None:
+        session = get_client().session()
 
     body = {
         'snippet': {
@@ -78,30 +108,162 @@ def upload_video(
         }
     }
 
-    # Use resumable upload to allow progress tracking and larger files
-    media = MediaFileUpload(
+    # Resumable upload: adaptive chunks, retries, and resume after restarts
+    upload = ResumableUpload(
+        session,
         video_file_path,
-        chunksize=1024*1024,
-        resumable=True,
-        mimetype='video/*'
+        body,
+        mimetype='video/*',
+        upload_url=upload_url,
+        progress_callback=progress_callback,
+        scheduler=scheduler,
+        source=source,
+        cancel_flag=cancel_flag
     )
+    timer = StageTimer("upload", stats)
+    try:
+        with timer.stage("upload"):
+            response = upload.run()
+    finally:
+        timer.count_retry("chunk", upload.retries)
+
+    print(f"Upload complete. Video ID: {response.get('id')}")
+    if response.get('id') and (thumbnail or playlist_id):
+        # Not waited for here, so the caller's upload slot is free while they run
+        response['post_upload'] = start_post_upload(response['id'], thumbnail, playlist_id)
+    return response
+
+
+def prepare_thumbnail(image_path: str) -> tuple[bytes, str]:
+    """
+    Read a thumbnail image, resizing/recompressing it to fit the API limits.
+
+    JPEG and PNG files under 2 MB are sent as they are. Anything else is scaled
+    to fit 1280x720 and saved as JPEG with Pillow, lowering the quality until it
+    fits. Without Pillow, other images under 2 MB are sent as they are and
+    larger ones are rejected.
+
+    Returns:
+        tuple: (image data, MIME type).
 
-    request = youtube.videos().insert(
-        part="snippet,status",
-        body=body,
-        media_body=media
+    Raises:
+        ValueError: The image can't be brought under 2 MB.
+    """
+    with open(image_path, "rb") as f:
+        data = f.read()
+    mimetype = THUMBNAIL_TYPES.get(os.path.splitext(image_path)[1].lower())
+    if mimetype and len(data) <= THUMBNAIL_MAX_BYTES:
+        return data, mimetype
+
+    try:
+        from services.thumbnails import scale_image
+
+        for quality in (90, 80, 70, 60, 50):
+            scaled = scale_image(data, *THUMBNAIL_SIZE, quality=quality)
+            if len(scaled) <= THUMBNAIL_MAX_BYTES:
+                return scaled, "image/jpeg"
+    except ImportError as e:
+        if len(data) <= THUMBNAIL_MAX_BYTES:
+            # The API detects the image type itself
+            return data, "application/octet-stream"
+        raise ValueError(f"Thumbnail {image_path} is over 2 MB and can't be scaled: {e}") from e
+    raise ValueError(f"Thumbnail {image_path} can't be compressed below 2 MB")
+
+
+def set_thumbnail(video_id: str, thumbnail) -> dict:
+    """
+    Set a video's custom thumbnail.
+
+    Args:
+        video_id (str): Uploaded video ID.
+        thumbnail (str | tuple): Image path, or (data, MIME type) from prepare_thumbnail.
+
+    Returns:
+        dict: API response.
+    """
+    from googleapiclient.http import MediaInMemoryUpload
+
+    data, mimetype = prepare_thumbnail(thumbnail) if isinstance(thumbnail, str) else thumbnail
+    client = get_client()
+    request = client.service().thumbnails().set(
+        videoId=video_id,
+        media_body=MediaInMemoryUpload(data, mimetype=mimetype)
     )
+    return client.execute(request)
 
-    response = None
-    if progress_callback:
-        progress_callback(0)
 
-    # Loop through upload chunks, updating progress if a callback is provided
-    while response is None:
-        status, response = request.next_chunk()
-        if status and progress_callback:
-            progress = int(status.progress() * 100)
-            progress_callback(progress)
+def add_to_playlist(video_id: str, playlist_id: str) -> dict:
+    """Append a video to a playlist. Returns the created playlist item."""
+    client = get_client()
+    request = client.service().playlistItems().insert(
+        part="snippet",
+        body={
+            "snippet": {
+                "playlistId": playlist_id,
+                "resourceId": {"kind": "youtube#video", "videoId": video_id},
+            }
+        }
+    )
+    return client.execute(request)
 
-    print(f"Upload complete. Video ID: {response.get('id')}")
-    return response
+
+def _get_post_upload_executor() -> ThreadPoolExecutor:
+    global _post_upload_executor
+    with _post_upload_lock:
+        if _post_upload_executor is None:
+            _post_upload_executor = ThreadPoolExecutor(
+                max_workers=POST_UPLOAD_THREADS, thread_name_prefix="post-upload"
+            )
+        return _post_upload_executor
+
+
+def start_post_upload(video_id: str, thumbnail=None, playlist_id: str = None) -> Future:
+    """
+    Start the follow-up calls for an uploaded video on the shared post-upload threads.
+
+    A failing step doesn't undo the upload; its error is reported instead.
+
+    Args:
+        video_id (str): Uploaded video ID.
+        thumbnail (str | tuple, optional): Image path or prepared (data, MIME type).
+        playlist_id (str, optional): Playlist to add the video to.
+
+    Returns:
+        Future: Resolves, never fails, to "ok" or "error: ..." per step that ran, keyed
+            "thumbnail" / "playlist". Wrap it with asyncio.wrap_future to await it.
+    """
+    steps = {}
+    if thumbnail:
+        steps["thumbnail"] = (set_thumbnail, thumbnail)
+    if playlist_id:
+        steps["playlist"] = (add_to_playlist, playlist_id)
+
+    done = Future()
+    results = {}
+    if not steps:
+        done.set_result(results)
+        return done
+    lock = threading.Lock()
+
+    def on_step_done(name: str, future: Future):
+        try:
+            future.result()
+            result = "ok"
+        except Exception as e:
+            print(f"❌ {name} step failed for {video_id}:", e)
+            result = f"error: {e}"
+        with lock:
+            results[name] = result
+            finished = len(results) == len(steps)
+        if finished:
+            done.set_result({name: results[name] for name in steps})
+
+    pool = _get_post_upload_executor()
+    for name, (func, arg) in steps.items():
+        pool.submit(func, video_id, arg).add_done_callback(partial(on_step_done, name))
+    return done
+
+
+def post_upload(video_id: str, thumbnail=None, playlist_id: str = None) -> dict:
+    """Run the follow-up calls for an uploaded video and wait for them (see start_post_upload)."""
+    return start_post_upload(video_id, thumbnail, playlist_id).result()
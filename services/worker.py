@@ -0,0 +1,181 @@
+"""
+Worker that runs jobs from a shared job store (see services.job_store).
+
+Run one per machine, all pointing at the same store:
+
+    python -m services worker --store /mnt/shared/jobs.sqlite3 -j 4 --upload-jobs 2
+
+Each worker claims as many jobs as its local download and upload queues have
+free slots, runs them through a JobService (so downloads go through
+async_download_youtube_video and uploads through upload_video), renews the
+leases of its jobs with heartbeats that also publish their progress, and
+reports how they ended. A job whose lease can't be renewed is stopped; on
+shutdown, running jobs are handed back to the queue.
+"""
+import asyncio
+import json
+import os
+import socket
+
+from services.defaults import DOWNLOAD_TYPES, UPLOAD_TYPES
+from services.job_queue import Job, JobStatus
+from services.job_service import JobService
+from services.job_store import LEASE_SECONDS, JobStore
+from services.journal import DownloadJournal
+from services.postprocess import DEFAULT_WORKERS
+
+# Seconds between looking for new jobs while idle
+POLL_INTERVAL = 2.0
+
+# Leases are renewed this many times per lease period, so a slow store write doesn't lose one
+HEARTBEATS_PER_LEASE = 4
+
+_FINAL_STATUSES = {
+    JobStatus.DONE: "done",
+    JobStatus.FAILED: "failed",
+    JobStatus.CANCELLED: "cancelled",
+}
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class StoreWorker:
+    """
+    Claims jobs from a JobStore and runs them locally.
+
+        worker = StoreWorker(open_store("sqlite:///mnt/shared/jobs.sqlite3"))
+        await worker.run()
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        worker_id: str | None = None,
+        download_workers: int = 3,
+        upload_workers: int = 2,
+        output_dir: str = ".",
+        postprocess_workers: int = DEFAULT_WORKERS,
+        types: tuple[str, ...] = DOWNLOAD_TYPES + UPLOAD_TYPES,
+        lease: float = LEASE_SECONDS,
+        poll_interval: float = POLL_INTERVAL
+    ):
+        """
+        Args:
+            store (JobStore): Shared store to take jobs from.
+            worker_id (str, optional): Name of this worker in the store. Host name and PID if None.
+            download_workers (int, optional): Concurrent downloads (and download jobs claimed).
+            upload_workers (int, optional): Concurrent uploads and relays.
+            output_dir (str, optional): Default output directory for downloads.
+            postprocess_workers (int, optional): Concurrent ffmpeg conversions.
+            types (tuple[str], optional): Request types to take, e.g. only uploads on the
+                machines that have upload credentials.
+            lease (float, optional): Seconds a claimed job stays ours without a heartbeat.
+            poll_interval (float, optional): Seconds between polls while there is nothing to claim.
+        """
+        self.store = store
+        self.worker_id = worker_id or default_worker_id()
+        self.types = tuple(types)
+        self.lease = lease
+        self.poll_interval = poll_interval
+        # The store is the durable record of our jobs; the local journal only lives as long as we do
+        self.service = JobService(download_workers, upload_workers, output_dir, postprocess_workers,
+                                  journal=DownloadJournal(":memory:"))
+        # Local job ID -> (store job ID, request type)
+        self._claimed: dict[str, tuple[str, str]] = {}
+        self._reports: set[asyncio.Task] = set()
+        self._stopping = False
+        self._stopped = False
+        self.service.downloads.add_listener(self._on_job)
+        self.service.uploads.add_listener(self._on_job)
+
+    async def run(self):
+        """Claim and run jobs until cancelled or `stop` is called."""
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            while not self._stopping:
+                if not await self._claim_next():
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            heartbeat.cancel()
+            await self.stop()
+
+    async def stop(self):
+        """Hand running jobs back to the store and stop the local queues."""
+        self._stopping = True
+        if self._stopped:
+            return
+        self._stopped = True
+        await self.service.stop()
+        if self._reports:
+            await asyncio.gather(*self._reports, return_exceptions=True)
+
+    def _free_types(self) -> list[str]:
+        # The queues' own load, so playlist entries count like the jobs we claimed
+        types = []
+        for queue, queue_types in ((self.service.downloads, DOWNLOAD_TYPES), (self.service.uploads, UPLOAD_TYPES)):
+            if queue.load < queue.max_workers:
+                types.extend(t for t in queue_types if t in self.types)
+        return types
+
+    async def _claim_next(self) -> bool:
+        types = self._free_types()
+        if not types:
+            return False
+        loop = asyncio.get_running_loop()
+        claimed = await loop.run_in_executor(None, self.store.claim, self.worker_id, types, self.lease)
+        if claimed is None:
+            return False
+        request = {**claimed["request"], "priority": claimed["priority"]}
+        try:
+            job = self.service.submit(request)
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            # E.g. an upload whose file is gone: fail that job, not the worker
+            await loop.run_in_executor(
+                None, self.store.finish, claimed["id"], self.worker_id, "failed", None, f"Invalid request: {e}"
+            )
+            return True
+        self._claimed[job.id] = (claimed["id"], claimed["type"])
+        print(f"Claimed {claimed['type']} job {claimed['id']} (attempt {claimed['attempts']})", flush=True)
+        return True
+
+    def _on_job(self, job: Job):
+        if job.id not in self._claimed or not job.finished:
+            return
+        store_id, _ = self._claimed.pop(job.id)
+        if self._stopping and job.status is JobStatus.CANCELLED:
+            report = self._run_store(self.store.release, store_id, self.worker_id)
+        else:
+            report = self._run_store(
+                self.store.finish, store_id, self.worker_id, _FINAL_STATUSES[job.status], job.result, job.error
+            )
+        task = asyncio.ensure_future(report)
+        self._reports.add(task)
+        task.add_done_callback(self._reports.discard)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.lease / HEARTBEATS_PER_LEASE)
+            for job_id, (store_id, _) in list(self._claimed.items()):
+                job = self.service.get(job_id)
+                if job is None or job.finished:
+                    continue
+                # Serialized here: the job's stats keep changing on this thread
+                stats = json.loads(json.dumps(job.stats, default=str))
+                keep = await self._run_store(
+                    self.store.heartbeat, store_id, self.worker_id, self.lease, job.progress, stats
+                )
+                if keep is False and job_id in self._claimed:
+                    print(f"Stopping job {store_id}: cancelled or lease lost", flush=True)
+                    # Partial files stay: whoever runs the job next may share the output directory
+                    self.service.downloads.cancel(job_id, discard=False) or self.service.uploads.cancel(job_id)
+
+    async def _run_store(self, method, *args):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(None, method, *args)
+        except Exception as e:
+            # An unreachable store only costs leases; they expire and the jobs are re-queued
+            print(f"❌ Job store {method.__name__} failed:", e, flush=True)
+            return None
@@ -0,0 +1,159 @@
+import os
+import tempfile
+import threading
+
+import google.auth.exceptions
+import google.auth.transport.requests
+import google_auth_httplib2
+import httplib2
+from google.auth.transport.requests import AuthorizedSession
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+from requests.adapters import HTTPAdapter
+
+# OAuth 2.0 scopes: uploading videos, and managing playlists for post-upload playlist inserts
+SCOPES = [
+    'https://www.googleapis.com/auth/youtube.upload',
+    'https://www.googleapis.com/auth/youtube',
+]
+
+# Path to the client secrets JSON file
+CLIENT_SECRETS_FILE = os.path.join('resources', 'client_secrets.json')
+
+# File to store the user's access and refresh tokens
+TOKEN_FILE = 'token.json'
+
+# Connections kept open per host by the shared upload session
+HTTP_POOL_SIZE = 16
+
+
+class YouTubeClient:
+    """
+    Long-lived credentials, API client and HTTP session shared by all uploads.
+
+    Credentials are loaded once and refreshed under a lock, so concurrent uploads
+    never refresh twice or write token.json at the same time. The API client is
+    built from the discovery document bundled with google-api-python-client,
+    so no discovery request is made.
+    """
+
+    def __init__(self, token_file: str = TOKEN_FILE, client_secrets_file: str = CLIENT_SECRETS_FILE, scopes=None):
+        self.token_file = token_file
+        self.client_secrets_file = client_secrets_file
+        self.scopes = scopes or SCOPES
+        self._lock = threading.RLock()
+        self._creds = None
+        self._service = None
+        self._session = None
+        self._local = threading.local()
+
+    def credentials(self) -> Credentials:
+        """
+        Return valid credentials, refreshing or authorizing if needed.
+
+        Returns:
+            google.oauth2.credentials.Credentials: Valid user credentials.
+        """
+        with self._lock:
+            if self._creds is None and os.path.exists(self.token_file):
+                # Loaded with the scopes it was granted, not the ones we ask for, so they can be checked
+                creds = Credentials.from_authorized_user_file(self.token_file)
+                if creds.has_scopes(self.scopes):
+                    self._creds = creds
+                else:
+                    # Saved before a scope was added: its calls would fail with 403 until it expired
+                    print("Saved token lacks required scopes, authorizing again")
+
+            creds = self._creds
+            if creds and not creds.valid and creds.expired and creds.refresh_token:
+                try:
+                    creds.refresh(google.auth.transport.requests.Request())
+                except google.auth.exceptions.RefreshError as e:
+                    # Revoked or expired refresh token: authorize again
+                    print("Token refresh failed, authorizing again:", e)
+                    creds = None
+                else:
+                    self._creds = creds
+                    self._save_token(creds)
+            if not creds or not creds.valid:
+                flow = InstalledAppFlow.from_client_secrets_file(self.client_secrets_file, self.scopes)
+                creds = flow.run_local_server(port=0)
+                self._creds = creds
+                self._save_token(creds)
+            return creds
+
+    def session(self) -> AuthorizedSession:
+        """Return the shared authorized HTTP session with a pooled transport."""
+        creds = self.credentials()
+        with self._lock:
+            if self._session is None:
+                session = AuthorizedSession(creds)
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def service(self):
+        """
+        Return the YouTube Data API v3 client, built once.
+
+        Returns:
+            googleapiclient.discovery.Resource: Authenticated YouTube API service.
+        """
+        creds = self.credentials()
+        with self._lock:
+            if self._service is None:
+                self._service = build(
+                    'youtube', 'v3',
+                    credentials=creds,
+                    static_discovery=True,
+                    cache_discovery=False
+                )
+            return self._service
+
+    def http(self):
+        """
+        Return an authorized httplib2 transport for the calling thread.
+
+        httplib2 is not thread-safe, so pass this to `request.execute(http=...)`
+        when API calls are made from worker threads.
+        """
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(self.credentials(), http=httplib2.Http())
+            self._local.http = http
+        else:
+            self.credentials()
+        return http
+
+    def execute(self, request):
+        """Execute an API request on the calling thread's transport."""
+        return request.execute(http=self.http())
+
+    def _save_token(self, creds: Credentials):
+        # Write to a temp file and rename, so a crash never leaves a truncated token
+        directory = os.path.dirname(os.path.abspath(self.token_file))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".token-", suffix=".json")
+        try:
+            with os.fdopen(fd, 'w') as token:
+                token.write(creds.to_json())
+            os.replace(tmp_path, self.token_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+_default_client: YouTubeClient | None = None
+_default_lock = threading.Lock()
+
+
+def get_client() -> YouTubeClient:
+    """Return the process-wide YouTube client."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = YouTubeClient()
+        return _default_client
@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# Caches, journals and stores go to a throwaway directory, set before services.paths is imported
+os.environ.setdefault("YOUTUBE_UPLOADER_HOME", tempfile.mkdtemp(prefix="youtube-uploader-tests-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from services import batch_upload
+from services.batch_upload import UPLOAD_COST, QuotaTracker, UploadItem, UploadQueue
+from services.job_queue import JobStatus
+
+
+def test_quota_consume_refund_and_limit(tmp_path):
+    quota = QuotaTracker(daily_quota=100, path=str(tmp_path / "quota.json"))
+    assert quota.try_consume(60)
+    assert not quota.try_consume(60)
+    quota.refund(60)
+    assert quota.remaining() == 100
+    with open(tmp_path / "quota.json", encoding="utf-8") as f:
+        assert json.load(f)["used"] == 0
+    assert not (tmp_path / "quota.json.tmp").exists()
+
+
+def make_queue(tmp_path, monkeypatch, upload):
+    monkeypatch.setattr(batch_upload, "upload_video", upload)
+    return UploadQueue(max_workers=1, quota=QuotaTracker(path=str(tmp_path / "quota.json")))
+
+
+def make_item(tmp_path) -> UploadItem:
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"\0" * 1024)
+    return UploadItem(path=str(video), title="Video")
+
+
+def test_upload_charged_once_across_pause_and_resume(tmp_path, monkeypatch):
+    calls = []
+
+    def upload(*args, cancel_flag=None, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            # Paused while the media is uploading
+            while not cancel_flag.get("cancel"):
+                time.sleep(0.01)
+            raise Exception("Upload cancelled by user")
+        return {"id": "abc"}
+
+    async def main():
+        queue = make_queue(tmp_path, monkeypatch, upload)
+        job = queue.submit_upload(make_item(tmp_path))
+        while not calls:
+            await asyncio.sleep(0.01)
+        queue.pause(job.id)
+        while job.status is not JobStatus.PAUSED:
+            await asyncio.sleep(0.01)
+        queue.resume(job.id)
+        await queue.wait(job.id)
+        await queue.stop()
+        return queue, job
+
+    queue, job = asyncio.run(main())
+    assert job.status is JobStatus.DONE
+    assert len(calls) == 2
+    assert queue.quota.remaining() == queue.quota.daily_quota - UPLOAD_COST
+
+
+def test_failed_upload_is_refunded(tmp_path, monkeypatch):
+    def upload(*args, **kwargs):
+        raise ConnectionError("network down")
+
+    async def main():
+        queue = make_queue(tmp_path, monkeypatch, upload)
+        job = queue.submit_upload(make_item(tmp_path))
+        await queue.wait(job.id)
+        await queue.stop()
+        return queue, job
+
+    queue, job = asyncio.run(main())
+    assert job.status is JobStatus.FAILED
+    assert queue.quota.remaining() == queue.quota.daily_quota
+    assert "quota_charged" not in job.params
+
+
+def test_quota_exceeded_fails_without_uploading(tmp_path, monkeypatch):
+    def upload(*args, **kwargs):
+        pytest.fail("uploaded without quota")
+
+    async def main():
+        queue = make_queue(tmp_path, monkeypatch, upload)
+        queue.quota.try_consume(queue.quota.daily_quota - UPLOAD_COST + 1)
+        job = queue.submit_upload(make_item(tmp_path))
+        await queue.wait(job.id)
+        await queue.stop()
+        return job
+
+    job = asyncio.run(main())
+    assert job.status is JobStatus.FAILED
+    assert "quota" in job.error
+
+
+def test_summary_of_one_batch(tmp_path, monkeypatch):
+    ids = iter(["first", "second", "third"])
+
+    async def main():
+        queue = make_queue(tmp_path, monkeypatch, lambda *args, **kwargs: {"id": next(ids)})
+        earlier = queue.submit_upload(make_item(tmp_path))
+        await queue.wait(earlier.id)
+        batch = [queue.submit_upload(make_item(tmp_path)).id for _ in range(2)]
+        await queue.join()
+        await queue.stop()
+        return queue, batch
+
+    queue, batch = asyncio.run(main())
+    summary = queue.summary(batch)
+    assert [f["video_id"] for f in summary["files"]] == ["second", "third"]
+    assert summary["counts"]["done"] == 2
+    assert queue.summary()["counts"]["done"] == 3
+
+
+def test_relay_follow_ups_run_outside_the_upload_slot(tmp_path, monkeypatch):
+    from concurrent.futures import Future
+
+    video = make_item(tmp_path).path
+    pending = Future()
+
+    async def relay(url, format_str, output_dir, **kwargs):
+        return {"id": "abc", "path": video, "post_upload": pending}
+
+    monkeypatch.setattr(batch_upload, "relay_video", relay)
+
+    async def main():
+        queue = make_queue(tmp_path, monkeypatch, None)
+        job = queue.submit_relay("https://example.com/v", playlist_id="PL1")
+        while job.stats.get("stage") != "post_upload":
+            await asyncio.sleep(0.01)
+        load = queue.load
+        pending.set_result({"playlist": "ok"})
+        await queue.wait(job.id)
+        await queue.stop()
+        return job, load
+
+    job, load = asyncio.run(main())
+    assert load == 0
+    assert job.status is JobStatus.DONE
+    assert job.result["post_upload"] == job.stats["post_upload"] == {"playlist": "ok"}
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+from services import cli, defaults
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_cli_imports_nothing_heavy():
+    code = (
+        "import sys; from services import cli; cli.build_parser();"
+        "print(sorted(m for m in sys.modules if m.split('.')[0] in"
+        " ('yt_dlp', 'googleapiclient', 'aiohttp', 'requests', 'PyQt6', 'sqlite3')))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=REPO_ROOT).stdout
+    assert output.strip() == "[]"
+
+
+def test_cli_defaults_are_the_services():
+    from services import job_service, job_store, postprocess, relay, site_limits, worker
+
+    assert cli.DEFAULT_FORMAT == job_service.DEFAULT_FORMAT
+    assert cli.STREAM_FORMAT == relay.STREAM_FORMAT
+    assert cli.WORKER_TYPES == worker.DOWNLOAD_TYPES + worker.UPLOAD_TYPES
+    assert cli.LEASE_SECONDS == job_store.LEASE_SECONDS
+    assert cli.POSTPROCESS_WORKERS == postprocess.DEFAULT_WORKERS
+    assert site_limits.DEFAULT_CONCURRENCY == defaults.SITE_CONCURRENCY
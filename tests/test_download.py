@@ -0,0 +1,138 @@
+"""Downloads through DownloadQueue and yt-dlp against tools.fake_media_server."""
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+pytest.importorskip("yt_dlp")
+
+from services.bandwidth import BandwidthScheduler  # noqa: E402
+from services.download_queue import DownloadQueue  # noqa: E402
+from services.downloader import async_download_youtube_video  # noqa: E402
+from services.job_queue import JobStatus  # noqa: E402
+from services.journal import DownloadJournal  # noqa: E402
+from services.library import Library  # noqa: E402
+from tools.benchmark import write_synthetic_file  # noqa: E402
+from tools.fake_media_server import FakeMediaServer  # noqa: E402
+
+SIZE = 1024 * 1024
+
+
+def sha256_of(path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@pytest.fixture
+def expected(tmp_path) -> str:
+    path = tmp_path / "expected.bin"
+    write_synthetic_file(str(path), SIZE)
+    return sha256_of(path)
+
+
+def run_queue(submit):
+    async def main():
+        queue = DownloadQueue(max_workers=2, journal=DownloadJournal(":memory:"))
+        jobs = submit(queue)
+        await queue.join()
+        await queue.stop()
+        return jobs
+
+    return asyncio.run(main())
+
+
+def test_downloads_files(tmp_path, expected):
+    output_dir = str(tmp_path / "downloads")
+    with FakeMediaServer() as media:
+        jobs = run_queue(lambda queue: [
+            # Synthetic media isn't a real MP4, so there is nothing to convert
+            queue.submit_download(media.url(f"download-{i}", SIZE), "best", output_dir, convert="never")
+            for i in range(3)
+        ])
+
+    for job in jobs:
+        assert job.status is JobStatus.DONE, job.error
+        assert os.path.dirname(job.result) == output_dir
+        assert sha256_of(job.result) == expected
+    assert len({job.result for job in jobs}) == 3
+
+
+def test_cancel_running_download(tmp_path):
+    output_dir = str(tmp_path / "downloads")
+
+    async def main(media):
+        queue = DownloadQueue(max_workers=1, journal=DownloadJournal(":memory:"))
+        job = queue.submit_download(media.url("slow", 8 * SIZE), "best", output_dir, convert="never")
+        while job.status is not JobStatus.RUNNING or not job.progress:
+            await asyncio.sleep(0.01)
+        queue.cancel(job.id)
+        await queue.wait(job.id)
+        await queue.stop()
+        return job
+
+    # Throttled so the download is still running when it is cancelled
+    with FakeMediaServer(rate=2 * SIZE) as media:
+        job = asyncio.run(main(media))
+    assert job.status is JobStatus.CANCELLED
+    # Cancelled by the user, so the partial file is gone
+    assert not [name for name in os.listdir(output_dir) if name.startswith("slow")]
+
+
+def test_pause_and_resume_download(tmp_path, expected):
+    output_dir = str(tmp_path / "downloads")
+
+    async def main(media):
+        queue = DownloadQueue(max_workers=1, journal=DownloadJournal(":memory:"))
+        job = queue.submit_download(media.url("paused", SIZE), "best", output_dir, convert="never")
+        while job.status is not JobStatus.RUNNING or not job.progress:
+            await asyncio.sleep(0.01)
+        assert queue.pause(job.id)
+        while job.status is not JobStatus.PAUSED:
+            await asyncio.sleep(0.01)
+        assert queue.resume(job.id)
+        await queue.wait(job.id)
+        await queue.stop()
+        return job
+
+    with FakeMediaServer(rate=SIZE) as media:
+        job = asyncio.run(main(media))
+        requests = media.requests
+    assert job.status is JobStatus.DONE, job.error
+    assert sha256_of(job.result) == expected
+    assert requests >= 2
+
+
+class RecordingScheduler(BandwidthScheduler):
+    """Unlimited scheduler that keeps its streams to check what was charged."""
+
+    def __init__(self):
+        super().__init__()
+        self.streams = []
+
+    def open(self, direction, connections=1):
+        stream = super().open(direction, connections)
+        self.streams.append(stream)
+        return stream
+
+
+def test_resumed_download_charges_only_new_bytes(tmp_path, expected):
+    output_dir = tmp_path / "downloads"
+    output_dir.mkdir()
+    # Left behind by an interrupted run: the first 3/4 of the file
+    source = tmp_path / "source.bin"
+    write_synthetic_file(str(source), SIZE)
+    resumed = 3 * SIZE // 4
+    (output_dir / "resumed.mp4.part").write_bytes(source.read_bytes()[:resumed])
+    scheduler = RecordingScheduler()
+
+    with FakeMediaServer() as media:
+        path = asyncio.run(async_download_youtube_video(
+            media.url("resumed", SIZE), "best", output_dir=str(output_dir), convert="never",
+            library=Library(str(tmp_path / "library.sqlite3")), scheduler=scheduler
+        ))
+        sent = media.bytes_sent
+
+    assert sha256_of(path) == expected
+    assert sent < SIZE
+    assert sum(stream.bytes for stream in scheduler.streams) <= SIZE - resumed
@@ -0,0 +1,15 @@
+from services.history import JobHistory
+from services.job_queue import Job, JobStatus
+
+
+def test_matches_applies_filters(tmp_path):
+    history = JobHistory(str(tmp_path / "history.sqlite3"))
+    job = Job(kind="download", params={"url": "https://example.com/a.mp4", "channel": "Example"})
+    job.status = JobStatus.RUNNING
+    history.record(job)
+
+    assert history.matches(job.id)
+    assert history.matches(job.id, status=("queued", "running"), channel="Example")
+    assert not history.matches(job.id, status="done")
+    assert not history.matches(job.id, channel="Other")
+    assert not history.matches("missing")
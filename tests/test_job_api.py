@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+
+from services.job_api import create_app  # noqa: E402
+from services.job_service import JobService  # noqa: E402
+
+
+def request(method: str, path: str, **kwargs) -> tuple[int, object]:
+    async def main():
+        async with TestClient(TestServer(create_app(JobService()))) as client:
+            response = await client.request(method, path, **kwargs)
+            return response.status, await response.json()
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("body", ["[]", '"https://example.com/a.mp4"', "null", "42", "{"])
+@pytest.mark.parametrize("method, path", [("POST", "/jobs"), ("PUT", "/limits")])
+def test_body_must_be_a_json_object(method, path, body):
+    status, response = request(method, path, data=body, headers={"Content-Type": "application/json"})
+    assert status == 400
+    assert "error" in response
+
+
+def test_unknown_job_is_404():
+    assert request("GET", "/jobs/missing")[0] == 404
@@ -0,0 +1,129 @@
+import asyncio
+
+from services.job_queue import Job, JobQueue, JobStatus
+
+
+class RecordingQueue(JobQueue):
+    """Runs jobs by sleeping params["seconds"], recording the order they start in."""
+
+    def __init__(self, max_workers: int = 1):
+        super().__init__(max_workers)
+        self.started: list[str] = []
+
+    async def run_job(self, job: Job):
+        self.started.append(job.params["name"])
+        deadline = asyncio.get_running_loop().time() + job.params.get("seconds", 0.01)
+        while asyncio.get_running_loop().time() < deadline:
+            if job.cancel_flag.get("cancel"):
+                raise Exception("Cancelled by user")
+            await asyncio.sleep(0.005)
+        return job.params["name"]
+
+
+def submit(queue: JobQueue, name: str, seconds: float = 0.01, priority: int = 0) -> Job:
+    return queue.submit(Job(kind="job", params={"name": name, "seconds": seconds}, priority=priority))
+
+
+def test_priority_order():
+    async def main():
+        queue = RecordingQueue(1)
+        submit(queue, "first", 0.05)
+        await asyncio.sleep(0.01)
+        submit(queue, "low", priority=-1)
+        submit(queue, "high", priority=5)
+        await queue.join()
+        return queue.started
+
+    assert asyncio.run(main()) == ["first", "high", "low"]
+
+
+def test_resume_while_queued_runs_once():
+    async def main():
+        queue = RecordingQueue(2)
+        submit(queue, "a", 0.1)
+        submit(queue, "b", 0.1)
+        target = submit(queue, "target")
+        await asyncio.sleep(0)
+        assert queue.pause(target.id)
+        assert target.status is JobStatus.PAUSED
+        assert queue.resume(target.id)
+        await queue.join()
+        return queue.started, target
+
+    started, target = asyncio.run(main())
+    assert started.count("target") == 1
+    assert target.status is JobStatus.DONE
+
+
+def test_pause_running_job_then_resume():
+    async def main():
+        queue = RecordingQueue(1)
+        job = submit(queue, "long", 0.2)
+        await asyncio.sleep(0.05)
+        assert queue.pause(job.id)
+        await asyncio.sleep(0.05)
+        assert job.status is JobStatus.PAUSED
+        assert not queue._done[job.id].done()
+        assert queue.resume(job.id)
+        await queue.wait(job.id)
+        return queue.started, job
+
+    started, job = asyncio.run(main())
+    assert started == ["long", "long"]
+    assert job.status is JobStatus.DONE
+
+
+def test_cancel_queued_running_and_paused():
+    async def main():
+        queue = RecordingQueue(1)
+        running = submit(queue, "running", 1.0)
+        queued = submit(queue, "queued")
+        paused = submit(queue, "paused")
+        await asyncio.sleep(0.02)
+        queue.pause(paused.id)
+        assert queue.cancel(queued.id)
+        assert queue.cancel(paused.id)
+        assert queue.cancel(running.id)
+        await queue.join()
+        assert not queue.cancel(running.id)
+        return queue.started, (running, queued, paused)
+
+    started, jobs = asyncio.run(main())
+    assert started == ["running"]
+    assert all(job.status is JobStatus.CANCELLED for job in jobs)
+
+
+def test_failed_job_records_error():
+    class FailingQueue(JobQueue):
+        async def run_job(self, job):
+            raise ValueError("boom")
+
+    async def main():
+        queue = FailingQueue()
+        job = queue.submit(Job(kind="job", params={}))
+        await queue.wait(job.id)
+        return job
+
+    job = asyncio.run(main())
+    assert job.status is JobStatus.FAILED
+    assert job.error == "boom"
+
+
+def test_load_counts_queued_and_running_jobs_but_not_released_slots():
+    async def main():
+        queue = RecordingQueue(1)
+        running = submit(queue, "running", 0.2)
+        submit(queue, "queued")
+        await asyncio.sleep(0.02)
+        paused = submit(queue, "paused")
+        queue.pause(paused.id)
+        loads = [queue.load]
+        queue.release_slot(running)
+        loads.append(queue.load)
+        queue.cancel(paused.id)
+        await queue.join()
+        loads.append(queue.load)
+        return loads
+
+    # The released job's slot goes to the queued one
+    assert asyncio.run(main()) == [2, 1, 0]
@@ -0,0 +1,70 @@
+import pytest
+
+from services import job_store
+from services.job_store import SQLiteJobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def expire(store, job_id):
+    store._write("UPDATE jobs SET lease_expires = 0 WHERE id = ?", (job_id,))
+
+
+def test_claim_takes_highest_priority_then_oldest(store):
+    low = store.submit({"type": "download", "url": "a"})
+    high = store.submit({"type": "download", "url": "b"}, priority=5)
+    store.submit({"type": "upload", "path": "c"}, priority=9)
+
+    assert store.claim("w1", ["download"])["id"] == high
+    assert store.claim("w1", ["download"])["id"] == low
+    assert store.claim("w1", ["download"]) is None
+
+
+def test_expired_lease_goes_back_to_the_queue(store):
+    job_id = store.submit({"type": "download", "url": "a"})
+    assert store.claim("w1", ["download"], lease=60)["worker"] == "w1"
+    expire(store, job_id)
+
+    claimed = store.claim("w2", ["download"])
+    assert claimed["id"] == job_id and claimed["worker"] == "w2" and claimed["attempts"] == 2
+    # The old holder can neither renew nor finish it
+    assert not store.heartbeat(job_id, "w1")
+    assert not store.finish(job_id, "w1", "done")
+    assert store.finish(job_id, "w2", "done", result={"path": "a.mp4"})
+    assert store.get(job_id)["result"] == {"path": "a.mp4"}
+
+
+def test_job_fails_after_max_attempts(store, monkeypatch):
+    monkeypatch.setattr(job_store, "MAX_ATTEMPTS", 2)
+    job_id = store.submit({"type": "download", "url": "a"})
+    for worker in ("w1", "w2"):
+        assert store.claim(worker, ["download"])["id"] == job_id
+        expire(store, job_id)
+
+    assert store.claim("w3", ["download"]) is None
+    job = store.get(job_id)
+    assert job["status"] == "failed" and job["error"] == "Lease expired 2 times"
+
+
+@pytest.mark.parametrize("attempts", [1, 2])
+def test_expired_job_being_cancelled_ends_cancelled(store, monkeypatch, attempts):
+    monkeypatch.setattr(job_store, "MAX_ATTEMPTS", 2)
+    job_id = store.submit({"type": "download", "url": "a"})
+    for _ in range(attempts):
+        store.claim("w1", ["download"])
+        expire(store, job_id)
+    assert store.cancel(job_id)
+
+    assert store.claim("w2", ["download"]) is None
+    job = store.get(job_id)
+    assert job["status"] == "cancelled" and job["error"] is None
+
+
+def test_release_does_not_count_as_an_attempt(store):
+    job_id = store.submit({"type": "download", "url": "a"})
+    store.claim("w1", ["download"])
+    assert store.release(job_id, "w1")
+    assert store.claim("w2", ["download"])["attempts"] == 1
@@ -0,0 +1,103 @@
+import hashlib
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from services import resumable
+from services.resumable import CHUNK_ALIGN, MIN_CHUNK_SIZE, ResumableUpload, UploadError, UploadStateStore
+from tools.fake_upload_server import FakeUploadServer
+
+METADATA = {"snippet": {"title": "Test"}, "status": {"privacyStatus": "private"}}
+
+
+@pytest.fixture
+def video(tmp_path):
+    # Three and a half minimum-size chunks
+    data = bytes(range(256)) * (MIN_CHUNK_SIZE * 7 // 2 // 256)
+    path = tmp_path / "video.mp4"
+    path.write_bytes(data)
+    return path, data
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStateStore(str(tmp_path / "state"))
+
+
+@pytest.fixture(autouse=True)
+def no_backoff_sleep(monkeypatch):
+    monkeypatch.setattr(resumable, "BACKOFF_BASE", 0.001)
+
+
+def make_upload(server, path, store, **kwargs) -> ResumableUpload:
+    return ResumableUpload(
+        requests.Session(), str(path), METADATA, upload_url=server.url, state_store=store,
+        chunk_size=MIN_CHUNK_SIZE, **kwargs
+    )
+
+
+def test_upload_in_chunks(video, store):
+    path, data = video
+    with FakeUploadServer() as server:
+        response = make_upload(server, path, store).run()
+    assert response["sha256"] == hashlib.sha256(data).hexdigest()
+    assert response["size"] == len(data)
+    assert store.load(store.key_for(str(path), METADATA)) is None
+
+
+def test_partial_chunks_resume_from_range(video, store):
+    path, data = video
+    with FakeUploadServer(partial_rate=1.0) as server:
+        response = make_upload(server, path, store).run()
+        assert server.partials_injected
+    assert response["sha256"] == hashlib.sha256(data).hexdigest()
+
+
+def test_retries_injected_failures(video, store):
+    path, data = video
+    with FakeUploadServer(fail_rate=0.3) as server:
+        upload = make_upload(server, path, store)
+        response = upload.run()
+    assert response["sha256"] == hashlib.sha256(data).hexdigest()
+    assert upload.retries == server.failures_injected
+
+
+def test_restart_resumes_saved_session(video, store):
+    path, data = video
+    cancel_flag = {"cancel": False}
+
+    def cancel_after_first_chunk(sent, total):
+        if sent:
+            cancel_flag["cancel"] = True
+
+    with FakeUploadServer() as server:
+        with pytest.raises(UploadError, match="cancelled"):
+            make_upload(server, path, store, progress_callback=cancel_after_first_chunk,
+                        cancel_flag=cancel_flag).run()
+        saved = store.load(store.key_for(str(path), METADATA))
+        assert saved["offset"] == MIN_CHUNK_SIZE
+
+        # A new process: only the saved state carries over
+        offsets = []
+        restarted = make_upload(server, path, UploadStateStore(store.directory),
+                                progress_callback=lambda sent, total: offsets.append(sent))
+        response = restarted.run()
+        assert len(server.sessions) == 1
+    assert offsets[0] == MIN_CHUNK_SIZE
+    assert response["sha256"] == hashlib.sha256(data).hexdigest()
+
+
+def test_truncated_file_fails_instead_of_spinning(video, store):
+    path, data = video
+
+    def truncate(sent, total):
+        if sent:
+            with open(path, "r+b") as f:
+                f.truncate(sent + CHUNK_ALIGN)
+
+    with FakeUploadServer() as server:
+        with pytest.raises(UploadError, match="expected"):
+            make_upload(server, path, store, progress_callback=truncate).run()
+        # Session creation, the first chunk, and nothing after the short read
+        assert server.requests == 2
@@ -0,0 +1,118 @@
+import threading
+
+import pytest
+
+from services import site_limits
+from services.site_limits import (
+    CANCELLED, FATAL, FORBIDDEN, THROTTLED, TRANSIENT, SiteScheduler, classify_error
+)
+
+
+@pytest.mark.parametrize("message, kind", [
+    ("ERROR: Download cancelled by user", CANCELLED),
+    ("ERROR: unable to download video data: HTTP Error 429: Too Many Requests", THROTTLED),
+    ("Sign in to confirm you're not a bot", THROTTLED),
+    ("ERROR: unable to download video data: HTTP Error 403: Forbidden", FORBIDDEN),
+    ("ERROR: unable to download video data: HTTP Error 404: Not Found", FATAL),
+    ("ERROR: unable to download video data: HTTP Error 503: Service Unavailable", TRANSIENT),
+    ("ERROR: Giving up after 10 fragment retries", TRANSIENT),
+    ("ERROR: Did not get any data blocks", TRANSIENT),
+    ("ERROR: fragment format is not supported", FATAL),
+    ("Got error while parsing the manifest", FATAL),
+])
+def test_classify_error(message, kind):
+    assert classify_error(Exception(message)) == kind
+
+
+def test_connection_errors_are_transient():
+    assert classify_error(ConnectionResetError()) == TRANSIENT
+
+
+def test_only_consecutive_403s_throttle(monkeypatch):
+    monkeypatch.setattr(site_limits, "FORBIDDEN_STRIKES", 3)
+    scheduler = SiteScheduler(max_concurrency=4, rate=100)
+
+    def fail(outcome):
+        scheduler.acquire("example.com")
+        scheduler.release("example.com", outcome)
+
+    fail(FORBIDDEN)
+    fail(FORBIDDEN)
+    fail(None)
+    fail(FORBIDDEN)
+    fail(FORBIDDEN)
+    assert scheduler.cooldown("example.com") == 0
+    assert scheduler.limits()["example.com"]["concurrency"] == 4
+
+    fail(FORBIDDEN)
+    assert scheduler.cooldown("example.com") > 0
+    assert scheduler.limits()["example.com"]["concurrency"] == 2
+
+
+def test_throttle_halves_limits_and_success_adds_back(monkeypatch):
+    monkeypatch.setattr(site_limits, "THROTTLE_COOLDOWN", 10.0)
+    scheduler = SiteScheduler(max_concurrency=8, rate=4.0)
+    scheduler.acquire("example.com")
+    scheduler.release("example.com", THROTTLED)
+    limits = scheduler.limits()["example.com"]
+    assert limits["concurrency"] == 4 and limits["rate"] == 2.0
+    assert 9 < scheduler.cooldown("example.com") <= 10
+
+    # A second throttle in a row doubles the cooldown
+    scheduler.release("example.com", THROTTLED)
+    assert scheduler.limits()["example.com"]["concurrency"] == 2
+    assert 19 < scheduler.cooldown("example.com") <= 20
+
+    # Successes of downloads started before the throttle don't count while it cools down
+    scheduler.release("example.com")
+    assert scheduler.limits()["example.com"]["concurrency"] == 2
+
+    scheduler._sites["example.com"].cooldown_until = 0
+    limits = []
+    for _ in range(60):
+        scheduler.release("example.com")
+        limits.append(scheduler.limits()["example.com"]["concurrency"])
+    # Additive increase: one slot at a time, capped at the maximum
+    assert limits == sorted(limits) and limits[-1] == 8
+    assert all(b - a <= 1 for a, b in zip(limits, limits[1:]))
+    assert scheduler.limits()["example.com"]["rate"] <= 4.0
+
+
+def test_acquire_waits_for_a_free_slot():
+    scheduler = SiteScheduler(max_concurrency=2, rate=1000)
+    scheduler.acquire("example.com")
+    scheduler.acquire("example.com")
+    cancel_flag = {"cancel": False}
+
+    threading.Timer(0.1, cancel_flag.update, kwargs={"cancel": True}).start()
+    with pytest.raises(Exception, match="cancelled by user"):
+        scheduler.acquire("example.com", cancel_flag)
+
+    scheduler.release("example.com")
+    assert scheduler.acquire("example.com") < 0.1
+    assert scheduler.limits()["example.com"]["active"] == 2
+
+
+def test_configure_lowers_adapted_limits():
+    scheduler = SiteScheduler(max_concurrency=6, rate=3.0)
+    scheduler.acquire("example.com")
+    scheduler.release("example.com")
+    scheduler.configure(max_concurrency=2, rate=1.0)
+    assert scheduler.limits()["example.com"] == {"concurrency": 2, "rate": 1.0, "active": 0, "cooldown": 0.0}
+
+
+def test_warn_if_capped(capsys):
+    scheduler = SiteScheduler(max_concurrency=3)
+    assert not site_limits.warn_if_capped(3, scheduler)
+    assert site_limits.warn_if_capped(8, scheduler)
+    assert "at most 3" in capsys.readouterr().err
+
+
+def test_cli_warns_when_jobs_exceed_the_per_site_cap(capsys, monkeypatch):
+    from services import cli
+
+    monkeypatch.setattr(site_limits, "_default_scheduler", SiteScheduler(max_concurrency=3))
+    cli._apply_limits(cli.build_parser().parse_args(["download", "URL", "-j", "8"]))
+    assert "--per-site" in capsys.readouterr().err
+    cli._apply_limits(cli.build_parser().parse_args(["download", "URL", "-j", "8", "--per-site", "8"]))
+    assert not capsys.readouterr().err
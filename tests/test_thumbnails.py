@@ -0,0 +1,42 @@
+import sys
+
+import pytest
+
+from services import uploader
+from services.thumbnails import scale_image
+
+
+@pytest.fixture
+def no_pillow(monkeypatch):
+    # A None entry makes `import PIL` raise ImportError
+    monkeypatch.setitem(sys.modules, "PIL", None)
+    monkeypatch.delitem(sys.modules, "PyQt6", raising=False)
+
+
+def test_scale_image_without_pillow_does_not_use_qt(no_pillow):
+    with pytest.raises(ImportError, match="Pillow"):
+        scale_image(b"not an image", 1280, 720)
+    assert "PyQt6" not in sys.modules
+
+
+def test_small_thumbnail_is_sent_as_is_without_pillow(no_pillow, tmp_path):
+    path = tmp_path / "cover.webp"
+    path.write_bytes(b"RIFF0000WEBP" + b"\0" * 1000)
+    data, mimetype = uploader.prepare_thumbnail(str(path))
+    assert data == path.read_bytes()
+    assert mimetype == "application/octet-stream"
+    assert "PyQt6" not in sys.modules
+
+
+def test_large_thumbnail_fails_clearly_without_pillow(no_pillow, tmp_path):
+    path = tmp_path / "cover.png"
+    path.write_bytes(b"\0" * (uploader.THUMBNAIL_MAX_BYTES + 1))
+    with pytest.raises(ValueError, match="over 2 MB"):
+        uploader.prepare_thumbnail(str(path))
+    assert "PyQt6" not in sys.modules
+
+
+def test_small_jpeg_is_sent_as_is(tmp_path):
+    path = tmp_path / "cover.jpg"
+    path.write_bytes(b"\xff\xd8" + b"\0" * 100)
+    assert uploader.prepare_thumbnail(str(path)) == (path.read_bytes(), "image/jpeg")
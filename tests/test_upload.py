@@ -0,0 +1,98 @@
+"""Uploads through UploadQueue and upload_video against tools.fake_upload_server."""
+import asyncio
+import hashlib
+import sys
+import threading
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from services import resumable  # noqa: E402
+from services.batch_upload import QuotaTracker, UploadItem, UploadQueue  # noqa: E402
+from services.job_queue import JobStatus  # noqa: E402
+from services.uploader import upload_video  # noqa: E402
+from tools.benchmark import write_synthetic_file  # noqa: E402
+from tools.fake_upload_server import FakeUploadServer  # noqa: E402
+
+SIZE = int(resumable.MIN_CHUNK_SIZE * 2.5)
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(resumable, "BACKOFF_BASE", 0.01)
+
+
+@pytest.fixture
+def videos(tmp_path) -> list[str]:
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"video-{i}.mp4"
+        write_synthetic_file(str(path), SIZE + i)
+        paths.append(str(path))
+    return paths
+
+
+def sha256_of(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def make_queue(server: FakeUploadServer, tmp_path) -> UploadQueue:
+    return UploadQueue(
+        max_workers=2,
+        quota=QuotaTracker(daily_quota=sys.maxsize, path=str(tmp_path / "quota.json")),
+        session=requests.Session(),
+        upload_url=server.url
+    )
+
+
+def test_upload_video(videos):
+    progress = []
+    with FakeUploadServer() as server:
+        response = upload_video(
+            videos[0], "Title", "Description", tags=["a"], session=requests.Session(), upload_url=server.url,
+            progress_callback=lambda sent, total: progress.append((sent, total))
+        )
+    assert response["sha256"] == sha256_of(videos[0])
+    assert response["snippet"]["title"] == "Title"
+    assert response["status"]["privacyStatus"] == "private"
+    assert progress[-1] == (SIZE, SIZE)
+
+
+def test_upload_queue(videos, tmp_path):
+    async def main(server):
+        queue = make_queue(server, tmp_path)
+        jobs = [queue.submit_upload(UploadItem(path=path, title=path)) for path in videos]
+        await queue.join()
+        await queue.stop()
+        return jobs
+
+    # Failures and short writes exercise the retry and resume paths under concurrency
+    with FakeUploadServer(fail_rate=0.2, partial_rate=0.2) as server:
+        jobs = asyncio.run(main(server))
+        assert len(server.completed()) == len(videos)
+    for job, path in zip(jobs, videos):
+        assert job.status is JobStatus.DONE, job.error
+        assert job.result["sha256"] == sha256_of(path)
+        assert job.progress == 100
+
+
+
+def test_follow_up_calls_run_after_upload_video_returns(videos, monkeypatch):
+    from services import uploader
+
+    release = threading.Event()
+
+    def set_thumbnail(video_id, thumbnail):
+        assert release.wait(5)
+
+    monkeypatch.setattr(uploader, "set_thumbnail", set_thumbnail)
+    with FakeUploadServer() as server:
+        response = upload_video(
+            videos[0], "Title", session=requests.Session(), upload_url=server.url, thumbnail=("data", "image/png")
+        )
+    pending = response["post_upload"]
+    assert not pending.done()
+    release.set()
+    assert pending.result(timeout=5) == {"thumbnail": "ok"}
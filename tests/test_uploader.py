@@ -0,0 +1,28 @@
+import threading
+
+from services import uploader
+
+
+def test_post_upload_reuses_its_threads(monkeypatch):
+    threads = set()
+
+    def record(video_id, arg):
+        threads.add(threading.get_ident())
+        if arg == "bad":
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(uploader, "set_thumbnail", record)
+    monkeypatch.setattr(uploader, "add_to_playlist", record)
+    for _ in range(20):
+        assert uploader.post_upload("vid", ("data", "image/jpeg"), "PL1") == {"thumbnail": "ok", "playlist": "ok"}
+    assert len(threads) <= uploader.POST_UPLOAD_THREADS
+    assert uploader.post_upload("vid", playlist_id="bad") == {"playlist": "error: boom"}
+    assert uploader.post_upload("vid") == {}
+
+
+def test_start_post_upload_resolves_when_every_step_has(monkeypatch):
+    monkeypatch.setattr(uploader, "set_thumbnail", lambda video_id, arg: None)
+    monkeypatch.setattr(uploader, "add_to_playlist", lambda video_id, arg: 1 / 0)
+    pending = uploader.start_post_upload("vid", ("data", "image/jpeg"), "PL1")
+    assert pending.result(timeout=5) == {"thumbnail": "ok", "playlist": "error: division by zero"}
+    assert uploader.start_post_upload("vid").result() == {}
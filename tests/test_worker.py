@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("yt_dlp")
+
+from services.job_store import SQLiteJobStore  # noqa: E402
+from services.worker import StoreWorker  # noqa: E402
+from tools.fake_media_server import FakeMediaServer  # noqa: E402
+
+
+def test_bad_request_fails_its_job_and_the_worker_goes_on(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+    missing = store.submit({"type": "upload", "path": str(tmp_path / "missing.mp4"), "title": "Missing"}, priority=1)
+
+    async def main(media):
+        download = store.submit({"type": "download", "url": media.url("worker", 64 * 1024), "format": "best",
+                                 "convert": "never"})
+        worker = StoreWorker(store, "w1", output_dir=str(tmp_path / "downloads"), poll_interval=0.05)
+        task = asyncio.create_task(worker.run())
+        while store.get(download)["status"] in ("queued", "running"):
+            assert not task.done(), task.exception()
+            await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return download
+
+    with FakeMediaServer() as media:
+        download = asyncio.run(main(media))
+
+    job = store.get(missing)
+    assert job["status"] == "failed"
+    assert job["error"].startswith("Invalid request:") and "missing.mp4" in job["error"]
+    assert store.get(download)["status"] == "done"
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+pytest.importorskip("google_auth_oauthlib")
+
+from services import youtube_client  # noqa: E402
+from services.youtube_client import SCOPES, YouTubeClient  # noqa: E402
+
+
+def write_token(path, scopes):
+    path.write_text(json.dumps({
+        "token": "old", "refresh_token": "refresh", "client_id": "id", "client_secret": "secret",
+        "scopes": scopes, "expiry": "2999-01-01T00:00:00Z",
+    }))
+
+
+@pytest.fixture
+def logins(monkeypatch):
+    logins = []
+
+    class Flow:
+        def run_local_server(self, port):
+            logins.append(port)
+            return youtube_client.Credentials(token="new", scopes=SCOPES)
+
+    monkeypatch.setattr(
+        youtube_client.InstalledAppFlow, "from_client_secrets_file", lambda *args, **kwargs: Flow()
+    )
+    return logins
+
+
+def test_token_without_required_scopes_is_replaced(tmp_path, logins):
+    token = tmp_path / "token.json"
+    write_token(token, ["https://www.googleapis.com/auth/youtube.upload"])
+    creds = YouTubeClient(str(token)).credentials()
+    assert creds.token == "new" and logins
+    assert set(json.loads(token.read_text())["scopes"]) == set(SCOPES)
+
+
+def test_token_with_required_scopes_is_used(tmp_path, logins):
+    token = tmp_path / "token.json"
+    write_token(token, SCOPES)
+    assert YouTubeClient(str(token)).credentials().token == "old"
+    assert not logins
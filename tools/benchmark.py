@@ -0,0 +1,367 @@
+"""
+Offline benchmarks for the download and upload hot paths.
+
+    python -m tools.benchmark --jobs 1,4,8 --size 32M --output bench.json
+    python -m tools.benchmark --compare before.json after.json
+
+Scenarios:
+
+    download   DownloadQueue -> yt-dlp generic extractor -> tools.fake_media_server
+    upload     UploadQueue -> ResumableUpload -> tools.fake_upload_server
+    progress   ProgressReporter flooded from worker threads, no network
+
+Each scenario runs once per concurrency level in a fresh subprocess with its
+own YOUTUBE_UPLOADER_HOME, so peak RSS is per run and no cache, library or
+upload session carries over. Every run reports end-to-end job latency,
+throughput, per-stage timings (see services.metrics), event-loop lag while
+the jobs ran (sampled by a ticker task, so it includes the cost of progress
+callbacks and listeners) and peak RSS. The report is JSON tagged with the
+current commit, for comparing runs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SCENARIOS = ("download", "upload", "progress")
+
+# Prefix of the result line a run prints among yt-dlp's own output
+RESULT_PREFIX = "BENCHMARK_RESULT "
+
+# Event-loop lag sampling period in seconds
+LAG_INTERVAL = 0.01
+
+# Updates each worker thread sends in the progress scenario
+PROGRESS_UPDATES = 200_000
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentiles(values: list[float], scale: float = 1.0) -> dict | None:
+    """p50/p95/p99/max of `values` multiplied by `scale`, None for no samples."""
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pick(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * scale, 3)
+
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1] * scale, 3)}
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process in MiB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+class LagMonitor:
+    """Runs a services.metrics.LoopLagMonitor for the length of one measurement."""
+
+    def __init__(self, interval: float = LAG_INTERVAL):
+        from services.metrics import LoopLagMonitor
+
+        self.monitor = LoopLagMonitor(interval)
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.create_task(self.monitor.run())
+
+    async def stop(self) -> dict | None:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        return percentiles(list(self.monitor.samples), scale=1000)
+
+
+def write_synthetic_file(path: str, size: int):
+    from tools.fake_media_server import BLOCK_SIZE, synthetic_bytes
+
+    with open(path, "wb") as f:
+        for offset in range(0, size, BLOCK_SIZE):
+            f.write(synthetic_bytes(offset, min(BLOCK_SIZE, size - offset)))
+
+
+def _job_results(queue, wall: float, lag: dict | None, listener_calls: int, size: int) -> dict:
+    from services.job_queue import JobStatus
+
+    jobs = list(queue.jobs.values())
+    done = [job for job in jobs if job.status is JobStatus.DONE]
+    moved = size * len(done)
+    stages = sorted({stage for job in done for stage in job.stats.get("timings", {})})
+    return {
+        "wall_seconds": round(wall, 3),
+        "bytes": moved,
+        "throughput_bytes_per_second": round(moved / wall) if wall > 0 else None,
+        "latency_seconds": percentiles([job.finished_at - job.created_at for job in done]),
+        "run_seconds": percentiles([job.finished_at - job.started_at for job in done]),
+        "stage_seconds": {
+            stage: percentiles([job.stats["timings"][stage] for job in done if stage in job.stats["timings"]])
+            for stage in stages
+        },
+        "loop_lag_ms": lag,
+        "listener_calls": listener_calls,
+        "failed": len(jobs) - len(done),
+        "errors": sorted({job.error for job in jobs if job.error})[:5],
+    }
+
+
+async def _run_queue(queue, submit, size: int) -> dict:
+    calls = 0
+
+    def on_update(job):
+        nonlocal calls
+        calls += 1
+
+    queue.add_listener(on_update)
+    monitor = LagMonitor()
+    monitor.start()
+    started = time.perf_counter()
+    submit()
+    await queue.join()
+    wall = time.perf_counter() - started
+    lag = await monitor.stop()
+    await queue.stop()
+    return _job_results(queue, wall, lag, calls, size)
+
+
+async def bench_download(args, workdir: str) -> dict:
+    from services.download_queue import DownloadQueue
+    from tools.fake_media_server import FakeMediaServer
+
+    output_dir = os.path.join(workdir, "downloads")
+    os.makedirs(output_dir, exist_ok=True)
+    with FakeMediaServer(rate=args.rate) as media:
+        queue = DownloadQueue(max_workers=args.jobs)
+
+        def submit():
+            for i in range(args.files):
+                # Synthetic media isn't a real MP4, so there is nothing to convert
+                queue.submit_download(media.url(f"bench-{i}", args.size), "best", output_dir, convert="never")
+
+        return await _run_queue(queue, submit, args.size)
+
+
+async def bench_upload(args, workdir: str) -> dict:
+    import requests
+
+    from services.batch_upload import QuotaTracker, UploadItem, UploadQueue
+    from tools.fake_upload_server import FakeUploadServer
+
+    paths = []
+    for i in range(args.files):
+        path = os.path.join(workdir, f"upload-{i}.mp4")
+        write_synthetic_file(path, args.size)
+        paths.append(path)
+
+    with FakeUploadServer() as server:
+        queue = UploadQueue(
+            max_workers=args.jobs,
+            quota=QuotaTracker(daily_quota=sys.maxsize),
+            session=requests.Session(),
+            upload_url=server.url
+        )
+
+        def submit():
+            for path in paths:
+                queue.submit_upload(UploadItem(path=path, title=os.path.basename(path)))
+
+        return await _run_queue(queue, submit, args.size)
+
+
+async def bench_progress(args, workdir: str) -> dict:
+    from services.progress import ProgressReporter
+
+    loop = asyncio.get_running_loop()
+    delivered = 0
+
+    def on_progress(progress):
+        nonlocal delivered
+        delivered += 1
+
+    reporters = [ProgressReporter(on_progress, loop) for _ in range(args.jobs)]
+
+    def flood(reporter):
+        for done in range(1, PROGRESS_UPDATES + 1):
+            reporter.update(done, PROGRESS_UPDATES)
+
+    monitor = LagMonitor()
+    monitor.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=flood, args=(reporter,)) for reporter in reporters]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        await asyncio.sleep(LAG_INTERVAL)
+    for reporter in reporters:
+        reporter.finish()
+    wall = time.perf_counter() - started
+    lag = await monitor.stop()
+    updates = PROGRESS_UPDATES * len(reporters)
+    return {
+        "wall_seconds": round(wall, 3),
+        "updates": updates,
+        "updates_per_second": round(updates / wall) if wall > 0 else None,
+        "listener_calls": delivered,
+        "loop_lag_ms": lag,
+        "failed": 0,
+    }
+
+
+BENCHMARKS = {"download": bench_download, "upload": bench_upload, "progress": bench_progress}
+
+
+def run_one(args) -> dict:
+    """Run one scenario in this process (a child of `run_all`) and return its result."""
+    workdir = os.environ["YOUTUBE_UPLOADER_HOME"]
+    result = asyncio.run(BENCHMARKS[args.run](args, workdir))
+    return {
+        "scenario": args.run,
+        "jobs": args.jobs,
+        "files": args.files,
+        "size": args.size,
+        **result,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_all(args) -> dict:
+    """Run every scenario x concurrency level in its own subprocess."""
+    results = []
+    for scenario in args.scenarios:
+        for jobs in args.jobs_list:
+            command = [
+                sys.executable, "-m", "tools.benchmark",
+                "--run", scenario,
+                "--jobs", str(jobs),
+                "--files", str(args.files or 2 * jobs),
+                "--size", str(args.size),
+            ]
+            if args.rate:
+                command += ["--rate", str(args.rate)]
+            with tempfile.TemporaryDirectory(prefix="yt-bench-") as home:
+                env = {**os.environ, "YOUTUBE_UPLOADER_HOME": home, "PYTHONPATH": REPO_ROOT}
+                print(f"▶ {scenario} x{jobs}", file=sys.stderr, flush=True)
+                process = subprocess.run(command, cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+            lines = [line for line in process.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+            if process.returncode != 0 or not lines:
+                print(process.stdout[-2000:], process.stderr[-2000:], file=sys.stderr)
+                results.append({"scenario": scenario, "jobs": jobs, "error": f"exit code {process.returncode}"})
+                continue
+            results.append(json.loads(lines[-1][len(RESULT_PREFIX):]))
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {"size": args.size, "files": args.files, "rate": args.rate},
+        "results": results,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Metric, where to find it in a result, and whether higher is better
+COMPARED_METRICS = (
+    ("throughput MB/s", lambda r: (r.get("throughput_bytes_per_second") or 0) / (1024 * 1024), True),
+    ("updates/s", lambda r: r.get("updates_per_second"), True),
+    ("latency p50 s", lambda r: (r.get("latency_seconds") or {}).get("p50"), False),
+    ("loop lag p99 ms", lambda r: (r.get("loop_lag_ms") or {}).get("p99"), False),
+    ("peak RSS MB", lambda r: r.get("peak_rss_mb"), False),
+)
+
+
+def compare(before: dict, after: dict) -> str:
+    """Side-by-side table of two reports, matching runs by scenario and concurrency."""
+    old = {(r["scenario"], r["jobs"]): r for r in before["results"]}
+    lines = [f"{before.get('commit')} -> {after.get('commit')}"]
+    for result in after["results"]:
+        previous = old.get((result["scenario"], result["jobs"]))
+        if previous is None or "error" in result or "error" in previous:
+            continue
+        lines.append(f"{result['scenario']} x{result['jobs']}")
+        for name, metric, higher_is_better in COMPARED_METRICS:
+            a, b = metric(previous), metric(result)
+            if not a or b is None:
+                continue
+            change = (b - a) / a * 100
+            better = (change > 0) == higher_is_better
+            lines.append(f"    {name:<16} {a:>10.2f} -> {b:>10.2f}  {change:+6.1f}%{'' if better else ' !'}")
+    return "\n".join(lines)
+
+
+def _size(value: str) -> int:
+    from services.bandwidth import parse_rate
+
+    size = parse_rate(value)
+    if not size:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r}")
+    return int(size)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tools.benchmark", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("-j", "--jobs", default="1,4", help="concurrency levels, e.g. 1,4,8")
+    parser.add_argument("--files", type=int, default=0, help="jobs per run (default: twice the concurrency)")
+    parser.add_argument("--size", type=_size, default=_size("32M"), help="bytes per file, e.g. 32M")
+    parser.add_argument("--rate", type=_size, help="per-connection media server rate, e.g. 8M (default: unlimited)")
+    parser.add_argument("-o", "--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two JSON reports")
+    parser.add_argument("--run", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path, "r", encoding="utf-8") as f:
+                reports.append(json.load(f))
+        print(compare(*reports))
+        return 0
+
+    if args.run:
+        args.jobs = int(args.jobs)
+        args.files = args.files or 2 * args.jobs
+        print(RESULT_PREFIX + json.dumps(run_one(args)), flush=True)
+        return 0
+
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    args.jobs_list = [int(n) for n in args.jobs.split(",") if n]
+    report = run_all(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    failed = any("error" in r or r.get("failed") for r in report["results"])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
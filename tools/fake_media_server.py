@@ -0,0 +1,180 @@
+"""
+Local stand-in for a media host, for offline downloads.
+
+Serves synthetic video files of any size, with Range support, that yt-dlp's
+generic extractor treats as direct media links:
+
+    http://127.0.0.1:8098/media/<name>.mp4?size=33554432
+
+The content is a deterministic byte pattern, not a playable video, so
+download it with conversion off. Latency and a per-connection rate limit can
+be set to emulate a real network.
+
+    python -m tools.fake_media_server --port 8098 --rate 4M
+"""
+import argparse
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MEDIA_PATH = "/media/"
+DEFAULT_SIZE = 16 * 1024 * 1024
+
+# Bytes per write; also the granularity of rate limiting
+BLOCK_SIZE = 64 * 1024
+
+# 251 is prime, so the pattern doesn't line up with power-of-two block boundaries
+_PERIOD = 251
+_PATTERN = bytes(i % _PERIOD for i in range(_PERIOD * (BLOCK_SIZE // _PERIOD + 2)))
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def synthetic_bytes(offset: int, length: int) -> bytes:
+    """The `length` bytes at `offset` of every synthetic file (length <= BLOCK_SIZE)."""
+    start = offset % _PERIOD
+    return _PATTERN[start:start + length]
+
+
+class FakeMediaServer:
+    """
+    Threaded HTTP server serving synthetic media files.
+
+    Args:
+        host (str, optional): Interface to bind.
+        port (int, optional): Port to bind, 0 picks a free one.
+        rate (float, optional): Bytes per second per connection, None for unlimited.
+        latency (float, optional): Seconds to sleep before answering each request.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, rate: float | None = None, latency: float = 0.0):
+        self.rate = rate
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    def url(self, name: str, size: int = DEFAULT_SIZE) -> str:
+        """URL of a synthetic file. Different names are different videos to yt-dlp."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{MEDIA_PATH}{name}.mp4?size={size}"
+
+    def start(self) -> "FakeMediaServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_HEAD(self):
+                self._serve(send_body=False)
+
+            def do_GET(self):
+                self._serve(send_body=True)
+
+            def _serve(self, send_body: bool):
+                if server.latency:
+                    time.sleep(server.latency)
+                with server.lock:
+                    server.requests += 1
+                parsed = urlparse(self.path)
+                if not parsed.path.startswith(MEDIA_PATH):
+                    self.send_error(404)
+                    return
+                size = int((parse_qs(parsed.query).get("size") or [DEFAULT_SIZE])[0])
+
+                start, end, status = 0, size - 1, 200
+                match = _RANGE.match(self.headers.get("Range", ""))
+                if match and (match.group(1) or match.group(2)):
+                    if match.group(1):
+                        start = int(match.group(1))
+                        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+                    else:
+                        # Suffix range: the last N bytes
+                        start = max(0, size - int(match.group(2)))
+                    if start >= size or start > end:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{size}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    status = 206
+
+                self.send_response(status)
+                self.send_header("Content-Type", "video/mp4")
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(end - start + 1))
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                self.end_headers()
+                if send_body:
+                    self._send_range(start, end)
+
+            def _send_range(self, start: int, end: int):
+                began = time.monotonic()
+                sent = 0
+                position = start
+                try:
+                    while position <= end:
+                        block = synthetic_bytes(position, min(BLOCK_SIZE, end - position + 1))
+                        self.wfile.write(block)
+                        position += len(block)
+                        sent += len(block)
+                        if server.rate:
+                            ahead = sent / server.rate - (time.monotonic() - began)
+                            if ahead > 0:
+                                time.sleep(ahead)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Clients (e.g. the generic extractor sniffing the type) may hang up early
+                    pass
+                finally:
+                    with server.lock:
+                        server.bytes_sent += sent
+
+        return Handler
+
+
+def main():
+    from services.bandwidth import parse_rate
+
+    parser = argparse.ArgumentParser(description="Fake media host serving synthetic videos")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--rate", help="bytes/s per connection, e.g. 4M (default: unlimited)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of delay per request")
+    args = parser.parse_args()
+
+    server = FakeMediaServer(args.host, args.port, parse_rate(args.rate), args.latency)
+    print(f"Fake media host serving e.g. {server.url('sample')}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
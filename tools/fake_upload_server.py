@@ -0,0 +1,204 @@
+"""
+Local stand-in for the YouTube resumable upload endpoint.
+
+Implements the parts of the protocol used by services.resumable: session
+creation (POST ?uploadType=resumable), chunk PUTs with Content-Range, and
+status queries (Content-Range: bytes */total). Failures and latency can be
+injected to exercise retry and resume logic.
+
+    python -m tools.fake_upload_server --port 8099 --fail-rate 0.1
+
+Point the uploader at it with
+YOUTUBE_UPLOAD_URL=http://127.0.0.1:8099/upload/youtube/v3/videos and pass
+a plain requests.Session() as the upload session.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+UPLOAD_PATH = "/upload/youtube/v3/videos"
+
+
+class _Session:
+    def __init__(self, metadata: dict, total_size: int | None):
+        self.id = uuid.uuid4().hex
+        self.metadata = metadata
+        self.total_size = total_size
+        self.received = 0
+        self.sha256 = hashlib.sha256()
+        self.response = None
+
+
+class FakeUploadServer:
+    """
+    Threaded HTTP server emulating resumable video uploads.
+
+    Args:
+        host (str, optional): Interface to bind.
+        port (int, optional): Port to bind, 0 picks a free one.
+        fail_rate (float, optional): Probability of answering a chunk PUT with 503.
+        latency (float, optional): Seconds to sleep before answering each request.
+        partial_rate (float, optional): Probability of keeping only the first half of a chunk
+            and answering 308 with the shorter Range, as the real endpoint may.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, fail_rate: float = 0.0, latency: float = 0.0,
+                 partial_rate: float = 0.0):
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.partial_rate = partial_rate
+        self.partials_injected = 0
+        self.sessions: dict[str, _Session] = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures_injected = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{UPLOAD_PATH}"
+
+    def start(self) -> "FakeUploadServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def completed(self) -> list[dict]:
+        """Return the API responses of all finished uploads, including the content hash."""
+        with self.lock:
+            return [s.response for s in self.sessions.values() if s.response]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, body: dict | None = None, headers: dict | None = None):
+                payload = json.dumps(body).encode("utf-8") if body is not None else b""
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                if payload:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _read_body(self) -> bytes:
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length) if length else b""
+
+            def do_POST(self):
+                body = self._read_body()
+                parsed = urlparse(self.path)
+                params = parse_qs(parsed.query)
+                if parsed.path != UPLOAD_PATH or params.get("uploadType") != ["resumable"]:
+                    return self._reply(404, {"error": "not found"})
+                length = self.headers.get("X-Upload-Content-Length")
+                session = _Session(json.loads(body or b"{}"), int(length) if length else None)
+                with server.lock:
+                    server.requests += 1
+                    server.sessions[session.id] = session
+                host = self.headers.get("Host")
+                location = f"http://{host}{UPLOAD_PATH}?uploadType=resumable&upload_id={session.id}"
+                self._reply(200, headers={"Location": location})
+
+            def do_PUT(self):
+                data = self._read_body()
+                if server.latency:
+                    time.sleep(server.latency)
+                params = parse_qs(urlparse(self.path).query)
+                session = server.sessions.get((params.get("upload_id") or [""])[0])
+                if session is None:
+                    return self._reply(404, {"error": "session not found"})
+
+                with server.lock:
+                    server.requests += 1
+                    if data and random.random() < server.fail_rate:
+                        server.failures_injected += 1
+                        return self._reply(503, {"error": "injected failure"})
+
+                    content_range = self.headers.get("Content-Range", "")
+                    unit, _, spec = content_range.partition(" ")
+                    range_part, _, total = spec.partition("/")
+                    if total and total != "*":
+                        session.total_size = int(total)
+
+                    if range_part != "*":
+                        start, _, end = range_part.partition("-")
+                        start, end = int(start), int(end)
+                        if start > session.received:
+                            return self._reply(400, {"error": "non-contiguous chunk"})
+                        # Overlapping resends are allowed; keep only the new bytes
+                        new_data = data[session.received - start:]
+                        if len(new_data) > 1 and random.random() < server.partial_rate:
+                            server.partials_injected += 1
+                            new_data = new_data[:len(new_data) // 2]
+                        session.sha256.update(new_data)
+                        session.received += len(new_data)
+
+                    if session.total_size is not None and session.received >= session.total_size:
+                        if session.response is None:
+                            session.response = {
+                                "kind": "youtube#video",
+                                "id": f"fake{session.id[:11]}",
+                                "snippet": session.metadata.get("snippet", {}),
+                                "status": session.metadata.get("status", {}),
+                                "sha256": session.sha256.hexdigest(),
+                                "size": session.received,
+                            }
+                        return self._reply(200, session.response)
+
+                    headers = {}
+                    if session.received:
+                        headers["Range"] = f"bytes=0-{session.received - 1}"
+                    self._reply(308, headers=headers)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake YouTube resumable upload server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="probability of a 503 per chunk")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of delay per chunk")
+    parser.add_argument("--partial-rate", type=float, default=0.0,
+                        help="probability of storing only half a chunk (308 with a shorter Range)")
+    args = parser.parse_args()
+
+    server = FakeUploadServer(args.host, args.port, args.fail_rate, args.latency, args.partial_rate)
+    print(f"Fake upload endpoint listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,446 @@
+"""
+Jobs panel: every queued, running and past job in one virtualized table.
+
+The model never holds the whole history. Rows are read from the job history
+(services.history) a page at a time as the view asks for them, and only the
+last few pages are kept. Running jobs are overlaid from the live queues, and
+their updates are collected and repainted as one dataChanged per refresh
+interval instead of one per progress report. Thumbnails are fetched and
+decoded only for rows the view actually paints, most recently painted first.
+"""
+import asyncio
+import datetime
+import os
+import time
+from collections import OrderedDict
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QSize, Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap
+from PyQt6.QtWidgets import (
+    QAbstractItemView, QComboBox, QHBoxLayout, QHeaderView, QTableView, QVBoxLayout, QWidget
+)
+
+from services.history import ACTIVE_STATUSES, JobHistory, job_row
+from services.job_queue import Job, JobStatus
+from services.thumbnails import ThumbnailService
+
+# Job updates are repainted at most this often
+REFRESH_INTERVAL_MS = 100
+
+# Rows read from the history per query, and pages kept in memory
+PAGE_SIZE = 200
+MAX_CACHED_PAGES = 10
+
+THUMBNAIL_SIZE = (64, 36)
+THUMBNAIL_WORKERS = 4
+# Thumbnails waiting to load; the oldest requests are for rows scrolled past and are dropped
+MAX_WANTED_THUMBNAILS = 48
+MAX_PIXMAPS = 500
+
+ROW_HEIGHT = THUMBNAIL_SIZE[1] + 6
+
+STATUS_FILTERS = [
+    ("All jobs", None),
+    ("Active", ACTIVE_STATUSES),
+    ("Done", "done"),
+    ("Failed", "failed"),
+    ("Cancelled", "cancelled"),
+]
+
+DATE_FILTERS = [
+    ("Any time", None),
+    ("Today", 0),
+    ("Last 7 days", 7),
+    ("Last 30 days", 30),
+]
+
+
+def format_speed(speed: float, eta: float | None = None) -> str:
+    """Speed and remaining time, e.g. "4.2 MB/s, 1:05 left"."""
+    text = f"{speed / (1024 * 1024):.1f} MB/s"
+    if eta is not None:
+        minutes, seconds = divmod(int(eta), 60)
+        text += f", {minutes}:{seconds:02d} left"
+    return text
+
+
+def status_text(row: dict, job: Job | None = None) -> str:
+    """Status column of a history row, with live progress if its job is still running."""
+    stats = job.stats if job is not None else {}
+    status = row["status"]
+    if status == JobStatus.RUNNING.value and job is not None:
+        if job.kind == "playlist":
+            if not stats:
+                return "Listing playlist..."
+            return f"Playlist {stats['completed']}/{stats['total']} · {stats['speed'] / (1024 * 1024):.1f} MB/s"
+        if stats.get("stage") == "postprocess":
+            return "Converting to MP4..."
+        verb = "Uploading" if job.kind == "upload" or stats.get("stage") == "upload" else "Downloading"
+        text = f"{verb} {job.progress:.0f}%"
+        if stats.get("speed"):
+            text += " · " + format_speed(stats["speed"], stats.get("eta"))
+        return text
+    if status == JobStatus.RUNNING.value:
+        return "Running"
+    if status == JobStatus.DONE.value:
+        if row["kind"] in ("upload", "relay"):
+            return "✅ Uploaded"
+        return "✅ Already downloaded" if stats.get("library") == "hit" else "✅ Downloaded"
+    if status == JobStatus.PAUSED.value:
+        resumed = stats.get("resumed")
+        if job is not None and not job.progress and resumed and resumed["bytes"]:
+            return f"⏸ Paused ({resumed['bytes'] / (1024 * 1024):.0f} MB kept)"
+        return f"⏸ Paused {job.progress:.0f}%" if job is not None else "⏸ Paused"
+    if status == JobStatus.CANCELLED.value:
+        return "🚫 Cancelled"
+    if status == JobStatus.FAILED.value:
+        # A failed download whose video turned out to be in the library anyway
+        if row["result"] and row["kind"] == "download":
+            return f"✅ Downloaded ({os.path.splitext(row['result'])[1]})"
+        return "❌ Error"
+    return "Queued"
+
+
+class JobHistoryModel(QAbstractTableModel):
+    """
+    Table model over a JobHistory, newest job first, with live updates from
+    the JobQueues passed to `attach`.
+
+    Row numbers are stable between refreshes: queries only see jobs created up
+    to the last refresh, and jobs created since are inserted at the top on the
+    next one.
+    """
+
+    HEADERS = ("Title", "Status", "Channel", "Added", "Result")
+
+    def __init__(self, history: JobHistory, thumbnails: ThumbnailService, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.thumbnails = thumbnails
+        self.filters: dict = {}
+        # Unfinished jobs of the attached queues, by ID
+        self._live: dict[str, Job] = {}
+        self._statuses: dict[str, JobStatus] = {}
+        self._pages: OrderedDict[int, list[dict]] = OrderedDict()
+        self._rows_by_id: dict[str, int] = {}
+        self._count = 0
+        self._snapshot = time.time()
+        self._dirty: set[str] = set()
+        self._structure_changed = False
+        # Jobs whose status changed since the last refresh, with the status they had then
+        self._moved: dict[str, tuple[Job, JobStatus | None]] = {}
+        self._pixmaps: OrderedDict[str, QPixmap] = OrderedDict()
+        self._wanted: OrderedDict[str, str] = OrderedDict()
+        self._loading: set[str] = set()
+        self._thumbnail_workers = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(REFRESH_INTERVAL_MS)
+        self._timer.timeout.connect(self._flush)
+        self._recount()
+
+    def attach(self, queue):
+        """Show live progress of a JobQueue's jobs. Attach after JobHistory.attach."""
+        for job in queue.jobs.values():
+            if not job.finished:
+                self._live[job.id] = job
+                self._statuses[job.id] = job.status
+        queue.add_listener(self._on_job)
+
+    def set_filters(self, status: str | tuple[str, ...] | None = None, channel: str | None = None,
+                    since: float | None = None):
+        """Show only jobs with the given status(es), from a channel, or created since a timestamp."""
+        self.beginResetModel()
+        self.filters = {key: value for key, value in
+                        {"status": status, "channel": channel, "since": since}.items() if value}
+        self._clear()
+        self._moved.clear()
+        self._recount()
+        self.endResetModel()
+
+    def job_id(self, index: QModelIndex) -> str | None:
+        row = self._row(index.row()) if index.isValid() else None
+        return row["id"] if row else None
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._count
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        row = self._row(index.row()) if index.isValid() else None
+        if row is None:
+            return None
+        job = self._live.get(row["id"])
+        if job is not None:
+            # The stored row only changes with the status; the rest is live
+            row = {**row, **{key: value for key, value in job_row(job).items() if value is not None}}
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                title = row["title"] or row["source"] or ""
+                return "    ↳ " + title if row["parent"] else title
+            if column == 1:
+                return status_text(row, job)
+            if column == 2:
+                return row["channel"] or ""
+            if column == 3:
+                return time.strftime("%Y-%m-%d %H:%M", time.localtime(row["created_at"]))
+            if column == 4:
+                return row["error"] if row["status"] == JobStatus.FAILED.value and not row["result"] \
+                    else row["result"] or ""
+        elif role == Qt.ItemDataRole.DecorationRole and column == 0:
+            return self._thumbnail(row)
+        elif role == Qt.ItemDataRole.ToolTipRole:
+            return row["error"] or row["result"] or row["source"]
+        elif role == Qt.ItemDataRole.UserRole:
+            return row["id"]
+        return None
+
+    def _recount(self):
+        self._snapshot = time.time()
+        self._count = self.history.count(**self.filters, until=self._snapshot)
+
+    def _clear(self):
+        self._pages.clear()
+        self._rows_by_id.clear()
+
+    def _row(self, number: int) -> dict | None:
+        index = number // PAGE_SIZE
+        page = self._pages.get(index)
+        if page is None:
+            page = self.history.page(index * PAGE_SIZE, PAGE_SIZE, **self.filters, until=self._snapshot)
+            self._pages[index] = page
+            for offset, row in enumerate(page):
+                self._rows_by_id[row["id"]] = index * PAGE_SIZE + offset
+            if len(self._pages) > MAX_CACHED_PAGES:
+                _, evicted = self._pages.popitem(last=False)
+                for row in evicted:
+                    self._rows_by_id.pop(row["id"], None)
+        else:
+            self._pages.move_to_end(index)
+        offset = number - index * PAGE_SIZE
+        return page[offset] if offset < len(page) else None
+
+    def _on_job(self, job: Job):
+        previous = self._statuses.get(job.id)
+        if previous is not job.status:
+            self._structure_changed = True
+            self._moved.setdefault(job.id, (job, previous))
+            if job.finished:
+                self._statuses.pop(job.id, None)
+                self._live.pop(job.id, None)
+                self._patch(job)
+            else:
+                self._statuses[job.id] = job.status
+                self._live[job.id] = job
+        self._mark_dirty(job.id)
+
+    def _patch(self, job: Job):
+        """Bring the cached row of a job that just finished up to date."""
+        number = self._rows_by_id.get(job.id)
+        if number is None:
+            return
+        page = self._pages.get(number // PAGE_SIZE)
+        if page is not None:
+            page[number % PAGE_SIZE].update(
+                {key: value for key, value in job_row(job).items() if value is not None}
+            )
+
+    def _mark_dirty(self, job_id: str):
+        self._dirty.add(job_id)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _flush(self):
+        if self._structure_changed:
+            self._structure_changed = False
+            moved, self._moved = self._moved, {}
+            if "status" in self.filters and not self._move_rows(moved.values()):
+                self._reload()
+                return
+            now = time.time()
+            total = self.history.count(**self.filters, until=now)
+            added = self.history.count(**{**self.filters, "since": max(self.filters.get("since", 0), self._snapshot)},
+                                       until=now)
+            if total == self._count + added and added:
+                self.beginInsertRows(QModelIndex(), 0, added - 1)
+                self._clear()
+                self._count = total
+                self._snapshot = now
+                self.endInsertRows()
+            elif total != self._count:
+                self._reload()
+                return
+
+        numbers = [self._rows_by_id[job_id] for job_id in self._dirty if job_id in self._rows_by_id]
+        self._dirty.clear()
+        if numbers:
+            self.dataChanged.emit(self.index(min(numbers), 0), self.index(max(numbers), len(self.HEADERS) - 1))
+
+    def _move_rows(self, moved) -> bool:
+        """
+        Insert or remove the rows of jobs whose new status moved them in or out of
+        the status filter, keeping the view's selection and scroll position.
+
+        Returns:
+            bool: False if a job's previous status is unknown and the rows must be reloaded.
+        """
+        statuses = self.filters["status"]
+        if isinstance(statuses, str):
+            statuses = (statuses,)
+        others = {**self.filters, "status": None}
+        # Newest first: a row's number only depends on the rows above it, which are then up to date
+        for job, previous in sorted(moved, key=lambda item: item[0].created_at, reverse=True):
+            if job.created_at > self._snapshot:
+                # Not listed yet; inserted at the top with the other new jobs
+                continue
+            if previous is None:
+                return False
+            was_in = previous.value in statuses and self.history.matches(job.id, **others)
+            now_in = self.history.matches(job.id, **self.filters)
+            if was_in == now_in:
+                continue
+            above = self.history.count(**{**self.filters, "since": job.created_at}, until=self._snapshot)
+            number = above - now_in
+            if now_in:
+                self.beginInsertRows(QModelIndex(), number, number)
+                self._count += 1
+                self._clear()
+                self.endInsertRows()
+            else:
+                self.beginRemoveRows(QModelIndex(), number, number)
+                self._count -= 1
+                self._clear()
+                self.endRemoveRows()
+        return True
+
+    def _reload(self):
+        self.set_filters(**self.filters)
+        self._dirty.clear()
+
+    def _thumbnail(self, row: dict) -> QPixmap | None:
+        job_id, url = row["id"], row["thumbnail"]
+        if not url:
+            return None
+        pixmap = self._pixmaps.get(job_id)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(job_id)
+            return None if pixmap.isNull() else pixmap
+        if job_id not in self._loading:
+            self._wanted[job_id] = url
+            self._wanted.move_to_end(job_id)
+            while len(self._wanted) > MAX_WANTED_THUMBNAILS:
+                self._wanted.popitem(last=False)
+            if self._thumbnail_workers < THUMBNAIL_WORKERS:
+                self._thumbnail_workers += 1
+                asyncio.ensure_future(self._load_thumbnails())
+        return None
+
+    async def _load_thumbnails(self):
+        try:
+            while self._wanted:
+                # Newest request first: the rows on screen now
+                job_id, url = self._wanted.popitem(last=True)
+                self._loading.add(job_id)
+                try:
+                    data = await self.thumbnails.fetch(url, *THUMBNAIL_SIZE)
+                except Exception as e:
+                    print("Error loading thumbnail:", e)
+                    data = None
+                finally:
+                    self._loading.discard(job_id)
+                # Scaled to THUMBNAIL_SIZE off the GUI thread, so decoding here is cheap
+                self._pixmaps[job_id] = QPixmap.fromImage(QImage.fromData(data)) if data else QPixmap()
+                while len(self._pixmaps) > MAX_PIXMAPS:
+                    self._pixmaps.popitem(last=False)
+                self._mark_dirty(job_id)
+        finally:
+            self._thumbnail_workers -= 1
+
+
+class ChannelBox(QComboBox):
+    """Channel filter; the channel list is read when the popup opens."""
+
+    def __init__(self, history: JobHistory, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.addItem("All channels", None)
+
+    def showPopup(self):
+        current = self.currentData()
+        self.blockSignals(True)
+        self.clear()
+        self.addItem("All channels", None)
+        for channel in self.history.channels():
+            self.addItem(channel, channel)
+        self.setCurrentIndex(max(0, self.findData(current)))
+        self.blockSignals(False)
+        super().showPopup()
+
+
+class JobHistoryPanel(QWidget):
+    """Filter bar plus the job table. Emits `selectionChanged` when the selected jobs change."""
+
+    selectionChanged = pyqtSignal()
+
+    def __init__(self, model: JobHistoryModel, parent=None):
+        super().__init__(parent)
+        self.model = model
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        filter_row = QHBoxLayout()
+        self.status_box = QComboBox()
+        for label, status in STATUS_FILTERS:
+            self.status_box.addItem(label, status)
+        self.channel_box = ChannelBox(model.history)
+        self.date_box = QComboBox()
+        for label, days in DATE_FILTERS:
+            self.date_box.addItem(label, days)
+        for box in (self.status_box, self.channel_box, self.date_box):
+            box.currentIndexChanged.connect(self.apply_filters)
+            filter_row.addWidget(box)
+        layout.addLayout(filter_row)
+
+        self.view = QTableView()
+        self.view.setObjectName("jobs_view")
+        self.view.setModel(model)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.view.setIconSize(QSize(*THUMBNAIL_SIZE))
+        self.view.setWordWrap(False)
+        self.view.setShowGrid(False)
+        # Fixed row heights keep scrolling O(1) however many rows there are
+        self.view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.view.verticalHeader().setDefaultSectionSize(ROW_HEIGHT)
+        self.view.verticalHeader().hide()
+        header = self.view.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.view.selectionModel().selectionChanged.connect(lambda *_: self.selectionChanged.emit())
+        model.modelReset.connect(self.selectionChanged.emit)
+        layout.addWidget(self.view)
+
+    def apply_filters(self):
+        days = self.date_box.currentData()
+        since = None
+        if days is not None:
+            start = datetime.date.today() - datetime.timedelta(days=days)
+            since = time.mktime(start.timetuple())
+        self.model.set_filters(self.status_box.currentData(), self.channel_box.currentData(), since)
+
+    def selected_job_ids(self) -> list[str]:
+        ids = (self.model.job_id(index) for index in self.view.selectionModel().selectedRows())
+        return [job_id for job_id in ids if job_id]
+
+    def show_newest(self):
+        """Scroll to the top, where new jobs appear."""
+        self.view.scrollToTop()
@@ -2,32 +2,46 @@ from urllib.parse import urlparse, parse_qs
 
 from PyQt6.QtWidgets import (
     QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout,
-    QLineEdit, QComboBox, QFileDialog, QTextEdit, QFrame
+    QLineEdit, QComboBox, QFileDialog, QTextEdit, QFrame,
+    QSpinBox, QCheckBox
 )
 from PyQt6.QtGui import QPixmap, QImage, QDragEnterEvent, QDropEvent, QMouseEvent
 from PyQt6.QtCore import Qt
 from qasync import asyncSlot
 
-from services.downloader import async_get_video_info, async_download_youtube_video
+from services.download_queue import DownloadQueue
+from services.history import get_history
+from services.job_queue import Job, JobStatus
+from services.library import get_library
+from services.metadata_cache import canonical_key
+from services.metrics import instrument
+from services.preview import PreviewPipeline
+from services.thumbnails import ThumbnailService
+from services.progress import Progress, ProgressReporter
+from services.batch_upload import UploadQueue, collect_items
+from services.site_limits import get_site_scheduler, warn_if_capped
 from services.uploader import upload_video
+from ui.job_history import JobHistoryModel, JobHistoryPanel, format_speed
 
-import aiohttp
 import asyncio
 import os
+import time
 import traceback
 
 
 class ClickableDropLabel(QLabel):
     """Label that accepts drag-and-drop or click-to-select files."""
 
-    def __init__(self, text="", parent=None, file_types=None):
+    def __init__(self, text="", parent=None, file_types=None, multiple=False):
         super().__init__(text, parent)
         self.setAcceptDrops(True)
         self.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.setStyleSheet("border: 2px dashed #666; background-color: #333; color: #ccc;")
         self.setFixedSize(320, 180)
         self.file_path = None
+        self.file_paths: list[str] = []
         self.file_types = file_types or []
+        self.multiple = multiple
 
     def mousePressEvent(self, event: QMouseEvent):
         if event.button() == Qt.MouseButton.LeftButton:
@@ -35,14 +49,26 @@ class ClickableDropLabel(QLabel):
 
     def open_file_dialog(self):
         filter_str = "Files (" + " ".join(f"*.{ext}" for ext in self.file_types) + ")"
+        if self.multiple:
+            paths, _ = QFileDialog.getOpenFileNames(self, "Select files", filter=filter_str)
+            if paths:
+                self.set_files(paths)
+            return
         path, _ = QFileDialog.getOpenFileName(self, "Select a file", filter=filter_str)
         if path:
             self.set_file(path)
 
+    def accepts_path(self, path: str) -> bool:
+        if self.multiple and os.path.isdir(path):
+            return True
+        return path.lower().endswith(tuple(self.file_types))
+
     def dragEnterEvent(self, event: QDragEnterEvent):
         if event.mimeData().hasUrls():
             urls = event.mimeData().urls()
-            if urls and urls[0].toLocalFile().lower().endswith(tuple(self.file_types)):
+            if not self.multiple:
+                urls = urls[:1]
+            if urls and any(self.accepts_path(url.toLocalFile()) for url in urls):
                 event.acceptProposedAction()
             else:
                 event.ignore()
@@ -52,15 +78,40 @@ class ClickableDropLabel(QLabel):
     def dropEvent(self, event: QDropEvent):
         urls = event.mimeData().urls()
         if urls:
-            path = urls[0].toLocalFile()
-            if os.path.isfile(path):
-                self.set_file(path)
+            if self.multiple:
+                paths = [url.toLocalFile() for url in urls]
+                paths = [p for p in paths if os.path.exists(p) and self.accepts_path(p)]
+                if paths:
+                    self.set_files(paths)
+            else:
+                path = urls[0].toLocalFile()
+                if os.path.isfile(path):
+                    self.set_file(path)
         event.acceptProposedAction()
 
     def set_file(self, path: str):
         self.file_path = path
+        self.file_paths = [path]
         self.setText(os.path.basename(path))
 
+    def set_files(self, paths: list[str]):
+        if len(paths) == 1 and os.path.isfile(paths[0]):
+            self.set_file(paths[0])
+            return
+        self.file_paths = list(paths)
+        self.file_path = None
+        self.setText(f"{len(paths)} items selected")
+
+
+# Generic qualities, used until a video's real formats are known and for playlists
+QUALITY_PRESETS = [
+    ("1080p", "bestvideo[height<=1080]+bestaudio/best[height<=1080]"),
+    ("720p", "bestvideo[height<=720]+bestaudio/best[height<=720]"),
+    ("480p", "bestvideo[height<=480]+bestaudio/best[height<=480]"),
+    ("360p", "bestvideo[height<=360]+bestaudio/best[height<=360]"),
+    ("Audio only", "bestaudio"),
+]
+
 
 class MainWindow(QWidget):
     def __init__(self):
@@ -71,8 +122,25 @@ class MainWindow(QWidget):
         self.setWindowTitle("YouTube Downloader & Uploader")
         self.setGeometry(100, 100, 1600, 900)
 
-        self.cancel_flag = {"cancel": False}
+        self.download_queue = DownloadQueue(max_workers=3)
+        self.download_queue.add_listener(self.on_download_job_changed)
+        self.thumbnails = ThumbnailService()
+        self.preview_pipeline = PreviewPipeline(thumbnails=self.thumbnails)
+        self.thumbnail_path: str | None = None
+        self.upload_queue = UploadQueue(max_workers=2)
+        self.upload_queue.add_listener(self.on_upload_job_changed)
+        # Recorded after the listeners above, so it sees what they changed (e.g. a recovered result)
+        self.history = get_history()
+        self.job_model = JobHistoryModel(self.history, self.thumbnails)
+        for queue in (self.download_queue, self.upload_queue):
+            self.history.attach(queue)
+            self.job_model.attach(queue)
+        # Downloads interrupted by a crash or by closing the app; queued once the loop runs
+        asyncio.get_event_loop().call_soon(self.restore_jobs)
+        self.upload_batch_ids: list[str] = []
+        self.relay_job_id: str | None = None
         self.selected_folder = "."
+        self.available_formats: list[dict] = []
         self.setup_ui()
 
     def setup_ui(self):
@@ -100,14 +168,35 @@ class MainWindow(QWidget):
         left_layout.addWidget(self.url_input)
 
         self.quality_box = QComboBox()
-        self.quality_box.addItems(["1080p", "720p", "480p", "360p", "Audio only"])
-        self.quality_box.setItemData(0, "bestvideo[height<=1080]+bestaudio/best[height<=1080]")
-        self.quality_box.setItemData(1, "bestvideo[height<=720]+bestaudio/best[height<=720]")
-        self.quality_box.setItemData(2, "bestvideo[height<=480]+bestaudio/best[height<=480]")
-        self.quality_box.setItemData(3, "bestvideo[height<=360]+bestaudio/best[height<=360]")
-        self.quality_box.setItemData(4, "bestaudio")
         left_layout.addWidget(self.quality_box)
 
+        queue_options_row = QHBoxLayout()
+        self.priority_box = QComboBox()
+        self.priority_box.addItem("Normal priority", 0)
+        self.priority_box.addItem("High priority", 10)
+        self.priority_box.addItem("Low priority", -10)
+        queue_options_row.addWidget(self.priority_box)
+
+        queue_options_row.addWidget(QLabel("Parallel downloads:"))
+        self.parallel_box = QSpinBox()
+        self.parallel_box.setRange(1, 16)
+        self.parallel_box.setValue(self.download_queue.max_workers)
+        self.parallel_box.setToolTip(
+            f"At most {get_site_scheduler().max_concurrency} of them run at once from any one site"
+        )
+        self.parallel_box.valueChanged.connect(self.set_parallel_downloads)
+        queue_options_row.addWidget(self.parallel_box)
+        left_layout.addLayout(queue_options_row)
+
+        self.playlist_checkbox = QCheckBox("Whole playlist / channel (skip already downloaded)")
+        self.playlist_checkbox.toggled.connect(self.update_quality_box)
+        self.update_quality_box()
+        left_layout.addWidget(self.playlist_checkbox)
+
+        self.convert_checkbox = QCheckBox("Convert to MP4 (remux when possible)")
+        self.convert_checkbox.setChecked(True)
+        left_layout.addWidget(self.convert_checkbox)
+
         self.folder_btn = QPushButton("Select download folder")
         self.folder_btn.setObjectName("folder_btn")
         self.folder_btn.clicked.connect(self.select_folder)
@@ -118,7 +207,22 @@ class MainWindow(QWidget):
         self.download_btn.clicked.connect(self.download_video)
         left_layout.addWidget(self.download_btn)
 
-        self.cancel_btn = QPushButton("❌ Cancel")
+        self.relay_btn = QPushButton("Download && re-upload to YouTube")
+        self.relay_btn.setObjectName("relay_btn")
+        self.relay_btn.clicked.connect(self.relay_video)
+        left_layout.addWidget(self.relay_btn)
+
+        self.jobs_panel = JobHistoryPanel(self.job_model)
+        self.jobs_panel.selectionChanged.connect(self.update_cancel_button)
+        left_layout.addWidget(self.jobs_panel, 1)
+
+        self.pause_btn = QPushButton("⏸ Pause selected")
+        self.pause_btn.setObjectName("pause_btn")
+        self.pause_btn.clicked.connect(self.toggle_pause)
+        self.pause_btn.setEnabled(False)
+        left_layout.addWidget(self.pause_btn)
+
+        self.cancel_btn = QPushButton("❌ Cancel selected")
         self.cancel_btn.setObjectName("cancel_btn")
         self.cancel_btn.clicked.connect(self.cancel_download)
         self.cancel_btn.setEnabled(False)
@@ -129,8 +233,6 @@ class MainWindow(QWidget):
         self.theme_toggle_btn.clicked.connect(self.toggle_theme)
         left_layout.addWidget(self.theme_toggle_btn, alignment=Qt.AlignmentFlag.AlignLeft)
 
-        left_layout.addStretch()
-
         # RIGHT PANEL: Upload Section
         right_frame = QFrame()
         right_layout = QVBoxLayout(right_frame)
@@ -143,8 +245,9 @@ class MainWindow(QWidget):
         preview_row.addWidget(self.right_preview_label)
 
         self.drag_drop_video_area = ClickableDropLabel(
-            "Drag and drop or click to select video",
-            file_types=['mp4', 'avi', 'mov', 'mkv']
+            "Drag and drop or click to select videos,\na folder or a CSV/JSON manifest",
+            file_types=['mp4', 'avi', 'mov', 'mkv', 'csv', 'json'],
+            multiple=True
         )
         preview_row.addWidget(self.drag_drop_video_area)
         right_layout.addLayout(preview_row)
@@ -169,6 +272,10 @@ class MainWindow(QWidget):
         self.privacy_box.addItem("Unlisted", "unlisted")
         right_layout.addWidget(self.privacy_box)
 
+        self.playlist_input = QLineEdit()
+        self.playlist_input.setPlaceholderText("Add to playlist (playlist ID, optional)")
+        right_layout.addWidget(self.playlist_input)
+
         self.upload_btn = QPushButton("Upload to YouTube")
         self.upload_btn.setObjectName("upload_btn")
         self.upload_btn.clicked.connect(self.upload_video_async)
@@ -198,23 +305,39 @@ class MainWindow(QWidget):
         else:
             return url
 
-    def load_thumbnail_from_file(self):
-        """Load thumbnail image from file and show in preview."""
+    @asyncSlot()
+    async def load_thumbnail_from_file(self):
+        """Load thumbnail image from file and show in preview (decoded and scaled off the GUI thread)."""
         path, _ = QFileDialog.getOpenFileName(
             self, "Select image", filter="Images (*.png *.jpg *.jpeg *.bmp *.gif)"
         )
-        if path:
-            pixmap = QPixmap(path)
-            if not pixmap.isNull():
-                scaled = pixmap.scaled(
-                    self.right_preview_label.width(),
-                    self.right_preview_label.height(),
-                    Qt.AspectRatioMode.KeepAspectRatio,
-                    Qt.TransformationMode.SmoothTransformation
-                )
-                self.right_preview_label.setPixmap(scaled)
-            else:
-                self.right_preview_label.setText("Unable to display image")
+        if not path:
+            return
+        data = await self.thumbnails.load_file(
+            path, self.right_preview_label.width(), self.right_preview_label.height()
+        )
+        image = QImage.fromData(data) if data else QImage()
+        if image.isNull():
+            self.right_preview_label.setText("Unable to display image")
+            return
+        self.thumbnail_path = path
+        self.right_preview_label.setPixmap(QPixmap.fromImage(image))
+
+    def update_quality_box(self):
+        """Offer the previewed video's real qualities, or generic presets if unknown."""
+        self.quality_box.clear()
+        if not self.available_formats or self.playlist_checkbox.isChecked():
+            for label, format_spec in QUALITY_PRESETS:
+                self.quality_box.addItem(label, format_spec)
+            return
+
+        for rung in self.available_formats:
+            self.quality_box.addItem(rung["label"], rung["format_id"])
+        # Default to the best quality up to 1080p, like the presets
+        for index, rung in enumerate(self.available_formats):
+            if (rung["height"] or 0) <= 1080:
+                self.quality_box.setCurrentIndex(index)
+                break
 
     def select_folder(self):
         """Select destination folder for downloads."""
@@ -223,102 +346,153 @@ class MainWindow(QWidget):
             self.selected_folder = folder
             self.folder_btn.setText(f"📁 {folder}")
 
+    def restore_jobs(self):
+        """Queue interrupted downloads again; other jobs left unfinished are marked as such in the history."""
+        self.download_queue.restore()
+        self.history.mark_interrupted(set(self.download_queue.jobs))
+
+    def set_parallel_downloads(self, value: int):
+        """Change how many downloads the queue runs at once."""
+        self.download_queue.max_workers = value
+        warn_if_capped(value)
+
+    def selected_job_ids(self) -> list[str]:
+        return self.jobs_panel.selected_job_ids()
+
+    def update_cancel_button(self):
+        """Enable cancel and pause only when an unfinished job is selected."""
+        jobs = [self.download_queue.jobs.get(job_id) for job_id in self.selected_job_ids()]
+        jobs = [job for job in jobs if job and not job.finished]
+        self.cancel_btn.setEnabled(bool(jobs))
+        self.pause_btn.setEnabled(bool(jobs))
+        paused = bool(jobs) and all(job.status is JobStatus.PAUSED for job in jobs)
+        self.pause_btn.setText("▶ Resume selected" if paused else "⏸ Pause selected")
+
+    def toggle_pause(self):
+        """Pause the selected jobs, keeping what they downloaded, or resume them if all are paused."""
+        jobs = [self.download_queue.jobs.get(job_id) for job_id in self.selected_job_ids()]
+        jobs = [job for job in jobs if job and not job.finished]
+        resume = all(job.status is JobStatus.PAUSED for job in jobs)
+        for job in jobs:
+            if resume:
+                self.download_queue.resume(job.id)
+            else:
+                self.download_queue.pause(job.id)
+        self.update_cancel_button()
+
     def cancel_download(self):
-        """Trigger cancellation of ongoing download."""
-        self.cancel_flag["cancel"] = True
-        self.cancel_btn.setEnabled(False)
-        self.download_btn.setText("Cancelling...")
+        """Cancel the downloads selected in the jobs panel and delete their partial files."""
+        for job_id in self.selected_job_ids():
+            self.download_queue.cancel(job_id)
+        self.update_cancel_button()
 
     @asyncSlot()
+    @instrument("on_url_changed")
     async def on_url_changed(self):
         """Fetch and preview video metadata and thumbnail on URL change."""
         url = self.url_input.text().strip()
         if not url:
+            self.preview_pipeline.cancel()
             self.left_preview_label.setText("Video Preview")
             self.left_title_label.setText("")
+            self.available_formats = []
+            self.update_quality_box()
             return
 
         clean_url = self.extract_video_url(url)
 
         try:
-            info = await async_get_video_info(clean_url)
+            info = await self.preview_pipeline.request(clean_url)
+            if info is None:
+                # Superseded by a newer URL
+                return
+
             title = info.get("title", "")
-            thumbnail_url = info.get("thumbnail", "")
             self.left_title_label.setText(title or "No title found")
 
-            if not thumbnail_url:
+            self.available_formats = info.get("formats") or []
+            self.update_quality_box()
+
+            if not info.get("thumbnail"):
                 self.left_preview_label.setText("No thumbnail available")
                 return
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(thumbnail_url) as resp:
-                    if resp.status == 200:
-                        data = await resp.read()
-                        image = QImage.fromData(data)
-                        pixmap = QPixmap.fromImage(image).scaled(
-                            self.left_preview_label.width(),
-                            self.left_preview_label.height(),
-                            Qt.AspectRatioMode.KeepAspectRatio,
-                            Qt.TransformationMode.SmoothTransformation
-                        )
-                        self.left_preview_label.setPixmap(pixmap)
-                    else:
-                        self.left_preview_label.setText("Failed to fetch thumbnail")
+            data = info.get("thumbnail_data")
+            if data:
+                # Already scaled to the preview size by the thumbnail service
+                self.left_preview_label.setPixmap(QPixmap.fromImage(QImage.fromData(data)))
+            else:
+                self.left_preview_label.setText("Failed to fetch thumbnail")
         except Exception as e:
             print("Error getting preview:", e)
             self.left_preview_label.setText("Error loading preview")
             self.left_title_label.setText("")
 
-    @asyncSlot()
-    async def download_video(self):
-        """Download video asynchronously and handle result display."""
+    def download_video(self):
+        """Add the current URL to the download queue."""
         url = self.url_input.text().strip()
         quality = self.quality_box.currentData()
-        folder = self.selected_folder
 
         if not url:
             self.download_btn.setText("❌ No URL provided")
             return
 
-        quality = quality or "best"
-        self.download_btn.setText("Downloading...")
-        self.download_btn.setEnabled(False)
-        self.cancel_btn.setEnabled(True)
-        self.cancel_flag["cancel"] = False
+        convert = "auto" if self.convert_checkbox.isChecked() else "never"
+        if self.playlist_checkbox.isChecked():
+            self.download_queue.submit_playlist(
+                url,
+                quality or "best",
+                self.selected_folder,
+                priority=self.priority_box.currentData(),
+                convert=convert
+            )
+            self.download_btn.setText("Download")
+            self.jobs_panel.show_newest()
+            return
+
+        title = self.left_title_label.text().strip()
+        self.download_queue.submit_download(
+            url,
+            quality or "best",
+            self.selected_folder,
+            priority=self.priority_box.currentData(),
+            convert=convert,
+            title=title if title and title != "No title found" else url
+        )
+        self.download_btn.setText("Download")
+        self.jobs_panel.show_newest()
 
-        def on_progress(percent):
-            self.download_btn.setText(f"Downloading {percent:.0f}%")
+    @instrument("on_download_job_changed")
+    def on_download_job_changed(self, job: Job):
+        """Log finished downloads; the jobs panel shows the status of every job."""
+        if job.status is JobStatus.DONE:
+            print("Saved to:", job.result)
+        elif job.status is JobStatus.FAILED:
+            self.recover_failed_download(job)
 
+    @staticmethod
+    def recover_failed_download(job: Job) -> bool:
+        """Check the library for a usable copy of a video whose job failed, and make it the job's result."""
+        if job.kind != "download":
+            return False
         try:
-            path = await async_download_youtube_video(url, quality, on_progress, folder, self.cancel_flag)
-            if not self.cancel_flag["cancel"]:
-                self.download_btn.setText("✅ Downloaded")
-                print("Saved to:", path)
-            else:
-                self.download_btn.setText("🚫 Cancelled")
-
+            entries = get_library().find(canonical_key(job.params["url"]))
         except Exception as e:
-            print("Download warning:", e)
-            print(traceback.format_exc())
-            title = self.left_title_label.text().strip()
-            base_path = os.path.join(folder, title[:100])
-
-            if os.path.exists(base_path + ".mp4"):
-                self.download_btn.setText("✅ Downloaded (.mp4)")
-            elif os.path.exists(base_path + ".webm"):
-                self.download_btn.setText("✅ Downloaded (.webm)")
-            else:
-                self.download_btn.setText("❌ Error")
-
-        finally:
-            await asyncio.sleep(2)
-            self.download_btn.setText("Download")
-            self.download_btn.setEnabled(True)
-            self.cancel_btn.setEnabled(False)
+            print("Library lookup failed:", e)
+            return False
+        if entries:
+            job.result = entries[0]["path"]
+            print("Already in library:", job.result)
+            return True
+        return False
 
     @asyncSlot()
     async def upload_video_async(self):
         """Upload video asynchronously to YouTube with progress feedback."""
+        if self.drag_drop_video_area.file_path is None and self.drag_drop_video_area.file_paths:
+            await self.upload_batch()
+            return
+
         video_path = self.drag_drop_video_area.file_path
         title = self.title_input.text().strip()
         description = self.description_input.toPlainText().strip()
@@ -336,26 +510,154 @@ class MainWindow(QWidget):
         self.upload_btn.setText("Uploading... 0%")
         self.video_url_field.clear()
 
-        def progress_callback(pct):
-            self.upload_btn.setText(f"Uploading... {pct}%")
+        def on_progress(progress: Progress):
+            # Delivered on the GUI thread by the reporter
+            self.upload_btn.setText(f"Uploading... {progress.percent:.0f}%")
+            if progress.speed:
+                self.upload_percent_label.setText(format_speed(progress.speed, progress.eta))
 
+        reporter = ProgressReporter(on_progress)
         try:
             response = await asyncio.to_thread(
-                upload_video, video_path, title, description, None, "22", privacy_status, progress_callback
+                upload_video, video_path, title, description, None, "22", privacy_status, reporter.update,
+                thumbnail=self.thumbnail_path,
+                playlist_id=self.playlist_input.text().strip() or None
             )
-            self.upload_btn.setText("✅ Uploaded")
             video_id = response.get("id")
             if video_id:
                 self.video_url_field.setText(f"https://youtu.be/{video_id}")
+            results = {}
+            if "post_upload" in response:
+                self.upload_btn.setText("✅ Uploaded, setting thumbnail and playlist...")
+                results = await asyncio.wrap_future(response["post_upload"])
+            failed = [step for step, result in results.items() if result != "ok"]
+            self.upload_btn.setText(f"✅ Uploaded ({', '.join(failed)} failed)" if failed else "✅ Uploaded")
         except Exception as e:
             print("Upload error:", e)
             print(traceback.format_exc())
             self.upload_btn.setText("❌ Error")
         finally:
+            reporter.finish()
             await asyncio.sleep(2)
             self.upload_btn.setEnabled(True)
             self.upload_btn.setText("Upload to YouTube")
 
+    async def upload_batch(self):
+        """Upload every selected video, folder entry and manifest row through the upload queue."""
+        privacy_status = self.privacy_box.currentData()
+        try:
+            items = collect_items(self.drag_drop_video_area.file_paths, privacy_status)
+        except (OSError, ValueError) as e:
+            print("Manifest error:", e)
+            self.upload_btn.setText("❌ Invalid manifest")
+            return
+
+        if not items:
+            self.upload_btn.setText("❌ No videos found")
+            return
+
+        playlist_id = self.playlist_input.text().strip()
+        for item in items:
+            item.playlist_id = item.playlist_id or playlist_id or None
+
+        missing = [item.path for item in items if not os.path.isfile(item.path)]
+        if missing:
+            print("Videos not found:", ", ".join(missing))
+            self.upload_btn.setText(f"❌ {len(missing)} video(s) not found")
+            return
+
+        self.upload_btn.setEnabled(False)
+        self.video_url_field.clear()
+        self.upload_batch_ids = []
+        try:
+            for item in items:
+                self.upload_batch_ids.append(self.upload_queue.submit_upload(item).id)
+        except OSError as e:
+            # Removed or unreadable since the check above; don't upload half a batch
+            print("Upload error:", e)
+            for job_id in self.upload_batch_ids:
+                self.upload_queue.cancel(job_id)
+            self.upload_batch_ids = []
+            self.upload_btn.setText("❌ Video unreadable")
+            self.upload_btn.setEnabled(True)
+            return
+        await asyncio.gather(*(self.upload_queue.wait(job_id) for job_id in self.upload_batch_ids))
+
+        summary = self.upload_queue.summary(self.upload_batch_ids)
+        batch = [f for f in summary["files"] if f["video_id"]]
+        done = len(batch)
+        self.upload_btn.setText(f"✅ Uploaded {done}/{len(items)}")
+        self.video_url_field.setText(" ".join(f"https://youtu.be/{f['video_id']}" for f in batch))
+        await asyncio.sleep(2)
+        self.upload_btn.setEnabled(True)
+        self.upload_btn.setText("Upload to YouTube")
+
+    @asyncSlot()
+    async def relay_video(self):
+        """Download the current URL and upload it again with its original title and description."""
+        url = self.url_input.text().strip()
+        if not url:
+            self.relay_btn.setText("❌ No URL provided")
+            return
+
+        playlist_id = self.playlist_input.text().strip()
+        job = self.upload_queue.submit_relay(
+            url,
+            self.quality_box.currentData() or "best",
+            self.selected_folder,
+            self.privacy_box.currentData(),
+            **({"playlist_id": playlist_id} if playlist_id else {})
+        )
+        self.relay_job_id = job.id
+        self.relay_btn.setEnabled(False)
+        self.video_url_field.clear()
+        await self.upload_queue.wait(job.id)
+
+        video_id = (job.result or {}).get("id")
+        if video_id:
+            self.relay_btn.setText("✅ Re-uploaded")
+            self.video_url_field.setText(f"https://youtu.be/{video_id}")
+        else:
+            self.relay_btn.setText("🚫 Cancelled" if job.status is JobStatus.CANCELLED else "❌ Error")
+        await asyncio.sleep(2)
+        self.relay_btn.setEnabled(True)
+        self.relay_btn.setText("Download && re-upload to YouTube")
+
+    def on_relay_job_changed(self, job: Job):
+        if job.finished:
+            return
+        if job.status is JobStatus.QUEUED:
+            self.relay_btn.setText("Queued...")
+        elif job.stats.get("stage") == "postprocess":
+            self.relay_btn.setText("Converting to MP4...")
+        elif job.stats.get("mode") == "stream" and job.stats.get("stage") != "upload":
+            downloaded = job.stats.get("downloaded_bytes", 0) / (1024 * 1024)
+            self.relay_btn.setText(f"Downloading {downloaded:.0f} MB, uploading {job.progress:.0f}%")
+        else:
+            stage = "Uploading" if job.stats.get("stage") == "upload" else "Downloading"
+            self.relay_btn.setText(f"{stage} {job.progress:.0f}%")
+        if job.stats.get("speed"):
+            self.upload_percent_label.setText(format_speed(job.stats["speed"], job.stats.get("eta")))
+
+    @instrument("on_upload_job_changed")
+    def on_upload_job_changed(self, job: Job):
+        """Show aggregate progress of the current upload batch."""
+        if job.id == self.relay_job_id:
+            self.on_relay_job_changed(job)
+            return
+        if job.id not in self.upload_batch_ids:
+            return
+        jobs = [self.upload_queue.jobs[job_id] for job_id in self.upload_batch_ids]
+        finished = sum(1 for j in jobs if j.finished)
+        total_bytes = sum(j.params["size"] for j in jobs)
+        sent_bytes = sum(j.params["size"] * j.progress / 100 for j in jobs)
+        started = [j.started_at for j in jobs if j.started_at]
+        elapsed = time.time() - min(started) if started else 0
+        speed = sent_bytes / elapsed / (1024 * 1024) if elapsed > 0 else 0
+        percent = sent_bytes * 100 / total_bytes if total_bytes else 0
+        self.upload_btn.setText(f"Uploading {finished}/{len(jobs)}... {percent:.0f}%")
+        self.upload_percent_label.setText(f"{speed:.1f} MB/s")
+
     def load_stylesheet(self, theme: str):
         """Load and apply stylesheet from QSS file."""
         try: